@@ -4,13 +4,36 @@ import os
 import glob
 import datetime
 import time
-import base64
 import re  # 정규표현식 사용
+import asyncio
+import threading
 import json # JSON 처리를 위한 라이브러리
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_google_genai import ChatGoogleGenerativeAI
+from contextlib import ExitStack
 from langchain_core.prompts import PromptTemplate
 from langchain_core.messages import HumanMessage
+from retrieval import RETRIEVAL_TOP_K, RETRIEVAL_TOP_K_SCAN, format_passages
+from kb_sync import DOC_HANDBOOK, KnowledgeBaseSync
+from course_catalog import (GRADES, KW_DEPARTMENTS, SEMESTERS, is_timetable_file, load_or_build_catalog, mark_retakes,
+                            retakes_in_text)
+from timeslots import DAYS, attach_masks, course_mask, find_conflict, schedule_mask
+from timetable_render import TimetableRenderer, timetable_document
+from firestore_data import DEFAULT_TTL, CollectionCache, InMemoryFirestore, Page, UserCollections, WriteBehindQueue
+from user_auth import HASH_WORKERS, SESSION_TTL, AuthService, SessionStore
+from timetable_store import (SCHEMA_VERSION, catalog_resolver, decode_timetable, encode_timetable, migrate_document,
+                             schema_version)
+from timetable_solver import SolverPreferences, solve_timetables
+from candidate_table import (CATEGORY_MAJOR, CATEGORY_MUST, CATEGORY_OTHER, build_candidate_frame, category_counts,
+                             filter_candidates)
+from response_cache import ResponseCache, make_key as make_response_key
+from context_cache import ContextCacheManager, GeminiContextCacheBackend, LocalContextCacheBackend, LocalStandInChatModel
+from llm_clients import DEFAULT_MAX_IN_FLIGHT, DEFAULT_MODEL, LLMClientRegistry
+from rate_limiter import DEFAULT_RATE, PRIORITY_BULK, PRIORITY_INTERACTIVE, RequestScheduler
+from transcript_pipeline import analyze_transcripts
+from image_prep import prepare_images
+from candidate_store import (CANDIDATE_EXTRACTION_PROMPT, DEFAULT_WORKERS, CandidateStore, candidate_query,
+                             catalog_builder, combined_builder, llm_builder, parse_candidates_json, precompute)
+from graduation_rules import GraduationRules, format_verdict, is_handbook_file, load_or_build_rules, student_record
+from telemetry import EXPORT_DIR, TELEMETRY, TelemetryCallbackHandler, span, traced
 
 # Firebase 라이브러리 (Admin SDK)
 import firebase_admin
@@ -20,6 +43,7 @@ from firebase_admin import credentials, firestore
 # [0] 설정 및 데이터 로드
 # -----------------------------------------------------------------------------
 st.set_page_config(page_title="KW-강의마스터 Pro", page_icon="🎓", layout="wide")
+SCRIPT_STARTED = time.perf_counter()
 
 def set_style():
     st.markdown("""
@@ -157,6 +181,17 @@ if not api_key:
     st.error("🚨 **Google API Key가 설정되지 않았습니다.**")
     st.stop()
 
+def get_setting(name, default=""):
+    """Secrets 우선, 없으면 환경변수"""
+    if name in st.secrets:
+        return st.secrets[name]
+    return os.environ.get(name, default)
+
+# 성능 계측: 주요 구간(span)과 카운터를 프로세스 전역으로 모으고, KW_TELEMETRY_INTERVAL초마다
+# KW_TELEMETRY_DIR에 JSON/Prometheus 텍스트 파일로 내보냄 (네트워크 불필요, 0이면 주기적 내보내기 끔)
+TELEMETRY_DIR = get_setting("KW_TELEMETRY_DIR", EXPORT_DIR)
+TELEMETRY.start_exporter(TELEMETRY_DIR, float(get_setting("KW_TELEMETRY_INTERVAL", 30)))
+
 # 세션 상태 초기화 (없으면 생성)
 if "global_log" not in st.session_state:
     st.session_state.global_log = [] 
@@ -174,6 +209,13 @@ if "timetable_chat_history" not in st.session_state:
     st.session_state.timetable_chat_history = []
 if "graduation_analysis_result" not in st.session_state:
     st.session_state.graduation_analysis_result = ""
+if "image_prep_report" not in st.session_state:
+    st.session_state.image_prep_report = ""
+if "diagnosis_failed_images" not in st.session_state:
+    st.session_state.diagnosis_failed_images = 0
+# 성적표 집계가 고른 재수강 대상 과목명 (None이면 목록 없이 저장된 예전 진단)
+if "graduation_retakes" not in st.session_state:
+    st.session_state.graduation_retakes = None
 if "graduation_chat_history" not in st.session_state:
     st.session_state.graduation_chat_history = []
 if "user" not in st.session_state:
@@ -207,33 +249,77 @@ def clean_html_output(text):
         cleaned = cleaned[:-3]
     return cleaned.replace("```html", "").replace("```", "").strip()
 
-# ★ 재시도(Retry) 로직 ★
-def run_with_retry(func, *args, **kwargs):
-    max_retries = 5
-    delays = [1, 2, 4, 8, 16]
-    for i in range(max_retries):
-        try:
+# ★ 재시도(Retry) 로직 ★ 세션 공용 스케줄러(토큰 버킷 + 우선순위 대기열 + Retry-After/지터 백오프)
+@st.cache_resource
+def get_request_scheduler():
+    scheduler = RequestScheduler(rate=float(get_setting("KW_LLM_RATE", DEFAULT_RATE)))
+    for name in scheduler.counters:
+        TELEMETRY.gauge(f"scheduler.{name}", lambda name=name: scheduler.counters[name])
+    TELEMETRY.gauge("scheduler.rate", lambda: scheduler.bucket.rate)
+    return scheduler
+
+def run_with_retry(func, *args, priority=PRIORITY_INTERACTIVE, **kwargs):
+    """시도마다 동시 요청 자리를 하나 점유 (대기 중에는 자리를 반납)
+    llm.call: 대기열 + 재시도 포함 전체, llm.attempt: 시도 1회의 실제 호출 시간"""
+    attempts = []
+
+    def _attempt():
+        attempts.append(None)
+        with get_llm_registry().slot(), span("llm.attempt"):
             return func(*args, **kwargs)
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg or "503" in error_msg:
-                if i < max_retries - 1:
-                    time.sleep(delays[i])
-                    continue
-            raise e
+    try:
+        with span("llm.call"):
+            return get_request_scheduler().run(_attempt, priority)
+    finally:
+        if len(attempts) > 1:
+            TELEMETRY.count("llm.retries", len(attempts) - 1)
 
 # -----------------------------------------------------------------------------
 # [Firebase Manager] Firestore 기반 자체 인증 및 DB 관리
 # -----------------------------------------------------------------------------
+SAVED_PAGE_SIZE = 10
+
+# 사용자별 저장 목록 읽기 캐시 (프로세스 전역, 같은 사용자의 저장/수정 시 무효화)
+@st.cache_resource
+def get_firestore_cache():
+    cache = CollectionCache(ttl=float(get_setting("KW_FIRESTORE_CACHE_TTL", DEFAULT_TTL)))
+    return TELEMETRY.watch("firestore.cache", cache, "hits", "misses")
+
+# KW_FIREBASE_BACKEND=memory: 서비스 계정 없이 로컬 개발/테스트용 메모리 Firestore 사용 (프로세스 종료 시 소멸)
+@st.cache_resource
+def get_memory_firestore():
+    return InMemoryFirestore(firestore.SERVER_TIMESTAMP, firestore.DELETE_FIELD)
+
+# 저장은 큐에 넣고 바로 반환, 백그라운드 스레드가 모든 세션의 쓰기를 모아 batch commit (KW_FIRESTORE_WRITE_BEHIND=0 이면 동기 쓰기)
+@st.cache_resource
+def get_write_queue(_db):
+    queue = TELEMETRY.watch("firestore.write_queue", WriteBehindQueue(_db), "commits", "writes")
+    TELEMETRY.gauge("firestore.write_queue.pending", queue.pending)
+    return queue
+
+# 비밀번호 해시는 전용 스레드 풀(KW_AUTH_HASH_WORKERS)에서만 계산, 세션 토큰은 프로세스 메모리에 보관
+@st.cache_resource
+def get_auth_service(_db):
+    return AuthService(_db, firestore.SERVER_TIMESTAMP, firestore.DELETE_FIELD,
+                       workers=int(get_setting("KW_AUTH_HASH_WORKERS", HASH_WORKERS)))
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore(ttl=float(get_setting("KW_SESSION_TTL", SESSION_TTL)))
+
 class FirebaseManager:
     def __init__(self):
         self.db = None
+        self.data = None
         self.is_initialized = False
         self.init_firestore()
 
     def init_firestore(self):
         """Firestore DB 초기화 (Service Account 사용)"""
-        if "firebase_service_account" in st.secrets:
+        if str(get_setting("KW_FIREBASE_BACKEND", "")) == "memory":
+            self.db = get_memory_firestore()
+            self.is_initialized = True
+        elif "firebase_service_account" in st.secrets:
             try:
                 if not firebase_admin._apps:
                     cred_info = dict(st.secrets["firebase_service_account"])
@@ -243,455 +329,760 @@ class FirebaseManager:
                 self.is_initialized = True
             except Exception:
                 pass
+        if self.is_initialized:
+            writer = get_write_queue(self.db) if str(get_setting("KW_FIRESTORE_WRITE_BEHIND", "1")) != "0" else None
+            self.data = UserCollections(self.db, get_firestore_cache(), firestore.SERVER_TIMESTAMP, firestore.Query.DESCENDING,
+                                        writer=writer)
+
+    def _user_id(self):
+        if not self.is_initialized or not st.session_state.user:
+            return None
+        return st.session_state.user['localId']
 
+    @traced("firestore.login")
     def login(self, email, password):
-        """Firestore에서 이메일/비번 매칭 검사"""
+        """이메일 색인 문서 한 건 조회 + 비밀번호 해시 검증 (성공 시 세션 시작)"""
         if not self.is_initialized:
             return None, "Firebase 연결 실패"
-        
         try:
-            # users 컬렉션에서 email과 password가 일치하는 문서 검색
-            users_ref = self.db.collection('users')
-            query = users_ref.where('email', '==', email).where('password', '==', password).stream()
-            
-            for doc in query:
-                user_data = doc.to_dict()
-                user_data['localId'] = doc.id
-                return user_data, None
-            
-            return None, "이메일 또는 비밀번호가 일치하지 않습니다."
+            user, err = get_auth_service(self.db).login(email, password)
         except Exception as e:
             return None, f"로그인 오류: {str(e)}"
+        if user:
+            self._start_session(user)
+        return user, err
 
+    @traced("firestore.signup")
     def signup(self, email, password):
-        """Firestore에 신규 유저 정보 저장"""
+        """이메일 색인 문서를 create로 선점한 뒤 사용자 문서 생성 (성공 시 세션 시작)"""
         if not self.is_initialized:
             return None, "Firebase 연결 실패"
-
         try:
-            users_ref = self.db.collection('users')
-            existing_user = list(users_ref.where('email', '==', email).stream())
-            if len(existing_user) > 0:
-                return None, "이미 가입된 이메일입니다."
-            
-            new_user_ref = users_ref.document()
-            user_data = {
-                "email": email,
-                "password": password,
-                "created_at": firestore.SERVER_TIMESTAMP
-            }
-            new_user_ref.set(user_data)
-            
-            user_data['localId'] = new_user_ref.id
-            return user_data, None
+            user, err = get_auth_service(self.db).signup(email, password)
         except Exception as e:
             return None, f"회원가입 오류: {str(e)}"
-
-    def save_data(self, collection, doc_id, data):
-        """데이터 저장 (덮어쓰기)"""
-        if not self.is_initialized or not st.session_state.user:
+        if user:
+            self._start_session(user)
+        return user, err
+
+    def _start_session(self, user):
+        # 토큰은 이 브라우저 세션(session_state)에만 보관: 주소에 넣으면 복사한 링크/방문 기록/Referer로 새어 나감
+        st.session_state.auth_token = get_session_store().issue(user)
+
+    def verify_session(self):
+        """세션 토큰이 만료/폐기됐으면 로그아웃 상태로 되돌림 (메모리 조회만)"""
+        token = st.session_state.get("auth_token")
+        user = get_session_store().get(token) if token else None
+        if user is None:
+            st.session_state.user = None
+            st.session_state.pop("auth_token", None)
+        return user
+
+    def logout(self):
+        """남은 쓰기 반영 후 세션 토큰 폐기"""
+        self.flush()
+        get_session_store().revoke(st.session_state.get("auth_token"))
+
+    def _report_failure(self, collection, on_done):
+        """쓰기 완료 콜백 (쓰기 스레드에서 실행): 실패는 세션의 알림 목록에 넣어 다음 실행 때 표시"""
+        notices = st.session_state.setdefault("write_notices", [])
+
+        def callback(future):
+            if future.exception() is not None:
+                notices.append((f"{collection} 저장 실패: {future.exception()}", "⚠️"))
+            if on_done is not None:
+                on_done(future)
+        return callback
+
+    @traced("firestore.save_data")
+    def save_data(self, collection, doc_id, data, on_done=None):
+        """데이터 저장 (덮어쓰기). 쓰기 큐에 넣으면 바로 True, on_done(future)은 실제 반영/실패 시 호출"""
+        user_id = self._user_id()
+        if user_id is None:
             return False
         try:
-            user_id = st.session_state.user['localId']
-            doc_ref = self.db.collection('users').document(user_id).collection(collection).document(doc_id)
-            data['updated_at'] = firestore.SERVER_TIMESTAMP
-            doc_ref.set(data)
+            self.data.save(user_id, collection, doc_id, data, callback=self._report_failure(collection, on_done))
             return True
         except:
             return False
 
-    def update_data(self, collection, doc_id, data):
+    @traced("firestore.update_data")
+    def update_data(self, collection, doc_id, data, on_done=None):
         """데이터 부분 업데이트 (이름 변경, 즐겨찾기 등)"""
-        if not self.is_initialized or not st.session_state.user:
+        user_id = self._user_id()
+        if user_id is None:
             return False
         try:
-            user_id = st.session_state.user['localId']
-            doc_ref = self.db.collection('users').document(user_id).collection(collection).document(doc_id)
-            data['updated_at'] = firestore.SERVER_TIMESTAMP
-            doc_ref.update(data)
+            self.data.update(user_id, collection, doc_id, data, callback=self._report_failure(collection, on_done))
             return True
         except:
             return False
 
-    def load_collection(self, collection):
-        """데이터 목록 불러오기"""
-        if not self.is_initialized or not st.session_state.user:
-            return []
+    def flush(self, timeout=5):
+        """큐에 남은 쓰기를 모두 반영 (로그아웃 등 세션 종료 시)"""
+        if self.data is not None and self.data.writer is not None:
+            self.data.writer.flush(timeout)
+
+    def load_collection(self, collection, fields=None):
+        """데이터 목록 불러오기 (최신순, fields를 주면 그 필드만)"""
+        return self.load_page(collection, fields, page_size=None).items
+
+    @traced("firestore.load_page")
+    def load_page(self, collection, fields=None, page_size=SAVED_PAGE_SIZE, cursor=None):
+        """목록 한 페이지 (cursor: 이전 페이지의 Page.cursor)"""
+        user_id = self._user_id()
+        if user_id is None:
+            return Page([])
+        try:
+            return self.data.page(user_id, collection, fields, page_size, cursor)
+        except:
+            return Page([])
+
+    @traced("firestore.load_document")
+    def load_document(self, collection, doc_id):
+        """문서 한 건 전체 (목록에서 고른 항목의 본문)"""
+        user_id = self._user_id()
+        if user_id is None:
+            return None
+        try:
+            return self.data.get(user_id, collection, doc_id)
+        except:
+            return None
+
+    @traced("firestore.latest")
+    def latest(self, collection, fields=None):
+        """가장 최근 문서 한 건 (limit 1)"""
+        user_id = self._user_id()
+        if user_id is None:
+            return None
         try:
-            user_id = st.session_state.user['localId']
-            docs = self.db.collection('users').document(user_id).collection(collection).order_by('updated_at', direction=firestore.Query.DESCENDING).stream()
-            return [{"id": doc.id, **doc.to_dict()} for doc in docs]
+            return self.data.latest(user_id, collection, fields)
         except:
-            return []
+            return None
 
 fb_manager = FirebaseManager()
 
-# PDF 데이터 로드
+# 지난 실행 이후 쌓인 알림 표시 (저장 완료 후 rerun, 백그라운드 쓰기 실패 등)
+pending_notices = st.session_state.get("write_notices", [])
+while pending_notices:
+    notice_message, notice_icon = pending_notices.pop(0)
+    st.toast(notice_message, icon=notice_icon)
+
+# 예전 버전이 주소에 남긴 세션 토큰은 값을 쓰지 않고 지우기만 함
+if "session" in st.query_params:
+    del st.query_params["session"]
+# 로그인 상태는 이 브라우저 세션의 토큰이 유효한 동안만 유지 (새로고침하면 다시 로그인)
+if st.session_state.user and fb_manager.is_initialized:
+    fb_manager.verify_session()
+
+# 성능 대시보드 메뉴는 KW_ADMIN_EMAILS(쉼표 구분, '*'이면 모두)에 있는 계정에만 표시
+DASHBOARD_MENU = "📊 성능 대시보드"
+ADMIN_EMAILS = {e.strip().lower() for e in str(get_setting("KW_ADMIN_EMAILS", "")).split(",") if e.strip()}
+
+def is_admin():
+    user = st.session_state.user
+    return "*" in ADMIN_EMAILS or bool(user and user.get("email", "").lower() in ADMIN_EMAILS)
+
+def saved_at(doc):
+    return datetime.datetime.fromtimestamp(int(doc['id'])).strftime('%Y-%m-%d %H:%M')
+
+def pick_saved_document(collection, label, fields=(), format_func=saved_at):
+    """저장 목록 한 페이지(필요한 필드만)를 selectbox로 보여주고 고른 항목 반환 (없으면 None). 이전/다음은 커서 스택"""
+    cursors = st.session_state.setdefault(f"saved_cursors_{collection}", [None])
+    page = fb_manager.load_page(collection, fields, cursor=cursors[-1])
+    if not page.items:
+        return None
+    selected = st.selectbox(label, page.items, format_func=format_func, label_visibility="collapsed")
+    if len(cursors) > 1 or page.cursor is not None:
+        p1, p2, p3 = st.columns([0.25, 0.5, 0.25])
+        p1.button("◀", key=f"saved_prev_{collection}", disabled=len(cursors) == 1, on_click=cursors.pop)
+        p2.caption(f"{len(cursors)}쪽")
+        p3.button("▶", key=f"saved_next_{collection}", disabled=page.cursor is None, on_click=cursors.append, args=(page.cursor,))
+    return selected
+
+# PDF 데이터 로드: 프로세스 전역 동기화 관리자가 data/ 폴더의 변경분만 반영한 스냅샷을 유지
 @st.cache_resource(show_spinner="PDF 문서를 분석 중입니다...")
-def load_knowledge_base():
-    if not os.path.exists("data"):
-        return ""
-    pdf_files = glob.glob("data/*.pdf")
-    if not pdf_files:
-        return ""
-    all_content = ""
-    for pdf_file in pdf_files:
-        try:
-            loader = PyPDFLoader(pdf_file)
-            pages = loader.load_and_split()
-            filename = os.path.basename(pdf_file)
-            all_content += f"\n\n--- [문서: {filename}] ---\n"
-            for page in pages:
-                all_content += page.page_content
-        except Exception as e:
-            print(f"Error loading {pdf_file}: {e}")
-            continue
-    return all_content
+def get_kb_sync():
+    sync = KnowledgeBaseSync(get_setting("KW_DATA_DIR", "data"))
+    with span("kb.sync"):
+        result = sync.refresh()
+    for source, error in result.failed.items():
+        print(f"Error loading {source}: {error}")
+    print("[ingest] " + " / ".join(sync.current().report))
+    # KW_KB_WATCH_INTERVAL > 0 이면 폴더를 주기적으로 확인해 PDF 추가/교체/삭제를 자동 반영
+    interval = float(get_setting("KW_KB_WATCH_INTERVAL", 0))
+    if interval > 0:
+        sync.watch(interval)
+    return sync
+
+# 이번 실행(rerun) 동안은 처음 받은 스냅샷만 사용 -> 도중에 동기화가 끝나도 요청은 이전 버전으로 마무리
+KB = get_kb_sync().current()
+INGEST_REPORT, KB_VERSION = KB.report, KB.version
+
+# 프롬프트에는 전체 문서 대신 질문과 관련된 상위 k개 문단만 (출처/페이지 포함) 전달
+# 검색은 한 학기 파티션 안에서만: 질문에 적힌 학기 > 화면에서 선택한 학기 > 최신 학기 순
+@traced("kb.retrieve")
+def retrieve_context(query, k=RETRIEVAL_TOP_K, term="", doc_types=None):
+    return format_passages(KB.search(query, k=k, term=term, doc_types=doc_types))
+
+def kb_documents_version(kb, predicate):
+    """스냅샷 중 predicate에 해당하는 문서들의 (파일명, 내용 해시) - 해당 문서가 바뀔 때만 파생 테이블 재생성"""
+    return tuple((doc.source, doc.sha256) for doc in kb.ingested(predicate))
+
+# 강의시간표 PDF를 규칙 기반으로 파싱한 과목 테이블 (Parquet). 저장 당시 원본 PDF 목록/해시가 다르면 재생성
+@st.cache_resource(show_spinner="강의시간표를 정리 중입니다...", max_entries=1)
+def load_course_catalog(_kb, documents_version):
+    return load_or_build_catalog(_kb.ingested(is_timetable_file))
+
+CATALOG_VERSION = kb_documents_version(KB, is_timetable_file)
+COURSE_CATALOG = load_course_catalog(KB, CATALOG_VERSION)
+
+# 수강신청자료집의 졸업이수학점 표 (Parquet). 졸업 가능/위험/불가 판정은 LLM이 아니라 이 표로 계산
+# 학과 -> 단과대학 매핑은 과목 테이블에서 가져오므로 과목 테이블 버전도 캐시 키에 포함
+@st.cache_resource(show_spinner="졸업 요건 표를 정리 중입니다...", max_entries=1)
+def load_graduation_rules(_kb, documents_version, _catalog, catalog_version):
+    df, required = load_or_build_rules(_kb.ingested(is_handbook_file))
+    if df is None:
+        return None
+    department_colleges = {}
+    if _catalog is not None:
+        depts = _catalog.df.reset_index()[["department", "college"]].drop_duplicates()
+        department_colleges = {d: c for d, c in depts.itertuples(index=False) if c and not d.endswith("공통")}
+    return GraduationRules(df, department_colleges, required=required)
+
+GRADUATION_RULES = load_graduation_rules(KB, kb_documents_version(KB, is_handbook_file), COURSE_CATALOG, CATALOG_VERSION)
 
-PRE_LEARNED_DATA = load_knowledge_base()
 
 # -----------------------------------------------------------------------------
 # [1] AI 엔진 (gemini-2.5-flash-preview-09-2025)
 # -----------------------------------------------------------------------------
+LLM_MODEL = DEFAULT_MODEL
+
+# 문서 컨텍스트 전달 방식
+#  - retrieval: 질문별 검색 상위 k개 문단을 프롬프트에 직접 포함 (기본)
+#  - cached_corpus: 문서 전체를 버전별 컨텍스트 캐시로 한 번 등록하고 핸들만 참조
+CONTEXT_MODE = get_setting("KW_CONTEXT_MODE", "retrieval")
+# gemini: 실제 API / local: 오프라인 대역 (캐시 적중/미스와 과금 토큰을 기록)
+LLM_BACKEND = get_setting("KW_LLM_BACKEND", "gemini")
+CACHED_CORPUS_NOTE = "(학사 문서 전체는 캐시된 컨텍스트로 제공됨)"
+
+@st.cache_resource
+def get_context_cache():
+    backend = LocalContextCacheBackend() if LLM_BACKEND == "local" else GeminiContextCacheBackend(api_key)
+    return TELEMETRY.watch("context_cache", ContextCacheManager(backend), "hits", "misses")
+
+# 프로세스 전역 클라이언트 레지스트리: 모든 세션이 같은 인스턴스(연결 풀)를 공유
+@st.cache_resource
+def get_llm_registry():
+    factory = None
+    if LLM_BACKEND == "local":
+        backend = get_context_cache().backend
+        factory = lambda model, cached_content, config: LocalStandInChatModel(backend=backend, cached_content=cached_content,
+                                                                              callbacks=config.get("callbacks"))
+    max_in_flight = int(get_setting("KW_LLM_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    # 모든 클라이언트에 계측 콜백을 붙여 요청 수/프롬프트 글자 수/입출력 토큰을 집계
+    registry = LLMClientRegistry(api_key, max_in_flight=max_in_flight, factory=factory,
+                                 callbacks=[TelemetryCallbackHandler(TELEMETRY)])
+    return TELEMETRY.watch("llm", registry, "in_flight", "peak_in_flight", "created")
+
+def make_llm(cached_content=None, scope=""):
+    return get_llm_registry().get(LLM_MODEL, cached_content, scope=scope)
+
 def get_llm():
     if not api_key: return None
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-09-2025", temperature=0)
+    return make_llm()
 
 def get_pro_llm():
     if not api_key: return None
-    return ChatGoogleGenerativeAI(model="gemini-2.5-flash-preview-09-2025", temperature=0)
-
-def ask_ai(question):
-    llm = get_llm()
-    if not llm: return "⚠️ API Key 오류"
-    def _execute():
-        chain = PromptTemplate.from_template(
-            "문서 내용: {context}\n질문: {question}\n문서에 기반해 답변해줘. 답변할 때 근거가 되는 문서의 원문 내용을 반드시 \" \" (쌍따옴표) 안에 인용해서 포함해줘."
-        ) | llm
-        return chain.invoke({"context": PRE_LEARNED_DATA, "question": question}).content
+    return make_llm()
+
+@traced("prompt.context")
+def llm_with_context(query, k=RETRIEVAL_TOP_K, semester="", doc_types=None):
+    """(llm, 프롬프트용 문서 컨텍스트) - 캐시 모드면 해당 학기 코퍼스 캐시 핸들을 붙인 llm, 아니면 그 학기 검색 결과
+    semester: 시간표 빌더의 '1학기'/'2학기' 선택값 (질문에 학기가 적혀 있으면 그쪽이 우선)"""
+    term = KB.resolve_term(query, semester)
+    partition = KB.partition(term)
+    if CONTEXT_MODE == "cached_corpus" and partition is not None:
+        try:
+            handle = get_context_cache().get_handle(LLM_MODEL, partition.version, partition.corpus_text, scope=term)
+            return make_llm(cached_content=handle, scope=term), CACHED_CORPUS_NOTE
+        except Exception as e:
+            print(f"Context cache error: {e}")
+    return make_llm(), retrieve_context(query, k, term, doc_types)
+
+# 응답 캐시 (LRU + SQLite). 키에 문서 버전이 들어가므로 동기화 후에는 자동으로 새 답변 생성
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+RESPONSE_CACHE = get_response_cache()
+
+def run_cached(chain_name, question, func, extra="", priority=PRIORITY_INTERACTIVE, validate=None):
+    """validate(result): 저장 전 검사 - 예외가 나면 캐시하지 않고 그대로 전파 (깨진 응답이 TTL 동안 재사용되지 않도록)"""
+    key = make_response_key(chain_name, question, f"{LLM_MODEL}:{CONTEXT_MODE}", KB_VERSION, extra)
+    cached = RESPONSE_CACHE.get(key)
+    TELEMETRY.count("cache.response.hit" if cached is not None else "cache.response.miss")
+    if cached is not None:
+        return cached
+    result = run_with_retry(func, priority=priority)
+    if validate is not None:
+        validate(result)
+    RESPONSE_CACHE.set(key, result, chain=chain_name)
+    return result
+
+# ★ 스트리밍 출력 ★ 첫 토큰이 나오기 전까지는 run_with_retry와 같은 재시도 규칙 적용
+def _chunk_text(chunk):
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+def stream_with_retry(make_stream):
+    """llm.first_token: 요청부터 첫 토큰까지(대기열/재시도 포함), llm.stream: 마지막 토큰까지"""
+    attempts = []
+
+    def _start():
+        # 시도마다 동시 요청 자리를 잡고(대기열/백오프 중에는 점유하지 않음), 성공하면 스트림이 끝날 때까지 유지
+        attempts.append(None)
+        held = ExitStack()
+        held.enter_context(get_llm_registry().slot())
+        try:
+            iterator = iter(make_stream())
+            return next(iterator, None), iterator, held
+        except BaseException:
+            held.close()
+            raise
     try:
-        return run_with_retry(_execute)
+        with span("llm.stream"):
+            with span("llm.first_token"):
+                first, iterator, held = get_request_scheduler().run(_start, PRIORITY_INTERACTIVE)
+            with held:
+                if first is not None:
+                    yield _chunk_text(first)
+                for chunk in iterator:
+                    yield _chunk_text(chunk)
+    finally:
+        if len(attempts) > 1:
+            TELEMETRY.count("llm.retries", len(attempts) - 1)
+
+def stream_cached(chain_name, question, make_stream, extra="", busy_message="⚠️ **사용량 초과**: 잠시 후 다시 시도해주세요."):
+    """캐시 적중 시 저장된 답변을 한 번에, 아니면 토큰 단위로 내보내고 완료 후 저장"""
+    key = make_response_key(chain_name, question, f"{LLM_MODEL}:{CONTEXT_MODE}", KB_VERSION, extra)
+    cached = RESPONSE_CACHE.get(key)
+    TELEMETRY.count("cache.response.hit" if cached is not None else "cache.response.miss")
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    try:
+        for text in stream_with_retry(make_stream):
+            parts.append(text)
+            yield text
     except Exception as e:
         if "RESOURCE_EXHAUSTED" in str(e):
-            return "⚠️ **잠시만요!** 사용량이 많아 AI가 숨을 고르고 있습니다. 1분 뒤에 다시 시도해주세요."
-        return f"❌ AI 오류: {str(e)}"
+            yield busy_message
+        else:
+            yield f"❌ AI 오류: {str(e)}"
+        return
+    RESPONSE_CACHE.set(key, "".join(parts), chain=chain_name)
+
+def chain_stream(build_chain, *args):
+    """make_stream용: 캐시 미스로 호출될 때에만 체인 구성(검색/컨텍스트 캐시 핸들 조회) 후 스트림 시작
+    구성 중 오류도 stream_cached 안에서 나므로 '❌ AI 오류' 안내로 처리됨"""
+    chain, inputs = build_chain(*args)
+    return chain.stream(inputs)
+
+ASK_BUSY_MESSAGE = "⚠️ **잠시만요!** 사용량이 많아 AI가 숨을 고르고 있습니다. 1분 뒤에 다시 시도해주세요."
+
+# 모든 프롬프트는 문서 컨텍스트(정적 접두부)를 맨 앞에 두고, 질문 등 가변 부분을 뒤에 둠
+def _build_ask_chain(question):
+    llm, context = llm_with_context(question)
+    chain = PromptTemplate.from_template(
+        "문서 내용: {context}\n질문: {question}\n문서에 기반해 답변해줘. 답변할 때 근거가 되는 문서의 원문 내용을 반드시 \" \" (쌍따옴표) 안에 인용하고, [출처] 표기의 문서명과 페이지도 함께 적어줘."
+    ) | llm
+    return chain, {"context": context, "question": question}
+
+def stream_ask_ai(question):
+    if not api_key:
+        yield "⚠️ API Key 오류"
+        return
+    yield from stream_cached("ask_ai", question, lambda: chain_stream(_build_ask_chain, question),
+                             busy_message=ASK_BUSY_MESSAGE)
 
 # =============================================================================
 # [Helper Functions] 인터랙티브 시간표 & AI 데이터 추출 (Strict Fact-Based)
 # =============================================================================
 
-# 1. 시간 충돌 감지 로직
-def check_time_conflict(new_course, current_schedule):
-    new_slots = set(new_course.get('time_slots', []))
-    for existing in current_schedule:
-        existing_slots = set(existing.get('time_slots', []))
-        overlap = new_slots & existing_slots
-        if overlap:
-            return True, existing['name']
-    return False, None
+# 1. 시간 충돌 감지 로직 (슬롯 비트마스크 AND 한 번으로 판정)
+def check_time_conflict(new_course, current_schedule, occupied_mask=None):
+    new_mask = course_mask(new_course)
+    if occupied_mask is None:
+        occupied_mask = schedule_mask(current_schedule)
+    if not new_mask & occupied_mask:
+        return False, None
+    # 충돌이 있을 때만 어느 과목과 겹치는지 찾음
+    existing = find_conflict(new_mask, current_schedule)
+    return True, existing['name'] if existing else None
 
 # [수정] 시간표 렌더링 함수 (과목별 알록달록 색상 적용)
+# 같은 시간표는 지문으로 캐시된 HTML 재사용 (rerun마다 다시 만들지 않음), 색상은 과목명 기준으로 세션/서버와 무관하게 고정
+@st.cache_resource
+def get_timetable_renderer():
+    return TELEMETRY.watch("render.cache", TimetableRenderer(), "hits", "misses")
+
+@traced("render.timetable")
 def render_interactive_timetable(schedule_list):
     """
     schedule_list에 있는 과목들을 9교시 HTML 테이블로 매핑하여 렌더링
-    (과목명에 따라 고유한 파스텔톤 배경색 적용)
-    """
-    days = ["월", "화", "수", "목", "금"]
-    
-    # 1. 그리드 초기화 (텍스트와 배경색을 함께 저장하도록 구조 변경)
-    # 기본 배경색은 흰색(#ffffff)
-    table_grid = {i: {d: {"text": "", "bg": "#ffffff"} for d in days} for i in range(1, 10)}
-    online_courses = []
-
-    # 2. 예쁜 파스텔톤 색상 팔레트 (8가지)
-    # 핑크, 블루, 그린, 퍼플, 오렌지, 틸, 라벤더, 옐로우
-    palette = [
-        "#FFEBEE", "#E3F2FD", "#E8F5E9", "#F3E5F5", 
-        "#FFF3E0", "#E0F2F1", "#FCE4EC", "#FFF8E1"
-    ]
-
-    # 3. 데이터 채우기
-    for course in schedule_list:
-        slots = course.get('time_slots', [])
-        
-        # 온라인/시간미정 처리
-        if not slots or slots == ["시간미정"] or not isinstance(slots, list):
-            online_courses.append(course)
-            continue
-
-        # [핵심] 과목명에 따라 고정된 색상 배정 (Hash 사용)
-        # 같은 과목은 항상 같은 색으로 나오도록 함
-        color_index = abs(hash(course['name'])) % len(palette)
-        course_bg = palette[color_index]
-
-        # 슬롯 파싱 (예: "월3" -> 요일="월", 교시=3)
-        for slot in slots:
-            if len(slot) < 2: continue
-            day_char = slot[0] # "월"
-            try:
-                period = int(slot[1:]) # "3"
-                if day_char in days and 1 <= period <= 9:
-                    # 셀 내용 구성
-                    content = f"<b>{course['name']}</b><br><small>{course['professor']}</small>"
-                    # 그리드에 텍스트와 계산된 색상 저장
-                    table_grid[period][day_char] = {"text": content, "bg": course_bg}
-            except:
-                pass 
-
-    # 4. HTML 생성
-    html = """
-    <table border="1" width="100%" style="border-collapse: collapse; text-align: center; font-size: 12px; border-color: #ddd;">
-        <tr style="background-color: #f8f9fa; color: #333;">
-            <th width="10%">교시</th><th width="18%">월</th><th width="18%">화</th><th width="18%">수</th><th width="18%">목</th><th width="18%">금</th>
-        </tr>
-    """
-    
-    for i in range(1, 10):
-        html += f"<tr><td style='background-color: #f8f9fa; font-weight:bold; color: #555;'>{i}</td>"
-        for day in days:
-            cell = table_grid[i][day]
-            bg_color = cell['bg']
-            cell_content = cell['text']
-            
-            # 내용이 있으면 테두리와 색상 적용
-            border_style = "border: 1px solid #ddd;"
-            
-            html += f"<td style='background-color: {bg_color}; {border_style} height: 45px; vertical-align: middle; color: #333;'>{cell_content}</td>"
-        html += "</tr>"
-
-    # 온라인 강의 행 추가
-    if online_courses:
-        online_items = []
-        for c in online_courses:
-            # 온라인 강의도 색상 적용
-            c_color = palette[abs(hash(c['name'])) % len(palette)]
-            online_items.append(f"<span style='background-color:{c_color}; padding:2px 6px; border-radius:4px;'>{c['name']}</span>")
-        
-        online_text = " ".join(online_items)
-        html += f"<tr><td style='background-color: #f8f9fa;'><b>온라인</b></td><td colspan='5' style='text-align: left; padding: 8px;'>{online_text}</td></tr>"
-        
-    html += "</table>"
-    return html
-
-# 3. AI 후보군 추출 (엄격한 데이터 파싱 - 주관 배제)
-def get_course_candidates_json(major, grade, semester, diagnosis_text=""):
-    llm = get_llm()
-    if not llm: return []
-
-    # [수정] Career/Recommendation 배제 및 전수 조사 중심 프롬프트
-    prompt_template = """
-    너는 [대학교 학사 데이터베이스 파서]이다. 
-    제공된 [수강신청자료집/시간표 문서]를 분석하여 **{major} {grade} {semester}** 학생이 수강 가능한 **모든 정규 개설 과목**을 JSON 리스트로 추출하라.
-    
-    [학생 정보]
-    - 전공: {major}
-    - 대상: {grade} {semester}
-    
-    [진단 결과 (재수강 체크용)]
-    {diagnosis_context}
-    
-    [엄격한 제약 사항]
-    1. **주관적 추천 금지:** "취업에 유리함", "커리어 도움됨" 같은 추측성 설명은 절대 하지 마라.
-    2. **전수 조사:** 해당 학과/학년/학기에 배정된 과목은 하나도 빠뜨리지 말고 모두 포함하라. (분반이 다르면 모두 포함)
-    3. **제외 대상:** 타 학과 전용 과목, 해당 학년 대상이 아닌 과목은 리스트에서 제외하라.
-    4. **Reason 필드 작성 규칙:** - 기본적으로 **"이수구분(전공필수/선택/교양) | 학점"** 형식의 팩트만 적어라.
-       - 단, [진단 결과]에 "재수강"이 명시된 과목은 **"재수강 필수 대상"**이라고 적어라.
-    5. **Priority 설정:**
-       - 전공필수 또는 재수강 과목 = "High"
-       - 전공선택 = "Medium"
-       - 교양/기타 = "Normal"
-    
-    [JSON 출력 포맷 예시]
-    [
-        {{
-            "id": "unique_id_1",
-            "name": "회로이론1",
-            "professor": "김광운",
-            "credits": 3,
-            "time_slots": ["월3", "수4"],
-            "classification": "전공필수",
-            "priority": "High", 
-            "reason": "전공필수 | 3학점"
-        }},
-         {{
-            "id": "unique_id_2",
-            "name": "대학영어",
-            "professor": "Smith",
-            "credits": 2,
-            "time_slots": ["화1", "목1"],
-            "classification": "교양필수",
-            "priority": "Normal", 
-            "reason": "교양필수 | 2학점"
-        }}
-    ]
-    
-    **오직 JSON 리스트만 출력하라.**
-    [문서 데이터]
-    {context}
+    (과목명에 따라 고유한 파스텔톤 배경색 적용, 연속 교시는 한 칸으로 병합)
     """
-    
+    return get_timetable_renderer().render(schedule_list)
+
+# 2. 과목 테이블에서 후보군 조회 (LLM 호출 없음)
+def get_catalog_candidates(major, grade, semester):
+    build = catalog_builder(COURSE_CATALOG)
+    return build(major, grade, semester) if build else []
+
+# 3. AI 후보군 추출 (엄격한 데이터 파싱 - 주관 배제) - 과목 테이블에 없는 학과용 대체 경로
+#    진단 결과는 넣지 않음: 결과를 모든 학생이 공유하고, 재수강 표시는 조회 후 mark_retakes로 덧씌움
+def get_course_candidates_json(major, grade, semester):
+    if not api_key: return []
+
     def _execute():
-        chain = PromptTemplate.from_template(prompt_template) | llm
+        llm, context = llm_with_context(candidate_query(major, grade, semester), k=RETRIEVAL_TOP_K_SCAN, semester=semester)
+        chain = PromptTemplate.from_template(CANDIDATE_EXTRACTION_PROMPT) | llm
         return chain.invoke({
             "major": major,
             "grade": grade,
             "semester": semester,
-            "diagnosis_context": diagnosis_text,
-            "context": PRE_LEARNED_DATA
+            "context": context
         }).content
 
     try:
-        response = run_with_retry(_execute)
-        cleaned_json = response.replace("```json", "").replace("```", "").strip()
-        if not cleaned_json.startswith("["):
-             start = cleaned_json.find("[")
-             end = cleaned_json.rfind("]")
-             if start != -1 and end != -1:
-                 cleaned_json = cleaned_json[start:end+1]
-        return json.loads(cleaned_json)
+        response = run_cached("course_candidates", f"{major} {grade} {semester}", _execute, priority=PRIORITY_BULK,
+                              validate=parse_candidates_json)
+        return parse_candidates_json(response)
     except Exception as e:
         print(f"JSON Parsing Error: {e}")
         return []
 
-def chat_with_timetable_ai(current_timetable, user_input, major, grade, semester):
-    llm = get_llm()
-    def _execute():
-        template = """
-        너는 현재 시간표에 대한 상담을 해주는 AI 조교야.
-        [현재 시간표 상태]
-        {current_timetable}
-        [사용자 입력]
-        "{user_input}"
-        [학생 정보]
-        - 소속: {major}
-        - 학년/학기: {grade} {semester}
-        [지시사항]
-        사용자의 입력 의도를 파악해서 답변해.
-        [문서 근거 필수] 문서 내용을 인용할 땐 " " 안에 넣어.
-        [학습된 문서]
-        {context}
-        """
-        prompt = PromptTemplate(template=template, input_variables=["current_timetable", "user_input", "major", "grade", "semester", "context"])
-        chain = prompt | llm
-        return chain.invoke({
-            "current_timetable": current_timetable, 
-            "user_input": user_input,
-            "major": major,
-            "grade": grade,
-            "semester": semester,
-            "context": PRE_LEARNED_DATA
-        }).content
-    try:
-        return run_with_retry(_execute)
-    except Exception as e:
-        if "RESOURCE_EXHAUSTED" in str(e):
-            return "⚠️ **사용량 초과**: 잠시 후 다시 시도해주세요."
-        return f"❌ AI 오류: {str(e)}"
+# 4. 사전 계산 저장소: (문서 버전, 학과, 학년, 학기) -> 공통 후보 리스트
+@st.cache_resource
+def get_candidate_store():
+    return TELEMETRY.watch("candidate_store", CandidateStore(), "hits", "misses")
+
+def build_shared_candidates(major, grade, semester):
+    llm_fn = get_course_candidates_json if api_key else None
+    return combined_builder(get_catalog_candidates, llm_fn)(major, grade, semester)
+
+@traced("builder.load_candidates")
+def load_candidates(major, grade, semester, diagnosis_text="", retakes=None):
+    """저장소에서 조회(없으면 만들어 저장) 후 학생별 재수강 표시와 시간 마스크만 적용
+    retakes: 진단과 함께 저장된 재수강 과목명 목록. 없으면(예전 진단) 본문에서 '재수강'과 같은 줄에 있는 과목만"""
+    store = get_candidate_store()
+    shared = store.get(KB_VERSION, major, grade, semester)
+    if shared is None:
+        shared, source = build_shared_candidates(major, grade, semester)
+        if shared:
+            store.put(KB_VERSION, major, grade, semester, shared, source=source)
+    if retakes is None:
+        retakes = retakes_in_text([c["name"] for c in shared], diagnosis_text)
+    return attach_masks(mark_retakes(shared, retakes))
+
+# 문서 버전마다 한 번, 모든 (학과, 학년, 학기) 조합을 백그라운드에서 미리 계산 (프로세스당 1회)
+# 기본은 과목 테이블 경로만. KW_PRECOMPUTE_LLM=1 이면 테이블에 없는 학과도 LLM으로 미리 추출
+@st.cache_resource
+def get_precompute_jobs():
+    return {}
+
+def ensure_precomputed():
+    jobs = get_precompute_jobs()
+    if KB_VERSION in jobs or not KB_VERSION:
+        return jobs.get(KB_VERSION)
+    # 스레드에는 스크립트 실행 컨텍스트가 없으므로 cache_resource 조회/설정 읽기는 여기서 끝내고 객체만 넘김
+    use_llm = str(get_setting("KW_PRECOMPUTE_LLM", "0")) == "1" and bool(api_key)
+    llm_fn = llm_builder(KB, get_llm_registry(), get_request_scheduler(), LLM_MODEL) if use_llm else None
+    builder = combined_builder(catalog_builder(COURSE_CATALOG), llm_fn)
+    store, version = get_candidate_store(), KB_VERSION
+    max_workers = int(get_setting("KW_PRECOMPUTE_WORKERS", DEFAULT_WORKERS))
+    job = {"version": version, "report": None}
+
+    def _run():
+        report = precompute(store, version, builder, max_workers=max_workers)
+        store.prune(version)
+        job["report"] = report
+        print(f"[precompute] {version}: {report.summary()}")
+
+    jobs[version] = job
+    threading.Thread(target=_run, name="candidate-precompute", daemon=True).start()
+    return job
+
+ensure_precomputed()
+
+def _build_timetable_chain(current_timetable, user_input, major, grade, semester):
+    llm, context = llm_with_context(f"{user_input} {major} {grade}", semester=semester)
+    template = """
+    [학습된 문서]
+    {context}
+
+    너는 현재 시간표에 대한 상담을 해주는 AI 조교야.
+    [현재 시간표 상태]
+    {current_timetable}
+    [사용자 입력]
+    "{user_input}"
+    [학생 정보]
+    - 소속: {major}
+    - 학년/학기: {grade} {semester}
+    [지시사항]
+    사용자의 입력 의도를 파악해서 답변해.
+    [문서 근거 필수] 문서 내용을 인용할 땐 " " 안에 넣어.
+    """
+    prompt = PromptTemplate(template=template, input_variables=["current_timetable", "user_input", "major", "grade", "semester", "context"])
+    return prompt | llm, {
+        "current_timetable": current_timetable, 
+        "user_input": user_input,
+        "major": major,
+        "grade": grade,
+        "semester": semester,
+        "context": context
+    }
+
+def stream_timetable_ai(current_timetable, user_input, major, grade, semester):
+    if not api_key:
+        yield "⚠️ API Key 오류"
+        return
+    yield from stream_cached("timetable_chat", user_input,
+                             lambda: chain_stream(_build_timetable_chain, current_timetable, user_input, major, grade, semester),
+                             extra=f"{major}|{grade}|{semester}|{current_timetable}")
+
+# 5. 시간표 빌더 목록/시간표 조작 (버튼 on_click 콜백 -> 상태 변경 후 fragment만 다시 그림)
+BUILDER_PAGE_SIZE = 20
+
+def add_candidate(course):
+    conflict, conflict_name = check_time_conflict(course, st.session_state.my_schedule, st.session_state.schedule_mask)
+    if conflict:
+        st.session_state.builder_notice = f"⚠️ 시간 충돌! '{conflict_name}' 수업과 겹칩니다."
+    else:
+        st.session_state.my_schedule.append(course)
+        st.session_state.schedule_mask |= course_mask(course)
+
+def remove_schedule_item(idx):
+    st.session_state.my_schedule.pop(idx)
+    st.session_state.schedule_mask = schedule_mask(st.session_state.my_schedule)
+
+def clear_schedule():
+    st.session_state.my_schedule = []
+    st.session_state.schedule_mask = 0
+
+def saved_timetable_resolver(major, grade):
+    """기존(v1) HTML 문서의 과목을 과목 테이블에서 찾아 id/학점을 채우는 콜백 (학기 정보가 없어 전 학기 검색)"""
+    return catalog_resolver([c for sem in SEMESTERS for c in get_catalog_candidates(major, grade, sem)])
+
+def load_saved_timetable(doc):
+    """저장된 시간표를 빌더로 불러옴: 해당 학과/학년/학기 후보 목록과 함께 my_schedule에 채움 (v1 문서는 변환해 다시 저장)"""
+    major, grade = doc.get("major", ""), doc.get("grade", "")
+    semester = doc.get("semester") or st.session_state.get("tt_semester", SEMESTERS[0])
+    if schema_version(doc) < SCHEMA_VERSION:
+        migrated = migrate_document(doc, saved_timetable_resolver(major, grade))
+        migrated.pop("updated_at", None)
+        fb_manager.save_data('timetables', doc["id"], dict(migrated))
+        doc = {**migrated, "id": doc["id"]}
+    schedule = decode_timetable(doc)
+    candidates = load_candidates(major, grade, semester) if major in KW_DEPARTMENTS and grade in GRADES else []
+    for key, value, options in (("tt_major", major, KW_DEPARTMENTS), ("tt_grade", grade, GRADES), ("tt_semester", semester, SEMESTERS)):
+        if value in options:
+            st.session_state[key] = value
+    # 후보 목록이 없으면(과목 테이블에 없는 학과 등) 불러온 과목만으로 빌더를 띄움
+    st.session_state.candidate_courses = candidates or list(schedule)
+    st.session_state.candidate_frame = build_candidate_frame(st.session_state.candidate_courses)
+    st.session_state.my_schedule = schedule
+    st.session_state.schedule_mask = schedule_mask(schedule)
+    st.session_state.solver_results = []
+    st.session_state.current_timetable_meta = {"id": doc["id"], "name": doc.get("name", ""), "is_favorite": doc.get("is_favorite", False)}
+
+def _move_page(key, delta):
+    st.session_state[key] = st.session_state.get(key, 0) + delta
+
+def paginate(rows, key, page_size=BUILDER_PAGE_SIZE):
+    """rows 중 현재 페이지 구간만 반환하고, 2쪽 이상이면 이전/다음 버튼 표시 (필터로 행이 줄면 마지막 쪽으로 보정)"""
+    pages = max(1, -(-len(rows) // page_size))
+    page = min(max(st.session_state.get(key, 0), 0), pages - 1)
+    st.session_state[key] = page
+    if pages > 1:
+        p1, p2, p3 = st.columns([0.25, 0.5, 0.25])
+        p1.button("◀", key=f"{key}_prev", disabled=page == 0, on_click=_move_page, args=(key, -1), use_container_width=True)
+        p2.caption(f"{page + 1} / {pages}쪽 · {len(rows)}개")
+        p3.button("▶", key=f"{key}_next", disabled=page == pages - 1, on_click=_move_page, args=(key, 1), use_container_width=True)
+    return rows[page * page_size:(page + 1) * page_size]
+
+# [UI 컴포넌트] 인사이트 컴팩트 로우 (Insight Compact Row)
+def draw_course_row(course, key_prefix):
+    # Highlight Logic
+    priority = course.get('priority', 'Normal')
+    border_color = "#ddd"
+    reason_bg = "#f1f3f5" # 기본 회색
+
+    if priority == 'High':
+        border_color = "#ffcccc" # 붉은 테두리
+        reason_bg = "#ffebee" # 붉은 배경 (이유)
+    elif priority == 'Medium':
+        border_color = "#cce5ff" # 파란 테두리
+        reason_bg = "#e3f2fd" # 파란 배경
+
+    with st.container(border=True):
+        c_info, c_btn = st.columns([0.85, 0.15])
+
+        with c_info:
+            time_str = ', '.join(course['time_slots']) if course['time_slots'] else "시간미정"
+            info_html = f"""
+            <div style="line-height:1.2;">
+                <span style="font-weight:bold; font-size:16px;">{course['name']}</span>
+                <span style="font-size:13px; color:#555;">({course['credits']}학점) | {course['professor']} | {time_str}</span>
+            </div>
+            """
+            st.markdown(info_html, unsafe_allow_html=True)
+
+            # 2열: Fact Reason (Why)
+            if course.get('reason'):
+                reason_html = f"""
+                <div style="background-color:{reason_bg}; color:#333; padding:2px 8px; border-radius:4px; font-size:12px; margin-top:4px; display:inline-block;">
+                    💡 {course['reason']}
+                </div>
+                """
+                st.markdown(reason_html, unsafe_allow_html=True)
+
+        with c_btn:
+            st.write("")
+            st.button("➕", key=f"ad_{key_prefix}_{course['id']}", type="primary", help="담기", on_click=add_candidate, args=(course,))
 
 # =============================================================================
 # [섹션] 성적 및 진로 진단 분석 함수
 # =============================================================================
-def analyze_graduation_requirements(uploaded_images):
-    llm = get_pro_llm()
-    if not llm: return "⚠️ API Key 오류"
-
-    def encode_image(image_file):
-        image_file.seek(0)
-        return base64.b64encode(image_file.read()).decode("utf-8")
-
-    image_messages = []
-    for img_file in uploaded_images:
-        base64_image = encode_image(img_file)
-        image_messages.append({
-            "type": "image_url",
-            "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}
-        })
-
-    def _execute():
-        prompt = """
-        당신은 [냉철하고 현실적인 대기업 인사담당자 출신의 취업 컨설턴트]입니다.
-        제공된 학생의 [성적표 이미지]와 [학습된 학사 문서]를 바탕으로 3가지 측면에서 분석 결과를 작성해주세요.
-        
-        **[핵심 지시사항 - 중요]**
-        - 단순히 "열심히 하세요" 같은 뜬구름 잡는 조언은 하지 마십시오.
-        - **반드시** 삼성전자, SK하이닉스, 현대자동차, 네이버, 카카오 등 **실제 한국 주요 대기업의 실명과 구체적인 직무명(JD)**을 언급하며 조언하세요.
-        - 예: "삼성전자 DS부문 메모리사업부의 공정기술 직무에서는 반도체공학 A학점 이상을 선호하지만, 현재 학생의 성적은 B+이므로..." 와 같이 구체적으로 비교하세요.
-
-        **[출력 형식]**
-        반드시 아래의 구분자(`[[SECTION: ...]]`)를 사용하여 답변을 3개의 구역으로 명확히 나누세요.
-
-        [[SECTION:GRADUATION]]
-        ### 🎓 1. 졸업 요건 정밀 진단
-        - [학습된 학사 문서]의 규정과 비교하여 졸업 가능 여부를 판정하세요.
-        - 부족한 학점(전공, 교양 등)과 미이수 필수 과목을 표나 리스트로 정리하세요.
-        - **종합 판정:** [졸업 가능 / 위험 / 불가]
-
-        [[SECTION:GRADES]]
-        ### 📊 2. 성적 정밀 분석
-        - **전체 평점 vs 전공 평점 비교:** 전공 학점이 전체보다 낮은지 확인하고 질책하세요. (직무 전문성 결여 지적)
-        - **재수강 권고:** C+ 이하의 전공 핵심 과목이 있다면 구체적으로 지적하며 재수강을 강력히 권고하세요.
-        - **수강 패턴 분석:** 꿀강(학점 따기 쉬운 교양) 위주로 들었는지, 기피 과목(어려운 전공)을 피했는지 간파하고 지적하세요.
-
-        [[SECTION:CAREER]]
-        ### 💼 3. AI 커리어 솔루션 (대기업 JD 매칭)
-        - **직무 추천:** 학생의 수강 내역(회로 위주, SW 위주 등)을 분석하여 가장 적합한 **구체적인 대기업 직무**를 2~3개 추천하세요. (예: 삼성전자 회로설계, 현대모비스 임베디드SW 등)
-        - **Skill Gap 분석:** 해당 직무의 시장 요구사항(대기업 채용 기준) 대비 현재 부족한 점을 냉정하게 꼬집으세요.
-        - **Action Plan:** 남은 학기에 반드시 수강해야 할 과목이나, 학교 밖에서 채워야 할 경험(프로젝트, 기사 자격증 등)을 구체적으로 지시하세요.
-
-        [학습된 학사 문서]
-        """
-        
-        content_list = [{"type": "text", "text": prompt}]
-        content_list.extend(image_messages)
-        content_list.append({"type": "text", "text": f"\n\n{PRE_LEARNED_DATA}"})
-
-        message = HumanMessage(content=content_list)
-        response = llm.invoke([message])
-        return response.content
+# 성적표 진단 프롬프트: 이미지별 추출 1종 + 섹션별 작성 3종 (각각 동시에 요청)
+TRANSCRIPT_EXTRACTION_PROMPT = """
+이 이미지는 대학 성적표(또는 그 일부) 캡처입니다. 보이는 모든 과목 행을 빠짐없이 읽어 JSON 리스트로만 출력하세요.
+[{"term": "2024-1", "name": "회로이론1", "classification": "전공필수", "credits": 3, "grade": "B+"}]
+- term: "연도-학기" 형식 (계절학기는 "2024-S", "2024-W")
+- classification: 전공필수/전공선택/교양필수/교양선택/기초필수/기초선택/일반선택 중 표기된 그대로
+- grade: A+, A0, B+, B0, C+, C0, D+, D0, F, P, NP 중 하나
+과목 행이 없으면 [] 를 출력하세요. 설명은 붙이지 마세요.
+"""
+
+DIAGNOSIS_PERSONA_PROMPT = """
+당신은 [냉철하고 현실적인 대기업 인사담당자 출신의 취업 컨설턴트]입니다.
+아래 [성적 집계 결과]와 [학습된 학사 문서]를 바탕으로 지정된 한 가지 측면만 분석 결과를 작성해주세요.
+
+**[핵심 지시사항 - 중요]**
+- 단순히 "열심히 하세요" 같은 뜬구름 잡는 조언은 하지 마십시오.
+- **반드시** 삼성전자, SK하이닉스, 현대자동차, 네이버, 카카오 등 **실제 한국 주요 대기업의 실명과 구체적인 직무명(JD)**을 언급하며 조언하세요.
+- 예: "삼성전자 DS부문 메모리사업부의 공정기술 직무에서는 반도체공학 A학점 이상을 선호하지만, 현재 학생의 성적은 B+이므로..." 와 같이 구체적으로 비교하세요.
+- 구분자(`[[SECTION: ...]]`)는 출력하지 마세요.
+"""
+
+DIAGNOSIS_SECTION_PROMPTS = {
+    "GRADUATION": """
+### 🎓 1. 졸업 요건 정밀 진단
+- [졸업 요건 판정 결과]가 주어졌다면 그 판정과 부족 학점은 확정값입니다. 다시 계산하거나 판정을 바꾸지 말고,
+  표를 반복하지도 말고, 부족분을 남은 학기에 어떻게 채울지(학기별 수강 계획, 미이수 필수 과목)만 서술하세요.
+- [졸업 요건 판정 결과]가 없다면 [학습된 학사 문서]의 규정과 비교하여 졸업 가능 여부를 판정하고,
+  부족한 학점(전공, 교양 등)과 미이수 필수 과목을 표나 리스트로 정리한 뒤 **종합 판정:** [졸업 가능 / 위험 / 불가]를 적으세요.
+""",
+    "GRADES": """
+### 📊 2. 성적 정밀 분석
+- **전체 평점 vs 전공 평점 비교:** 전공 학점이 전체보다 낮은지 확인하고 질책하세요. (직무 전문성 결여 지적)
+- **재수강 권고:** C+ 이하의 전공 핵심 과목이 있다면 구체적으로 지적하며 재수강을 강력히 권고하세요.
+- **수강 패턴 분석:** 꿀강(학점 따기 쉬운 교양) 위주로 들었는지, 기피 과목(어려운 전공)을 피했는지 간파하고 지적하세요.
+""",
+    "CAREER": """
+### 💼 3. AI 커리어 솔루션 (대기업 JD 매칭)
+- **직무 추천:** 학생의 수강 내역(회로 위주, SW 위주 등)을 분석하여 가장 적합한 **구체적인 대기업 직무**를 2~3개 추천하세요. (예: 삼성전자 회로설계, 현대모비스 임베디드SW 등)
+- **Skill Gap 분석:** 해당 직무의 시장 요구사항(대기업 채용 기준) 대비 현재 부족한 점을 냉정하게 꼬집으세요.
+- **Action Plan:** 남은 학기에 반드시 수강해야 할 과목이나, 학교 밖에서 채워야 할 경험(프로젝트, 기사 자격증 등)을 구체적으로 지시하세요.
+""",
+}
+
+@traced("diagnosis.analyze")
+def analyze_graduation_requirements(uploaded_images, department=None, admission_year=None):
+    if not api_key: return "⚠️ API Key 오류"
+
+    # 업로드 전 전처리: 포맷 판별, 여백 자르기/축소/재인코딩, 중복 캡처 제거
+    prep_report = prepare_images([img_file.getvalue() for img_file in uploaded_images])
+    st.session_state.image_prep_report = prep_report.summary()
+    st.session_state.diagnosis_failed_images = 0
+    st.session_state.graduation_retakes = None
+    print(f"[image_prep] {prep_report.summary()}")
+    image_messages = [{"type": "image_url", "image_url": {"url": img.data_url}} for img in prep_report.images]
+
+    # 정적 접두부(학사 문서) -> 공통 지시사항 -> 섹션별 지시사항/집계 결과 순
+    llm, grad_context = llm_with_context("졸업요건 졸업학점 전공학점 교양학점 필수과목 이수구분 재수강", k=RETRIEVAL_TOP_K_SCAN,
+                                         doc_types=(DOC_HANDBOOK,))
+    context_part = {"type": "text", "text": f"[학습된 학사 문서]\n{grad_context}\n\n"}
+
+    def extract_rows(image_message):
+        def _execute():
+            message = HumanMessage(content=[{"type": "text", "text": TRANSCRIPT_EXTRACTION_PROMPT}, image_message])
+            return llm.invoke([message]).content
+        return run_with_retry(_execute, priority=PRIORITY_BULK)
+
+    def write_section(section, summary_text):
+        def _execute():
+            prompt = f"{DIAGNOSIS_PERSONA_PROMPT}\n{DIAGNOSIS_SECTION_PROMPTS[section]}\n[성적 집계 결과]\n{summary_text}"
+            message = HumanMessage(content=[context_part, {"type": "text", "text": prompt}])
+            return llm.invoke([message]).content
+        return run_with_retry(_execute, priority=PRIORITY_BULK)
+
+    def judge(summary):
+        # 규칙표에 없는 학과/입학년도(2016 이전 등)는 None -> 판정도 LLM이 작성
+        if GRADUATION_RULES is None or not department or not admission_year:
+            return None
+        result = GRADUATION_RULES.evaluate(student_record(summary, department, admission_year))
+        return format_verdict(result) if result else None
 
     try:
-        return run_with_retry(_execute)
+        report = asyncio.run(analyze_transcripts(image_messages, extract_rows, write_section, verdict_fn=judge))
+        st.session_state.diagnosis_failed_images = report.summary.failed_images
+        st.session_state.graduation_retakes = list(report.summary.retake_candidates)
+        return report.text
     except Exception as e:
          if "RESOURCE_EXHAUSTED" in str(e):
             return "⚠️ **사용량 초과**: 잠시 후 다시 시도해주세요."
          return f"❌ AI 오류: {str(e)}"
 
 # 성적/진로 상담 및 수정 함수 (페르소나 유지)
-def chat_with_graduation_ai(current_analysis, user_input):
-    llm = get_llm()
-    def _execute():
-        template = """
-        당신은 냉철하고 독설적인 'AI 취업 컨설턴트'입니다.
-        학생의 성적 및 진로 진단 결과는 다음과 같습니다:
-        
-        [현재 진단 결과]
-        {current_analysis}
+def _build_graduation_chain(current_analysis, user_input):
+    llm, context = llm_with_context(user_input)
+    template = """
+    [참고 문헌]
+    {context}
 
-        [사용자 입력]
-        "{user_input}"
+    당신은 냉철하고 독설적인 'AI 취업 컨설턴트'입니다.
+    학생의 성적 및 진로 진단 결과는 다음과 같습니다:
+    
+    [현재 진단 결과]
+    {current_analysis}
 
-        [지시사항]
-        - 사용자의 질문에 대해 현실적이고 직설적으로 답변하세요. 위로는 필요 없습니다.
-        - 정보 수정 요청(예: "나 이 과목 들었어")이 들어오면 `[수정]` 태그를 붙이고 전체 진단 결과를 업데이트하세요.
-        - **기업 채용 관점**에서 답변하세요. "이 과목은 삼성전자가 좋아합니다/신경 안 씁니다" 식으로 설명하세요.
-        
-        [참고 문헌]
-        {context}
-        """
-        prompt = PromptTemplate(template=template, input_variables=["current_analysis", "user_input", "context"])
-        chain = prompt | llm
-        return chain.invoke({
-            "current_analysis": current_analysis,
-            "user_input": user_input,
-            "context": PRE_LEARNED_DATA
-        }).content
+    [사용자 입력]
+    "{user_input}"
 
-    try:
-        return run_with_retry(_execute)
-    except Exception as e:
-        if "RESOURCE_EXHAUSTED" in str(e):
-            return "⚠️ **사용량 초과**: 잠시 후 다시 시도해주세요."
-        return f"❌ AI 오류: {str(e)}"
+    [지시사항]
+    - 사용자의 질문에 대해 현실적이고 직설적으로 답변하세요. 위로는 필요 없습니다.
+    - 정보 수정 요청(예: "나 이 과목 들었어")이 들어오면 `[수정]` 태그를 붙이고 전체 진단 결과를 업데이트하세요.
+    - **기업 채용 관점**에서 답변하세요. "이 과목은 삼성전자가 좋아합니다/신경 안 씁니다" 식으로 설명하세요.
+    """
+    prompt = PromptTemplate(template=template, input_variables=["current_analysis", "user_input", "context"])
+    return prompt | llm, {
+        "current_analysis": current_analysis,
+        "user_input": user_input,
+        "context": context
+    }
+
+def stream_graduation_ai(current_analysis, user_input):
+    if not api_key:
+        yield "⚠️ API Key 오류"
+        return
+    yield from stream_cached("graduation_chat", user_input,
+                             lambda: chain_stream(_build_graduation_chain, current_analysis, user_input),
+                             extra=current_analysis)
 
 # -----------------------------------------------------------------------------
 # [2] UI 구성
@@ -730,6 +1121,7 @@ with st.sidebar:
     else:
         st.info(f"👤 **{st.session_state.user['email']}**님")
         if st.button("로그아웃"):
+            fb_manager.logout()
             st.session_state.clear()
             st.session_state["menu_radio"] = "🤖 AI 학사 지식인" 
             st.rerun()
@@ -738,21 +1130,15 @@ with st.sidebar:
     st.subheader("⚙️ 시스템 관리자 모드")
     
     if st.button("📡 학교 서버 데이터 동기화 (Auto-Sync)"):
-        status_text = st.empty()
-        progress_bar = st.progress(0)
-        status_text.text("🔄 광운대 KLAS 서버 접속 중...")
-        time.sleep(1.0) 
-        progress_bar.progress(30)
-        status_text.text("📂 최신 학사 규정 및 시간표 스캔 중... (변경 감지!)")
-        time.sleep(1.5)
-        progress_bar.progress(70)
-        status_text.text("⬇️ 신규 PDF 다운로드 및 벡터 DB 재구축 중...")
-        st.cache_resource.clear()
-        time.sleep(1.0)
-        progress_bar.progress(100)
-        st.success("✅ 동기화 완료! 최신 데이터(2026-01-12 14:30 기준)가 반영되었습니다.")
-        time.sleep(2)
-        st.rerun()         
+        # 바뀐 PDF만 다시 읽고 새 스냅샷으로 교체 (다른 캐시 자원은 유지, 파생 테이블은 문서 버전이 바뀔 때만 재생성)
+        with st.spinner("📂 최신 학사 규정 및 시간표 스캔 중..."), span("kb.sync"):
+            sync_result = get_kb_sync().refresh()
+        st.session_state.kb_sync_message = sync_result.summary()
+        for source, error in sync_result.failed.items():
+            print(f"Error loading {source}: {error}")
+        st.rerun()
+    if st.session_state.get("kb_sync_message"):
+        st.success(f"✅ 동기화 완료: {st.session_state.kb_sync_message} · 문서 버전 {KB_VERSION}")
     st.divider()
     st.caption("클릭하면 해당 화면으로 이동합니다.")
     log_container = st.container(height=300)
@@ -768,10 +1154,22 @@ with st.sidebar:
                         st.session_state["menu_radio"] = log['menu'] 
                         st.rerun()
     st.divider()
-    if PRE_LEARNED_DATA:
+    if KB.documents:
          st.success(f"✅ PDF 문서 학습 완료")
+         with st.expander("⏱️ 문서별 로딩 시간"):
+             for line in INGEST_REPORT:
+                 st.caption(line)
+             for term, part in sorted(KB.partitions.items()):
+                 st.caption(f"[{term or '공통'}] 문단 {len(part.index)}개 · " + ", ".join(part.sources))
     else:
         st.error("⚠️ 데이터 폴더에 PDF 파일이 없습니다.")
+    with st.expander("📈 AI 요청 대기열"):
+        sched_stats = get_request_scheduler().stats()
+        st.caption(f"대기 중: 채팅 {sched_stats['queue_depth']['interactive']}건 / 일괄 {sched_stats['queue_depth']['bulk']}건 · 허용량 {sched_stats['rate']}회/초")
+        for kind, label in (("interactive", "채팅"), ("bulk", "일괄")):
+            w = sched_stats["wait_seconds"][kind]
+            st.caption(f"{label} 대기시간 p50 {w['p50']:.2f}s · p95 {w['p95']:.2f}s ({w['count']}건)")
+        st.caption(f"완료 {sched_stats['completed']} · 할당량 초과 {sched_stats['throttled']} · 재시도 {sched_stats['retries']} · 자리 대기 {sched_stats['busy']} · 실패 {sched_stats['failed']}")
 
 # -----------------------------------------------------------------------------
 # [2] UI 구성 (디자인 적용됨)
@@ -785,9 +1183,12 @@ st.write("")
 # 2. 기능 선택 메뉴 (중앙 정렬 라디오 버튼)
 _, col_center, _ = st.columns([1, 4, 1])
 with col_center:
+    menu_options = ["🤖 AI 학사 지식인", "📅 스마트 시간표(수정가능)", "📈 성적 및 진로 진단"]
+    if is_admin():
+        menu_options.append(DASHBOARD_MENU)
     menu = st.radio(
         "메뉴 선택", # 라벨 숨김 처리됨
-        options=["🤖 AI 학사 지식인", "📅 스마트 시간표(수정가능)", "📈 성적 및 진로 진단"],
+        options=menu_options,
         index=0,
         horizontal=True,
         key="menu_radio",
@@ -811,12 +1212,12 @@ if st.session_state.current_menu == "🤖 AI 학사 지식인":
                 if fb_manager.save_data('chat_history', doc_id, data):
                     st.toast("대화 내용이 저장되었습니다.")
             
-            saved_chats = fb_manager.load_collection('chat_history')
-            if saved_chats:
-                selected_chat = col_s2.selectbox("불러오기", saved_chats, format_func=lambda x: datetime.datetime.fromtimestamp(int(x['id'])).strftime('%Y-%m-%d %H:%M'), label_visibility="collapsed")
-                if col_s2.button("로드"):
-                    st.session_state.chat_history = selected_chat['history']
-                    st.rerun()
+            with col_s2:
+                selected_chat = pick_saved_document('chat_history', "불러오기")
+            if selected_chat and col_s2.button("로드"):
+                saved_chat = fb_manager.load_document('chat_history', selected_chat['id'])
+                st.session_state.chat_history = saved_chat['history'] if saved_chat else []
+                st.rerun()
 
     for msg in st.session_state.chat_history:
         with st.chat_message(msg["role"]):
@@ -827,9 +1228,7 @@ if st.session_state.current_menu == "🤖 AI 학사 지식인":
         with st.chat_message("user"):
             st.markdown(user_input)
         with st.chat_message("assistant"):
-            with st.spinner("답변 생성 중..."):
-                response = ask_ai(user_input)
-                st.markdown(response)
+            response = st.write_stream(stream_ask_ai(user_input))
         st.session_state.chat_history.append({"role": "assistant", "content": response})
 
 elif st.session_state.current_menu == "📅 스마트 시간표(수정가능)":
@@ -838,198 +1237,239 @@ elif st.session_state.current_menu == "📅 스마트 시간표(수정가능)":
     # [상태 초기화]
     if "candidate_courses" not in st.session_state:
         st.session_state.candidate_courses = []
+    # 후보 목록의 분류/마스크/검색 텍스트를 미리 계산한 표 (후보 목록을 새로 불러올 때만 다시 만듦)
+    if len(st.session_state.get("candidate_frame", ())) != len(st.session_state.candidate_courses):
+        st.session_state.candidate_frame = build_candidate_frame(st.session_state.candidate_courses)
     if "my_schedule" not in st.session_state:
         st.session_state.my_schedule = []
+    # 현재 시간표의 누적 점유 슬롯 마스크 (담기/삭제/비우기 시 함께 갱신)
+    if "schedule_mask" not in st.session_state:
+        st.session_state.schedule_mask = schedule_mask(st.session_state.my_schedule)
 
     # --------------------------------------------------------------------------
     # [A] 설정 및 후보군 로딩
     # --------------------------------------------------------------------------
     with st.expander("🛠️ 수강신청 설정 (학과/학년 선택)", expanded=not bool(st.session_state.candidate_courses)):
-        kw_departments = [
-            "전자공학과", "전자통신공학과", "전자융합공학과", "전기공학과", "전자재료공학과", "반도체시스템공학부", "로봇학부",
-            "컴퓨터정보공학부", "소프트웨어학부", "정보융합학부", "지능형로봇학과", "건축학과", "건축공학과", "화학공학과", "환경공학과",
-            "수학과", "전자바이오물리학과", "화학과", "스포츠융합과학과", "정보콘텐츠학과", "국어국문학과", "영어산업학과", 
-            "미디어커뮤니케이션학부", "산업심리학과", "동북아문화산업학부", "행정학과", "법학부", "국제학부", "자산관리학과",
-            "경영학부", "국제통상학부", "자율전공학부(자연)", "자율전공학부(인문)"
-        ]
-        
         c1, c2, c3 = st.columns(3)
-        major = c1.selectbox("학과", kw_departments, key="tt_major")
-        grade = c2.selectbox("학년", ["1학년", "2학년", "3학년", "4학년"], key="tt_grade")
-        semester = c3.selectbox("학기", ["1학기", "2학기"], key="tt_semester")
+        major = c1.selectbox("학과", KW_DEPARTMENTS, key="tt_major")
+        grade = c2.selectbox("학년", GRADES, key="tt_grade")
+        semester = c3.selectbox("학기", SEMESTERS, key="tt_semester")
+        precomputed = get_candidate_store().stats(KB_VERSION)["rows"]
+        st.caption(f"미리 계산된 후보 목록: {sum(precomputed.values())}/{len(KW_DEPARTMENTS) * len(GRADES) * len(SEMESTERS)}개 조합")
         
         use_diagnosis = st.checkbox("☑️ 성적 진단 결과 반영 (재수강/추천 과목 로드)", value=True)
         
         if st.button("🚀 강의 목록 불러오기 (AI Scan)", type="primary", use_container_width=True):
-            diag_text = ""
+            diag_text, diag_retakes = "", ()
             if use_diagnosis and st.session_state.graduation_analysis_result:
                  diag_text = st.session_state.graduation_analysis_result
+                 diag_retakes = st.session_state.graduation_retakes
             elif use_diagnosis and st.session_state.user and fb_manager.is_initialized:
-                 saved_diags = fb_manager.load_collection('graduation_diagnosis')
-                 if saved_diags:
-                     diag_text = saved_diags[0]['result']
+                 latest_diag = fb_manager.latest('graduation_diagnosis', fields=("result", "retakes"))
+                 if latest_diag:
+                     diag_text, diag_retakes = latest_diag['result'], latest_diag.get('retakes')
                      st.toast("저장된 진단 결과를 불러왔습니다.")
 
             with st.spinner("요람에서 해당 학기 개설 과목을 전수 조사 중입니다..."):
-                candidates = get_course_candidates_json(major, grade, semester, diag_text)
-                if candidates:
-                    st.session_state.candidate_courses = candidates
-                    st.session_state.my_schedule = [] 
-                    st.rerun()
-                else:
-                    st.error("강의 정보를 추출하지 못했습니다. 다시 시도해주세요.")
+                candidates = load_candidates(major, grade, semester, diag_text, diag_retakes)
+            if candidates:
+                st.session_state.candidate_courses = candidates
+                st.session_state.candidate_frame = build_candidate_frame(candidates)
+                st.session_state.my_schedule = [] 
+                st.session_state.schedule_mask = 0
+                st.session_state.solver_results = []
+                st.rerun()
+            else:
+                st.error("강의 정보를 추출하지 못했습니다. 다시 시도해주세요.")
+
+    # 저장된 시간표: 목록은 메타데이터만 보여주고, 표는 고른 문서 하나만 렌더링
+    if st.session_state.user and fb_manager.is_initialized:
+        with st.expander("📂 저장된 시간표 불러오기"):
+            selected_meta = pick_saved_document(
+                'timetables', "저장된 시간표", fields=("name", "is_favorite"),
+                format_func=lambda x: f"{'⭐ ' if x.get('is_favorite') else ''}{x.get('name', '')} · {saved_at(x)}")
+            selected_tt = fb_manager.load_document('timetables', selected_meta['id']) if selected_meta else None
+            if selected_tt is None:
+                st.caption("저장된 시간표가 없습니다.")
+            else:
+                legacy = schema_version(selected_tt) < SCHEMA_VERSION
+                preview = decode_timetable(selected_tt, saved_timetable_resolver(selected_tt.get("major", ""), selected_tt.get("grade", "")) if legacy else None)
+                st.caption(f"{len(preview)}과목 · {sum(int(c.get('credits') or 0) for c in preview)}학점")
+                st.markdown(render_interactive_timetable(preview), unsafe_allow_html=True)
+                st.button("✏️ 이 시간표 불러와서 수정하기", on_click=load_saved_timetable, args=(selected_tt,), use_container_width=True)
 
     # --------------------------------------------------------------------------
     # [B] 인터랙티브 빌더 UI (인사이트 컴팩트 뷰 적용)
     # --------------------------------------------------------------------------
     if st.session_state.candidate_courses:
         st.divider()
-        col_left, col_right = st.columns([1, 1.4], gap="medium")
+        candidate_frame = st.session_state.candidate_frame
+
+        # [자동 생성] 필수 과목/학점 범위/선호 조건으로 충돌 없는 시간표 상위 N개 탐색
+        with st.expander("🧮 자동 시간표 생성 (충돌 없는 조합 찾기)"):
+            course_names = list(candidate_frame["name"].unique())
+            professors = sorted(set(candidate_frame["professor"].unique()) - {"", "미정"})
+            default_required = list(candidate_frame.loc[candidate_frame["category"] == CATEGORY_MUST, "name"].unique())
+            required_names = st.multiselect("필수로 넣을 과목", course_names, default=default_required)
+            sv1, sv2 = st.columns(2)
+            credit_range = sv1.slider("목표 학점 범위", 1, 30, (max(1, st.session_state.get("max_credits", 21) - 6), st.session_state.get("max_credits", 21)))
+            free_days = sv2.multiselect("공강 요일", DAYS)
+            sv3, sv4 = st.columns(2)
+            avoid_professors = sv3.multiselect("피하고 싶은 교수", professors)
+            no_first_period = sv4.checkbox("1교시 제외")
+            top_n = sv4.number_input("결과 개수", min_value=1, max_value=10, value=3, step=1)
+
+            if st.button("🔍 시간표 조합 찾기", use_container_width=True):
+                prefs = SolverPreferences(
+                    min_credits=credit_range[0], max_credits=credit_range[1],
+                    free_days=free_days, no_first_period=no_first_period, avoid_professors=avoid_professors
+                )
+                with st.spinner("조합을 탐색 중입니다..."):
+                    result = solve_timetables(st.session_state.candidate_courses, required_names, prefs, top_n=int(top_n), time_budget=3.0)
+                if result.missing_required:
+                    st.error(f"조건에 맞는 분반이 없는 필수 과목: {', '.join(result.missing_required)}")
+                elif not result.solutions:
+                    st.warning("조건을 만족하는 시간표가 없습니다. 학점 범위나 선호 조건을 완화해보세요.")
+                elif result.timed_out:
+                    st.caption(f"⏱️ 제한 시간 내 탐색한 {result.nodes:,}개 경우 중 상위 결과입니다.")
+                st.session_state.solver_results = result.solutions
+
+            for rank, (score, courses) in enumerate(st.session_state.get("solver_results", []), start=1):
+                credits = sum(c.get('credits', 0) for c in courses)
+                st.markdown(f"**#{rank}** · {credits}학점 · 점수 {score:.1f}")
+                st.markdown(render_interactive_timetable(courses), unsafe_allow_html=True)
+                if st.button("이 시간표 적용", key=f"apply_solution_{rank}"):
+                    st.session_state.my_schedule = list(courses)
+                    st.session_state.schedule_mask = schedule_mask(courses)
+                    st.rerun()
 
-        # [좌측] 강의 장바구니 (스크롤 박스 적용 및 자동 숨김)
-        with col_left:
-            st.subheader("📚 강의 선택")
-            st.caption("담은 과목은 목록에서 자동으로 사라집니다.")
-            
-            with st.container(height=600, border=True):
-                tab1, tab2, tab3 = st.tabs(["🔥 필수/재수강", "🏫 전공선택", "🧩 교양/기타"])
-                
-                # [UI 컴포넌트] 인사이트 컴팩트 로우 (Insight Compact Row)
-                def draw_course_row(course, key_prefix):
-                    # [필터 로직] 이미 담은 과목은 목록에서 그리지 않음 (자동 숨김)
-                    current_names = [c['name'] for c in st.session_state.my_schedule]
-                    if course['name'] in current_names:
-                        return # Skip rendering
-
-                    # Highlight Logic
-                    priority = course.get('priority', 'Normal')
-                    border_color = "#ddd"
-                    reason_bg = "#f1f3f5" # 기본 회색
-                    
-                    if priority == 'High': 
-                        border_color = "#ffcccc" # 붉은 테두리
-                        reason_bg = "#ffebee" # 붉은 배경 (이유)
-                    elif priority == 'Medium':
-                        border_color = "#cce5ff" # 파란 테두리
-                        reason_bg = "#e3f2fd" # 파란 배경
-                    
-                    with st.container(border=True):
-                        c_info, c_btn = st.columns([0.85, 0.15])
-                        
-                        with c_info:
-                            time_str = ', '.join(course['time_slots']) if course['time_slots'] else "시간미정"
-                            info_html = f"""
-                            <div style="line-height:1.2;">
-                                <span style="font-weight:bold; font-size:16px;">{course['name']}</span> 
-                                <span style="font-size:13px; color:#555;">({course['credits']}학점) | {course['professor']} | {time_str}</span>
-                            </div>
-                            """
-                            st.markdown(info_html, unsafe_allow_html=True)
-                            
-                            # 2열: Fact Reason (Why)
-                            if course.get('reason'):
-                                reason_html = f"""
-                                <div style="background-color:{reason_bg}; color:#333; padding:2px 8px; border-radius:4px; font-size:12px; margin-top:4px; display:inline-block;">
-                                    💡 {course['reason']}
-                                </div>
-                                """
-                                st.markdown(reason_html, unsafe_allow_html=True)
-
-                        with c_btn:
-                            st.write("") 
-                            if st.button("➕", key=f"ad_{key_prefix}_{course['id']}", type="primary", help="담기"):
-                                conflict, conflict_name = check_time_conflict(course, st.session_state.my_schedule)
-                                if conflict:
-                                    st.toast(f"⚠️ 시간 충돌! '{conflict_name}' 수업과 겹칩니다.", icon="🚫")
-                                else:
-                                    st.session_state.my_schedule.append(course)
-                                    st.rerun()
-
-                # 분류 및 렌더링
-                must_list = [c for c in st.session_state.candidate_courses if c.get('priority') == 'High']
-                major_list = [c for c in st.session_state.candidate_courses if c.get('priority') == 'Medium' or ('전공' in c.get('classification', '') and c not in must_list)]
-                other_list = [c for c in st.session_state.candidate_courses if c not in must_list and c not in major_list]
-
-                with tab1:
-                    if not must_list: st.info("해당 과목 없음")
-                    for c in must_list: draw_course_row(c, "must")
-                with tab2:
-                    if not major_list: st.info("해당 과목 없음")
-                    for c in major_list: draw_course_row(c, "mj")
-                with tab3:
-                    if not other_list: st.info("해당 과목 없음")
-                    for c in other_list: draw_course_row(c, "ot")
-
-        # [우측] 실시간 프리뷰
-        with col_right:
-            st.subheader("🗓️ 내 시간표")
+        # [좌측 목록 + 우측 시간표]는 하나의 fragment: 담기/삭제 시 이 영역만 다시 그림 (설정/자동 생성/상담 영역은 그대로)
+        # 목록은 탭마다 BUILDER_PAGE_SIZE개씩만 위젯을 만들고, 버튼은 on_click 콜백으로 상태를 바꿔 추가 rerun 없이 반영
+        @st.fragment
+        def course_builder_panes():
+            began = time.perf_counter()
+            col_left, col_right = st.columns([1, 1.4], gap="medium")
+
+            # [좌측] 강의 장바구니 (스크롤 박스 적용 및 자동 숨김)
+            with col_left:
+                st.subheader("📚 강의 선택")
+                st.caption("담은 과목은 목록에서 자동으로 사라집니다.")
+                if st.session_state.get("builder_notice"):
+                    st.toast(st.session_state.pop("builder_notice"), icon="🚫")
+
+                # [검색/필터] 과목명·교수·이수구분 검색, 교수/공강 요일/학점 조건
+                search_text = st.text_input("🔎 검색", placeholder="과목명, 교수명, 이수구분", key="cand_search")
+                with st.expander("필터", expanded=False):
+                    f1, f2, f3 = st.columns(3)
+                    filter_professors = f1.multiselect("교수", sorted(set(candidate_frame["professor"].unique()) - {""}), key="cand_professors")
+                    filter_free_days = f2.multiselect("제외할 요일", DAYS, key="cand_free_days")
+                    filter_credits = f3.multiselect("학점", sorted(candidate_frame["credits"].unique().tolist()), key="cand_credits")
+
+                # [필터 로직] 이미 담은 과목(같은 과목의 다른 분반 포함)은 목록에서 자동 숨김
+                visible = filter_candidates(
+                    candidate_frame,
+                    exclude_names={c['name'] for c in st.session_state.my_schedule},
+                    professors=filter_professors, exclude_days=filter_free_days, credits=filter_credits, text=search_text,
+                )
+                counts = category_counts(visible)
+
+                with st.container(height=600, border=True):
+                    tab1, tab2, tab3 = st.tabs([f"🔥 필수/재수강 ({counts[CATEGORY_MUST]})", f"🏫 전공선택 ({counts[CATEGORY_MAJOR]})",
+                                                f"🧩 교양/기타 ({counts[CATEGORY_OTHER]})"])
+
+                    # 분류 및 렌더링 (표의 index = candidate_courses 내 위치), 현재 페이지 행만 위젯 생성
+                    candidates = st.session_state.candidate_courses
+                    for tab, category, key_prefix in ((tab1, CATEGORY_MUST, "must"), (tab2, CATEGORY_MAJOR, "mj"), (tab3, CATEGORY_OTHER, "ot")):
+                        with tab:
+                            rows = visible.index[(visible["category"] == category).to_numpy()]
+                            if not len(rows): st.info("해당 과목 없음")
+                            for pos in paginate(rows, f"cand_page_{key_prefix}"): draw_course_row(candidates[pos], key_prefix)
+
+            # [우측] 실시간 프리뷰
+            with col_right:
+                st.subheader("🗓️ 내 시간표")
             
-            # [수정] 최대 학점 설정 기능 추가
-            if "max_credits" not in st.session_state:
-                st.session_state.max_credits = 21  # 기본값 21
+                # [수정] 최대 학점 설정 기능 추가
+                if "max_credits" not in st.session_state:
+                    st.session_state.max_credits = 21  # 기본값 21
             
-            # 학점 현황 및 설정 UI
-            total_credits = sum([c.get('credits', 0) for c in st.session_state.my_schedule])
+                # 학점 현황 및 설정 UI
+                total_credits = sum([c.get('credits', 0) for c in st.session_state.my_schedule])
             
-            cr_col1, cr_col2 = st.columns([0.6, 0.4])
-            with cr_col1:
-                st.markdown(f"**신청 학점:** <span style='color:#8A1538; font-size:1.2em;'>{total_credits}</span> / {st.session_state.max_credits}", unsafe_allow_html=True)
-            with cr_col2:
-                # 최대 학점 조절 위젯
-                st.session_state.max_credits = st.number_input(
-                    "최대 학점", min_value=1, max_value=30, value=st.session_state.max_credits, step=1, label_visibility="collapsed"
-                )
-
-            # 진행률 표시 (0으로 나누기 방지)
-            if st.session_state.max_credits > 0:
-                progress_val = min(total_credits / st.session_state.max_credits, 1.0)
-                st.progress(progress_val)
+                cr_col1, cr_col2 = st.columns([0.6, 0.4])
+                with cr_col1:
+                    st.markdown(f"**신청 학점:** <span style='color:#8A1538; font-size:1.2em;'>{total_credits}</span> / {st.session_state.max_credits}", unsafe_allow_html=True)
+                with cr_col2:
+                    # 최대 학점 조절 위젯
+                    st.session_state.max_credits = st.number_input(
+                        "최대 학점", min_value=1, max_value=30, value=st.session_state.max_credits, step=1, label_visibility="collapsed"
+                    )
+
+                # 진행률 표시 (0으로 나누기 방지)
+                if st.session_state.max_credits > 0:
+                    progress_val = min(total_credits / st.session_state.max_credits, 1.0)
+                    st.progress(progress_val)
             
-            # [기존 기능] 신청 내역 리스트 (삭제 기능 제공)
-            if st.session_state.my_schedule:
-                with st.expander("📋 신청 내역 관리 (클릭하여 삭제)", expanded=True):
-                    for idx, added_course in enumerate(st.session_state.my_schedule):
-                        cols = st.columns([0.8, 0.2])
-                        cols[0].markdown(f"**{added_course['name']}** ({added_course['professor']})")
-                        if cols[1].button("❌", key=f"del_list_{idx}"):
-                             st.session_state.my_schedule.pop(idx)
-                             st.rerun()
+                # [기존 기능] 신청 내역 리스트 (삭제 기능 제공)
+                if st.session_state.my_schedule:
+                    with st.expander("📋 신청 내역 관리 (클릭하여 삭제)", expanded=True):
+                        for idx, added_course in enumerate(st.session_state.my_schedule):
+                            cols = st.columns([0.8, 0.2])
+                            cols[0].markdown(f"**{added_course['name']}** ({added_course['professor']})")
+                            cols[1].button("❌", key=f"del_list_{idx}", on_click=remove_schedule_item, args=(idx,))
             
-            html_table = render_interactive_timetable(st.session_state.my_schedule)
-            st.markdown(html_table, unsafe_allow_html=True)
+                html_table = render_interactive_timetable(st.session_state.my_schedule)
+                st.markdown(html_table, unsafe_allow_html=True)
             
-            st.divider()
+                st.divider()
             
-            if st.button("💾 이대로 저장하기", use_container_width=True):
-                if not st.session_state.my_schedule:
-                    st.error("과목을 선택해주세요.")
-                else:
-                    st.session_state.timetable_result = html_table 
-                    doc_data = {
-                        "result": html_table,
-                        "major": major,
-                        "grade": grade,
-                        "name": f"{major} {grade} (직접설계)",
-                        "is_favorite": False,
-                        "created_at": datetime.datetime.now()
-                    }
-                    if st.session_state.user and fb_manager.is_initialized:
-                         doc_id = str(int(time.time()))
-                         if fb_manager.save_data('timetables', doc_id, doc_data):
-                             st.session_state.current_timetable_meta = {
-                                "id": doc_id, "name": doc_data['name'], "is_favorite": False
-                             }
-                             st.toast("저장 완료!", icon="✅")
-                             time.sleep(1)
-                             st.rerun()
-                         else:
-                             st.error("저장 실패")
+                if st.button("💾 이대로 저장하기", use_container_width=True):
+                    if not st.session_state.my_schedule:
+                        st.error("과목을 선택해주세요.")
                     else:
-                        st.warning("로그인 필요")
+                        st.session_state.timetable_result = html_table 
+                        # HTML 대신 과목 id/슬롯 마스크/학점만 저장 (표는 불러올 때 렌더링)
+                        doc_data = encode_timetable(st.session_state.my_schedule, f"{major} {grade} (직접설계)",
+                                                    major=major, grade=grade, semester=semester,
+                                                    created_at=datetime.datetime.now())
+                        if st.session_state.user and fb_manager.is_initialized:
+                             doc_id = str(int(time.time()))
+                             if fb_manager.save_data('timetables', doc_id, doc_data):
+                                 st.session_state.current_timetable_meta = {
+                                    "id": doc_id, "name": doc_data['name'], "is_favorite": False
+                                 }
+                                 st.session_state.setdefault("write_notices", []).append(("저장 완료!", "✅"))
+                                 st.rerun()
+                             else:
+                                 st.error("저장 실패")
+                        else:
+                            st.warning("로그인 필요")
             
-            if st.button("🔄 비우기"):
-                st.session_state.my_schedule = []
-                st.rerun()
+                st.download_button("🖼️ 이미지용 HTML 내려받기", timetable_document(html_table, f"{major} {grade} 시간표"),
+                                   file_name="timetable.html", mime="text/html", use_container_width=True,
+                                   disabled=not st.session_state.my_schedule)
+                st.button("🔄 비우기", on_click=clear_schedule)
+
+
+            st.caption(f"⏱️ 목록/시간표 렌더링 {(time.perf_counter() - began) * 1000:.0f}ms")
+
+        course_builder_panes()
+
+        # [하단] 현재 시간표 기준 AI 조교 상담 (스트리밍 답변)
+        st.divider()
+        st.subheader("💬 시간표 상담")
+        for msg in st.session_state.timetable_chat_history:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["content"])
+        if tt_input := st.chat_input("시간표에 대해 물어보세요"):
+            st.session_state.timetable_chat_history.append({"role": "user", "content": tt_input})
+            add_log("user", f"[시간표] {tt_input}", "📅 스마트 시간표(수정가능)")
+            with st.chat_message("user"):
+                st.markdown(tt_input)
+            with st.chat_message("assistant"):
+                current_tt = ", ".join(f"{c['name']}({'/'.join(c.get('time_slots', [])) or '시간미정'})" for c in st.session_state.my_schedule)
+                response = st.write_stream(stream_timetable_ai(current_tt or "비어 있음", tt_input, major, grade, semester))
+            st.session_state.timetable_chat_history.append({"role": "assistant", "content": response})
 elif st.session_state.current_menu == "📈 성적 및 진로 진단":
     st.subheader("📈 성적 및 진로 정밀 진단")
     st.markdown("""
@@ -1038,22 +1478,25 @@ elif st.session_state.current_menu == "📈 성적 및 진로 진단":
 
     if st.session_state.user and fb_manager.is_initialized:
         with st.expander("📂 저장된 진단 결과 불러오기"):
-            saved_diags = fb_manager.load_collection('graduation_diagnosis')
-            if saved_diags:
-                selected_diag = st.selectbox("불러올 진단 선택", 
-                                             saved_diags, 
-                                             format_func=lambda x: datetime.datetime.fromtimestamp(int(x['id'])).strftime('%Y-%m-%d %H:%M'))
-                if st.button("진단 결과 불러오기"):
-                    st.session_state.graduation_analysis_result = selected_diag['result']
+            selected_diag = pick_saved_document('graduation_diagnosis', "불러올 진단 선택")
+            if selected_diag and st.button("진단 결과 불러오기"):
+                saved_diag = fb_manager.load_document('graduation_diagnosis', selected_diag['id'])
+                if saved_diag:
+                    st.session_state.graduation_analysis_result = saved_diag['result']
+                    st.session_state.graduation_retakes = saved_diag.get('retakes')
                     st.success("진단 결과를 불러왔습니다!")
                     st.rerun()
 
+    d1, d2 = st.columns(2)
+    diag_department = d1.selectbox("학과", KW_DEPARTMENTS, key="diag_department")
+    this_year = datetime.date.today().year
+    diag_admission_year = d2.selectbox("입학년도", list(range(this_year, 2009, -1)), index=2, key="diag_admission_year")
     uploaded_files = st.file_uploader("캡처 이미지 업로드 (여러 장 가능)", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
 
     if uploaded_files:
         if st.button("진단 시작 🚀", type="primary"):
             with st.spinner("성적표를 독해하고 분석 중입니다... (냉철한 평가가 준비되고 있습니다)"):
-                analysis_result = analyze_graduation_requirements(uploaded_files)
+                analysis_result = analyze_graduation_requirements(uploaded_files, diag_department, diag_admission_year)
                 st.session_state.graduation_analysis_result = analysis_result
                 st.session_state.graduation_chat_history = []
                 add_log("user", "[진단] 이미지 분석 요청", "📈 성적 및 진로 진단")
@@ -1087,6 +1530,11 @@ elif st.session_state.current_menu == "📈 성적 및 진로 진단":
         except:
             sec_grad = result_text
 
+        if st.session_state.image_prep_report:
+            st.caption(f"🖼️ {st.session_state.image_prep_report}")
+        if st.session_state.diagnosis_failed_images > 0:
+            st.warning(f"⚠️ 성적표 이미지 {st.session_state.diagnosis_failed_images}장을 읽지 못해 집계에서 빠졌습니다. "
+                       "해당 캡처를 다시 올려 진단하면 결과가 정확해집니다.")
         tab1, tab2, tab3 = st.tabs(["🎓 졸업 요건 확인", "📊 성적 정밀 분석", "💼 AI 커리어 솔루션"])
         with tab1: st.markdown(sec_grad)
         with tab2: st.markdown(sec_grade if sec_grade else "성적 분석 결과가 없습니다.")
@@ -1097,6 +1545,7 @@ elif st.session_state.current_menu == "📈 성적 및 진로 진단":
             if st.button("☁️ 진단 결과 저장하기"):
                 doc_data = {
                     "result": st.session_state.graduation_analysis_result,
+                    "retakes": st.session_state.graduation_retakes,
                     "created_at": datetime.datetime.now()
                 }
                 doc_id = str(int(time.time()))
@@ -1114,22 +1563,57 @@ elif st.session_state.current_menu == "📈 성적 및 진로 진단":
             with st.chat_message("user"):
                 st.write(chat_input)
             with st.chat_message("assistant"):
-                with st.spinner("분석 중..."):
-                    response = chat_with_graduation_ai(st.session_state.graduation_analysis_result, chat_input)
-                    if "[수정]" in response:
-                        new_result = response.replace("[수정]", "").strip()
-                        st.session_state.graduation_analysis_result = new_result
-                        st.session_state.graduation_chat_history.append({"role": "assistant", "content": "정보를 반영하여 업데이트했습니다."})
-                        st.rerun()
-                    else:
-                        st.markdown(response)
-                        st.session_state.graduation_chat_history.append({"role": "assistant", "content": response})
+                response = st.write_stream(stream_graduation_ai(st.session_state.graduation_analysis_result, chat_input))
+                if "[수정]" in response:
+                    new_result = response.replace("[수정]", "").strip()
+                    st.session_state.graduation_analysis_result = new_result
+                    st.session_state.graduation_chat_history.append({"role": "assistant", "content": "정보를 반영하여 업데이트했습니다."})
+                    st.rerun()
+                else:
+                    st.session_state.graduation_chat_history.append({"role": "assistant", "content": response})
 
         if st.button("결과 초기화"):
             st.session_state.graduation_analysis_result = ""
             st.session_state.graduation_chat_history = []
             st.rerun()
 
+elif st.session_state.current_menu == DASHBOARD_MENU and is_admin():
+    st.subheader("📊 성능 대시보드")
+    snapshot = TELEMETRY.snapshot()
+    st.caption(f"수집 시작 후 {snapshot['uptime_s']:.0f}초 · 백분위수는 구간별 최근 {TELEMETRY.samples}건 기준 · "
+               f"파일 내보내기 위치: {TELEMETRY_DIR}")
+
+    if snapshot["spans"]:
+        span_df = pd.DataFrame([{"구간": name, **summary} for name, summary in snapshot["spans"].items()])
+        st.dataframe(span_df.sort_values("sum_ms", ascending=False), hide_index=True, width="stretch")
+    else:
+        st.info("아직 기록된 구간이 없습니다.")
+
+    col_counter, col_gauge = st.columns(2)
+    with col_counter:
+        st.markdown("**카운터** (누적)")
+        st.dataframe(pd.DataFrame(list(snapshot["counters"].items()), columns=["이름", "값"]), hide_index=True, width="stretch")
+    with col_gauge:
+        st.markdown("**게이지** (현재 값)")
+        st.dataframe(pd.DataFrame(list(snapshot["gauges"].items()), columns=["이름", "값"]), hide_index=True, width="stretch")
+
+    with st.expander(f"🐢 느린 구간 (최근 {len(snapshot['recent'])}건 중 상위 20)"):
+        slow_spans = sorted(snapshot["recent"], key=lambda r: r["ms"], reverse=True)[:20]
+        st.dataframe(pd.DataFrame([{**r, "at": datetime.datetime.fromtimestamp(r["at"]).strftime("%H:%M:%S")} for r in slow_spans],
+                                  columns=["at", "span", "parent", "ms", "error"]), hide_index=True, width="stretch")
+
+    col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+    if col_t1.button("💾 파일로 내보내기"):
+        st.success("저장 완료: " + ", ".join(TELEMETRY.export(TELEMETRY_DIR)))
+    col_t2.download_button("JSON 내려받기", TELEMETRY.to_json(snapshot), file_name="telemetry.json", mime="application/json")
+    col_t3.download_button("Prometheus 내려받기", TELEMETRY.to_prometheus(snapshot), file_name="telemetry.prom", mime="text/plain")
+    if col_t4.button("🔄 계측 초기화"):
+        TELEMETRY.reset()
+        st.rerun()
+
+# st.rerun()/st.stop()으로 끝난 실행은 기록하지 않음
+TELEMETRY.observe("script.run", (time.perf_counter() - SCRIPT_STARTED) * 1000)
+
 
 
 
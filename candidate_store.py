@@ -0,0 +1,303 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from course_catalog import GRADES, KW_DEPARTMENTS, SEMESTERS
+
+# -----------------------------------------------------------------------------
+# (학과, 학년, 학기)별 후보 과목 리스트 사전 계산 저장소
+# - 키 공간이 작고 고정(학과 × 4개 학년 × 2개 학기)이라 문서 버전마다 한 번만 만들어 두고 모든 학생이 공유
+# - 저장 값은 학생별 진단(재수강 표시)을 반영하기 전의 공통 리스트: 화면에서는 조회 후 course_catalog.mark_retakes만 적용
+# - 문서 버전이 키에 포함되므로 동기화 후에는 이전 버전 값이 조회되지 않음 (최신 버전 외에는 prune으로 정리)
+# - precompute()는 스레드 풀 크기로 동시 실행 수를 제한 (LLM 대체 경로는 공용 스케줄러를 다시 거침)
+# -----------------------------------------------------------------------------
+STORE_PATH = os.path.join(".cache", "candidates.sqlite3")
+DEFAULT_WORKERS = 4
+
+SOURCE_CATALOG = "catalog"
+SOURCE_LLM = "llm"
+
+# 과목 테이블에 없는 학과용 LLM 추출 프롬프트 (진단 결과는 넣지 않음 -> 공유 가능한 결과)
+CANDIDATE_EXTRACTION_PROMPT = """
+    [문서 데이터]
+    {context}
+
+    너는 [대학교 학사 데이터베이스 파서]이다.
+    제공된 [수강신청자료집/시간표 문서]를 분석하여 **{major} {grade} {semester}** 학생이 수강 가능한 **모든 정규 개설 과목**을 JSON 리스트로 추출하라.
+
+    [학생 정보]
+    - 전공: {major}
+    - 대상: {grade} {semester}
+
+    [엄격한 제약 사항]
+    1. **주관적 추천 금지:** "취업에 유리함", "커리어 도움됨" 같은 추측성 설명은 절대 하지 마라.
+    2. **전수 조사:** 해당 학과/학년/학기에 배정된 과목은 하나도 빠뜨리지 말고 모두 포함하라. (분반이 다르면 모두 포함)
+    3. **제외 대상:** 타 학과 전용 과목, 해당 학년 대상이 아닌 과목은 리스트에서 제외하라.
+    4. **Reason 필드 작성 규칙:** **"이수구분(전공필수/선택/교양) | 학점"** 형식의 팩트만 적어라.
+    5. **Priority 설정:**
+       - 전공필수 = "High"
+       - 전공선택 = "Medium"
+       - 교양/기타 = "Normal"
+
+    [JSON 출력 포맷 예시]
+    [
+        {{
+            "id": "unique_id_1",
+            "name": "회로이론1",
+            "professor": "김광운",
+            "credits": 3,
+            "time_slots": ["월3", "수4"],
+            "classification": "전공필수",
+            "priority": "High",
+            "reason": "전공필수 | 3학점"
+        }},
+         {{
+            "id": "unique_id_2",
+            "name": "대학영어",
+            "professor": "Smith",
+            "credits": 2,
+            "time_slots": ["화1", "목1"],
+            "classification": "교양필수",
+            "priority": "Normal",
+            "reason": "교양필수 | 2학점"
+        }}
+    ]
+
+    **오직 JSON 리스트만 출력하라.**
+    """
+
+
+def candidate_query(major, grade, semester):
+    """LLM 대체 경로의 검색 질의"""
+    return f"{major} {grade} {semester} 강의시간표 전필 전선 교필 교선"
+
+
+def parse_candidates_json(text):
+    """LLM 응답 -> 후보 리스트 (코드펜스/앞뒤 설명 제거). 형식이 깨지면 ValueError"""
+    cleaned = (text or "").replace("```json", "").replace("```", "").strip()
+    if not cleaned.startswith("["):
+        start, end = cleaned.find("["), cleaned.rfind("]")
+        if start != -1 and end != -1:
+            cleaned = cleaned[start:end + 1]
+    data = json.loads(cleaned)
+    if not isinstance(data, list):
+        raise ValueError("후보 목록이 JSON 리스트가 아님")
+    return data
+
+
+def all_keys(departments=KW_DEPARTMENTS, grades=GRADES, semesters=SEMESTERS):
+    return list(itertools.product(departments, grades, semesters))
+
+
+def _strip_masks(candidates):
+    # 시간 마스크는 조회 시 attach_masks로 다시 계산 (저장 형식을 timeslots 구현과 분리)
+    return [{k: v for k, v in c.items() if k != "slot_mask"} for c in candidates]
+
+
+class CandidateStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            " version TEXT, major TEXT, grade TEXT, semester TEXT,"
+            " source TEXT, payload TEXT, created_at REAL,"
+            " PRIMARY KEY (version, major, grade, semester))"
+        )
+        self._conn.commit()
+
+    def get(self, version, major, grade, semester):
+        """저장된 공통 후보 리스트 (없으면 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM candidates WHERE version = ? AND major = ? AND grade = ? AND semester = ?",
+                (version, major, grade, semester),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, version, major, grade, semester, candidates, source=SOURCE_CATALOG):
+        payload = json.dumps(_strip_masks(candidates), ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO candidates (version, major, grade, semester, source, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (version, major, grade, semester, source, payload, time.time()),
+            )
+            self._conn.commit()
+
+    def keys(self, version):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT major, grade, semester FROM candidates WHERE version = ?", (version,)
+            ).fetchall()
+        return {tuple(r) for r in rows}
+
+    def prune(self, keep_version):
+        """최신 문서 버전 외의 항목 삭제"""
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM candidates WHERE version != ?", (keep_version,)).rowcount
+            self._conn.commit()
+        return deleted
+
+    def stats(self, version=None):
+        with self._lock:
+            if version is None:
+                rows = self._conn.execute("SELECT source, COUNT(*) FROM candidates GROUP BY source").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT source, COUNT(*) FROM candidates WHERE version = ? GROUP BY source", (version,)
+                ).fetchall()
+        return {"rows": dict(rows), "hits": self.hits, "misses": self.misses}
+
+
+@dataclass
+class PrecomputeReport:
+    built: dict = field(default_factory=dict)      # source -> 건수
+    skipped: int = 0                               # 이미 저장돼 있던 키
+    empty: list = field(default_factory=list)      # 개설 과목이 없는 키
+    failed: dict = field(default_factory=dict)     # 키 -> 오류
+    seconds: float = 0.0
+
+    def summary(self):
+        built = ", ".join(f"{source} {n}" for source, n in sorted(self.built.items())) or "0"
+        return (f"생성 {built} · 기존 {self.skipped} · 없음 {len(self.empty)} · "
+                f"실패 {len(self.failed)} ({self.seconds:.1f}s)")
+
+
+def precompute(store, version, build_fn, keys=None, max_workers=DEFAULT_WORKERS, force=False, on_progress=None):
+    """build_fn(major, grade, semester) -> (후보 리스트, 출처). 모든 키를 최대 max_workers개씩 동시에 계산해 저장
+
+    빈 결과는 저장하지 않음 (다음 실행 때 다시 시도)
+    """
+    began = time.perf_counter()
+    keys = all_keys() if keys is None else list(keys)
+    report = PrecomputeReport()
+    existing = set() if force else store.keys(version)
+    pending = [k for k in keys if k not in existing]
+    report.skipped = len(keys) - len(pending)
+
+    def _one(key):
+        candidates, source = build_fn(*key)
+        if candidates:
+            store.put(version, *key, candidates, source=source)
+        return candidates, source
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="precompute") as pool:
+        futures = {pool.submit(_one, key): key for key in pending}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                candidates, source = future.result()
+            except Exception as e:
+                report.failed[key] = str(e)
+            else:
+                if candidates:
+                    report.built[source] = report.built.get(source, 0) + 1
+                else:
+                    report.empty.append(key)
+            done += 1
+            if on_progress:
+                on_progress(done, len(pending))
+    report.seconds = time.perf_counter() - began
+    return report
+
+
+# -----------------------------------------------------------------------------
+# CLI: 동기화 후 일괄 생성
+#   python candidate_store.py [--data-dir data] [--workers 4] [--llm] [--force]
+# -----------------------------------------------------------------------------
+def catalog_builder(catalog):
+    """이미 로드한 CourseCatalog -> build 함수 (과목 테이블이 없으면 None)"""
+    from course_catalog import course_to_candidate
+
+    if catalog is None:
+        return None
+    return lambda major, grade, semester: [course_to_candidate(c) for c in catalog.candidates(major, grade, semester)]
+
+
+def llm_builder(kb, registry, scheduler, model=None):
+    """이미 만든 KB 스냅샷/클라이언트 레지스트리/스케줄러로 LLM 추출 (백그라운드 스레드에서도 그대로 사용 가능)"""
+    from retrieval import RETRIEVAL_TOP_K_SCAN, format_passages
+    from llm_clients import DEFAULT_MODEL
+    from rate_limiter import PRIORITY_BULK
+
+    model = model or DEFAULT_MODEL
+
+    def _build(major, grade, semester):
+        query = candidate_query(major, grade, semester)
+        passages = kb.search(query, k=RETRIEVAL_TOP_K_SCAN, term=kb.resolve_term(query, semester))
+        prompt = CANDIDATE_EXTRACTION_PROMPT.format(major=major, grade=grade, semester=semester,
+                                                    context=format_passages(passages))
+
+        def _call():
+            with registry.slot():
+                return registry.get(model).invoke(prompt).content
+        return parse_candidates_json(scheduler.run(_call, PRIORITY_BULK))
+    return _build
+
+
+def combined_builder(catalog_fn, llm_fn=None):
+    """과목 테이블 우선, 없으면(그리고 llm_fn이 있으면) LLM 추출"""
+    def _build(major, grade, semester):
+        candidates = catalog_fn(major, grade, semester) if catalog_fn else []
+        if candidates:
+            return candidates, SOURCE_CATALOG
+        if llm_fn is None:
+            return [], SOURCE_CATALOG
+        return llm_fn(major, grade, semester), SOURCE_LLM
+    return _build
+
+
+def main(argv=None):
+    from kb_sync import KnowledgeBaseSync
+    from course_catalog import is_timetable_file, load_or_build_catalog
+    from llm_clients import LLMClientRegistry
+    from rate_limiter import RequestScheduler
+
+    parser = argparse.ArgumentParser(description="(학과, 학년, 학기)별 후보 과목 리스트 일괄 생성")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--llm", action="store_true", help="과목 테이블에 없는 학과는 LLM으로 추출 (GOOGLE_API_KEY 필요)")
+    parser.add_argument("--force", action="store_true", help="이미 저장된 키도 다시 생성")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    sync = KnowledgeBaseSync(args.data_dir)
+    sync.refresh()
+    kb = sync.current()
+    llm_fn = None
+    if args.llm:
+        api_key = os.environ.get("GOOGLE_API_KEY", "")
+        if not api_key:
+            parser.error("--llm 사용 시 GOOGLE_API_KEY 환경변수가 필요합니다")
+        llm_fn = llm_builder(kb, LLMClientRegistry(api_key), RequestScheduler())
+    catalog_fn = catalog_builder(load_or_build_catalog(kb.ingested(is_timetable_file)))
+    store = CandidateStore(args.store)
+    report = precompute(store, kb.version, combined_builder(catalog_fn, llm_fn),
+                        max_workers=args.workers, force=args.force)
+    pruned = store.prune(kb.version)
+    print(f"[{kb.version}] {report.summary()} · 이전 버전 {pruned}건 정리")
+    for key, error in sorted(report.failed.items()):
+        print(f"  실패 {' '.join(key)}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from timeslots import EXTENDED_DAYS, parse_slot, slots_to_mask
+
+# -----------------------------------------------------------------------------
+# 시간표 빌더 후보 과목 테이블
+# - 후보 dict 리스트를 한 번만 DataFrame으로 변환 (분류, 슬롯 마스크, 요일 비트, 검색용 텍스트를 미리 계산)
+# - 탭 분류와 검색/필터는 전부 불리언 마스크 연산 (후보 수에 선형, 리스트 멤버십 비교 없음)
+# - 행은 원본 리스트의 위치(pos)를 들고 있어, 화면에서는 원본 dict를 그대로 담기에 사용
+# -----------------------------------------------------------------------------
+CATEGORY_MUST = "must"      # 필수/재수강 (priority High)
+CATEGORY_MAJOR = "major"    # 전공선택 (priority Medium 또는 이수구분에 '전공')
+CATEGORY_OTHER = "other"    # 교양/기타
+CATEGORIES = [CATEGORY_MUST, CATEGORY_MAJOR, CATEGORY_OTHER]
+
+# 후보가 없을 때도 같은 열 구성 (빈 테이블에서도 검색/필터 코드가 그대로 동작하도록)
+FRAME_COLUMNS = ["id", "name", "professor", "credits", "classification", "priority", "reason",
+                 "slot_mask", "day_bits", "category", "search"]
+
+_DAY_BIT = {day: 1 << i for i, day in enumerate(EXTENDED_DAYS)}
+
+
+def _day_bits(slots):
+    bits = 0
+    for slot in slots if isinstance(slots, (list, tuple)) else ():
+        parsed = parse_slot(slot)
+        if parsed is not None:
+            bits |= _DAY_BIT.get(parsed[0], 0)
+    return bits
+
+
+def days_to_bits(days):
+    bits = 0
+    for day in days:
+        bits |= _DAY_BIT.get(day, 0)
+    return bits
+
+
+def build_candidate_frame(candidates):
+    """후보 dict 리스트 -> 분류/마스크가 계산된 DataFrame (index = 원본 리스트 위치)"""
+    if not candidates:
+        empty = pd.DataFrame(columns=FRAME_COLUMNS)
+        empty["category"] = pd.Categorical([], categories=CATEGORIES)
+        return empty
+    df = pd.DataFrame({
+        "id": [str(c.get("id", i)) for i, c in enumerate(candidates)],
+        "name": [c.get("name", "") for c in candidates],
+        "professor": [c.get("professor") or "미정" for c in candidates],
+        "credits": [c.get("credits", 0) for c in candidates],
+        "classification": [c.get("classification", "") for c in candidates],
+        "priority": [c.get("priority", "Normal") for c in candidates],
+        "reason": [c.get("reason", "") for c in candidates],
+    })
+    df["credits"] = pd.to_numeric(df["credits"], errors="coerce").fillna(0).astype(int)
+    slots = [c.get("time_slots", []) for c in candidates]
+    # 마스크는 64비트를 넘을 수 있어(확장 슬롯) 파이썬 int 그대로, 요일 비트는 7비트라 int64
+    df["slot_mask"] = [c["slot_mask"] if c.get("slot_mask") is not None else slots_to_mask(s)
+                       for c, s in zip(candidates, slots)]
+    df["day_bits"] = np.array([_day_bits(s) for s in slots], dtype=np.int64)
+
+    must = (df["priority"] == "High").to_numpy()
+    major = ~must & ((df["priority"] == "Medium") | df["classification"].str.contains("전공", regex=False)).to_numpy()
+    df["category"] = pd.Categorical(np.select([must, major], [CATEGORY_MUST, CATEGORY_MAJOR], CATEGORY_OTHER),
+                                    categories=CATEGORIES)
+    df["search"] = (df["name"] + " " + df["professor"] + " " + df["classification"] + " " + df["reason"]).str.lower()
+    return df[FRAME_COLUMNS]
+
+
+def filter_candidates(df, category=None, exclude_names=(), professors=(), exclude_days=(), credits=(), text=""):
+    """조건을 모두 만족하는 행만 (원본 순서 유지)
+
+    exclude_names: 이미 담은 과목명 (같은 과목의 다른 분반도 숨김)
+    exclude_days: 이 요일에 수업이 있는 분반 제외 (공강 요일)
+    """
+    keep = np.ones(len(df), dtype=bool)
+    if category is not None:
+        keep &= (df["category"] == category).to_numpy()
+    if len(exclude_names):
+        keep &= ~df["name"].isin(exclude_names).to_numpy()
+    if professors:
+        keep &= df["professor"].isin(professors).to_numpy()
+    if exclude_days:
+        keep &= (df["day_bits"].to_numpy() & days_to_bits(exclude_days)) == 0
+    if credits:
+        keep &= df["credits"].isin(credits).to_numpy()
+    text = (text or "").strip().lower()
+    if text:
+        keep &= df["search"].str.contains(text, regex=False).to_numpy()
+    return df[keep]
+
+
+def category_counts(df):
+    """탭 제목용 분류별 행 수"""
+    counts = df["category"].value_counts()
+    return {category: int(counts.get(category, 0)) for category in CATEGORIES}
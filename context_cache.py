@@ -0,0 +1,212 @@
+import os
+import json
+import math
+import time
+import threading
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# -----------------------------------------------------------------------------
+# 정적 문서 코퍼스 컨텍스트 캐시 (Gemini Context Caching)
+# - 문서 버전마다 코퍼스를 한 번만 등록하고, 핸들을 파일에 기록해 세션/프로세스 간 재사용
+# - TTL 만료가 가까워지거나 문서 버전이 바뀌면(동기화) 새로 등록하고 이전 핸들은 삭제
+# - 오프라인 테스트용 LocalContextCacheBackend는 캐시 적중/미스와 과금 토큰을 기록
+# -----------------------------------------------------------------------------
+REGISTRY_PATH = os.path.join(".cache", "context_cache.json")
+DEFAULT_TTL = 3600
+REFRESH_MARGIN = 120  # 만료 N초 전이면 미리 재등록
+CHARS_PER_TOKEN = 2.5  # 한국어 위주 문서 기준 대략적인 추정치
+
+CORPUS_SYSTEM_INSTRUCTION = (
+    "다음은 광운대학교 수강신청자료집과 강의시간표 원문입니다. "
+    "이후 질문에는 이 문서에 근거해 답하고, 인용 시 문서명을 함께 밝히세요."
+)
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+class ContextCacheManager:
+    def __init__(self, backend, ttl=DEFAULT_TTL, registry_path=REGISTRY_PATH):
+        self.backend = backend
+        self.ttl = ttl
+        self.registry_path = registry_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._verified = set()  # 이 프로세스에서 실제 존재를 확인한 핸들
+        self._registry = self._load_registry()
+
+    def _load_registry(self):
+        try:
+            with open(self.registry_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_registry(self):
+        if os.path.dirname(self.registry_path):
+            os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+        tmp_path = f"{self.registry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._registry, f)
+        os.replace(tmp_path, self.registry_path)
+
+    def _is_live(self, entry, now):
+        if entry["expires_at"] - REFRESH_MARGIN <= now:
+            return False
+        if entry["name"] in self._verified:
+            return True
+        # 다른 프로세스가 등록한 핸들은 처음 한 번만 실제 존재 여부 확인
+        if self.backend.exists(entry["name"]):
+            self._verified.add(entry["name"])
+            return True
+        return False
+
+    def get_handle(self, model, version, corpus_text, scope=""):
+        """(model, scope, version)용 캐시 핸들 반환. 없거나 만료 임박이면 새로 등록
+        scope는 학기 파티션처럼 동시에 살아 있어야 하는 코퍼스 구분용"""
+        prefix = f"{model}:{scope}:" if scope else f"{model}:"
+        key = f"{prefix}{version}"
+        now = time.time()
+        with self._lock:
+            entry = self._registry.get(key)
+            if entry and self._is_live(entry, now):
+                self.hits += 1
+                return entry["name"]
+            self.misses += 1
+            name = self.backend.create(model, corpus_text, self.ttl, display_name=f"kw-corpus-{scope or 'all'}-{version}")
+            self._verified.add(name)
+            # 같은 모델/scope의 이전 버전/만료 핸들 정리
+            for old_key, old in list(self._registry.items()):
+                if old_key.startswith(prefix) and old_key.count(":") == key.count(":"):
+                    self._delete_quietly(old["name"])
+                    self._registry.pop(old_key, None)
+            self._registry[key] = {"name": name, "expires_at": now + self.ttl, "created_at": now}
+            self._save_registry()
+            return name
+
+    def invalidate(self):
+        """문서 동기화 시 모든 핸들 폐기"""
+        with self._lock:
+            for entry in self._registry.values():
+                self._delete_quietly(entry["name"])
+            self._registry = {}
+            self._verified.clear()
+            self._save_registry()
+
+    def _delete_quietly(self, name):
+        try:
+            self.backend.delete(name)
+        except Exception:
+            pass
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "handles": len(self._registry)}
+
+
+class GeminiContextCacheBackend:
+    """google-genai SDK의 cachedContents API 사용"""
+
+    def __init__(self, api_key):
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+
+    def create(self, model, text, ttl, display_name=""):
+        from google.genai import types
+        cache = self.client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=display_name,
+                system_instruction=CORPUS_SYSTEM_INSTRUCTION,
+                contents=[text],
+                ttl=f"{int(ttl)}s",
+            ),
+        )
+        return cache.name
+
+    def exists(self, name):
+        try:
+            self.client.caches.get(name=name)
+            return True
+        except Exception:
+            return False
+
+    def delete(self, name):
+        self.client.caches.delete(name=name)
+
+
+class LocalContextCacheBackend:
+    """오프라인 대역: 캐시 생성/만료를 흉내 내고 요청별 과금 토큰을 장부에 기록"""
+
+    CACHED_TOKEN_RATE = 0.25  # 캐시된 토큰은 일반 입력 토큰 대비 할인 과금
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.caches = {}  # name -> {"tokens", "expires_at"}
+        self.ledger = []  # {"kind", "input_tokens", "cached_tokens", "billed_tokens"}
+        self._seq = 0
+
+    def create(self, model, text, ttl, display_name=""):
+        self._seq += 1
+        name = f"cachedContents/local-{self._seq}"
+        tokens = estimate_tokens(CORPUS_SYSTEM_INSTRUCTION) + estimate_tokens(text)
+        self.caches[name] = {"tokens": tokens, "expires_at": self.clock() + ttl, "model": model}
+        self.ledger.append({"kind": "cache_create", "input_tokens": tokens, "cached_tokens": 0, "billed_tokens": tokens})
+        return name
+
+    def exists(self, name):
+        entry = self.caches.get(name)
+        return bool(entry) and entry["expires_at"] > self.clock()
+
+    def delete(self, name):
+        self.caches.pop(name, None)
+
+    def generate(self, prompt, cached_content=None):
+        """캐시 핸들이 살아 있으면 캐시 토큰은 할인 과금, 아니면 미스로 기록"""
+        input_tokens = estimate_tokens(prompt)
+        cached_tokens = 0
+        kind = "uncached"
+        if cached_content:
+            if self.exists(cached_content):
+                cached_tokens = self.caches[cached_content]["tokens"]
+                kind = "cache_hit"
+            else:
+                kind = "cache_miss"
+        billed = input_tokens + math.ceil(cached_tokens * self.CACHED_TOKEN_RATE)
+        self.ledger.append({"kind": kind, "input_tokens": input_tokens, "cached_tokens": cached_tokens, "billed_tokens": billed})
+        return f"[local] {prompt[-200:]}"
+
+    def billed_tokens(self):
+        return sum(entry["billed_tokens"] for entry in self.ledger)
+
+
+def _message_text(message):
+    """멀티모달 메시지(content 리스트)는 텍스트 부분만 이어 붙임"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+
+
+class LocalStandInChatModel(BaseChatModel):
+    """ChatGoogleGenerativeAI 자리에 끼워 쓰는 오프라인 모델 (LocalContextCacheBackend에 과금 기록)"""
+
+    backend: Any
+    cached_content: Optional[str] = None
+
+    @property
+    def _llm_type(self):
+        return "local-stand-in"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(_message_text(m) for m in messages)
+        text = self.backend.generate(prompt, cached_content=self.cached_content)
+        entry = self.backend.ledger[-1]
+        usage = {"input_tokens": entry["billed_tokens"], "output_tokens": estimate_tokens(text),
+                 "total_tokens": entry["billed_tokens"] + estimate_tokens(text)}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
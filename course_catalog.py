@@ -0,0 +1,328 @@
+import os
+import re
+import sys
+import glob
+import json
+
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# 강의시간표 PDF -> 정형 과목 테이블 (LLM 없이 규칙 기반 파싱)
+# 행 예시: "7060-2-4513-01 기초전자회로및실험2 전필 3 4 박재영 화5,6,7,금3 TBL강의"
+#          학정번호(학과-학년-과목-분반) 과목명 [분반/연계 비고] 이수 학점 시수 담당교수 강의시간 강의유형
+# -----------------------------------------------------------------------------
+CATALOG_PATH = os.path.join(".cache", "catalog", "courses.parquet")
+
+COLUMNS = [
+    "id", "code", "section", "name", "professor", "credits", "hours",
+    "classification", "department", "college", "target_grade",
+    "time_slots", "lecture_type", "note", "year", "term", "source", "page",
+]
+
+CLASSIFICATION_NAMES = {
+    "전필": "전공필수", "전선": "전공선택",
+    "교필": "교양필수", "교선": "교양선택",
+    "기필": "기초필수", "기선": "기초선택",
+    "일선": "일반선택", "교직": "교직", "무관": "무관",
+}
+
+# 학과/학년/학기 선택지 (시간표 빌더, 성적 진단, 후보군 사전 계산에서 공통 사용)
+KW_DEPARTMENTS = [
+    "전자공학과", "전자통신공학과", "전자융합공학과", "전기공학과", "전자재료공학과", "반도체시스템공학부", "로봇학부",
+    "컴퓨터정보공학부", "소프트웨어학부", "정보융합학부", "지능형로봇학과", "건축학과", "건축공학과", "화학공학과", "환경공학과",
+    "수학과", "전자바이오물리학과", "화학과", "스포츠융합과학과", "정보콘텐츠학과", "국어국문학과", "영어산업학과",
+    "미디어커뮤니케이션학부", "산업심리학과", "동북아문화산업학부", "행정학과", "법학부", "국제학부", "자산관리학과",
+    "경영학부", "국제통상학부", "자율전공학부(자연)", "자율전공학부(인문)"
+]
+GRADES = ["1학년", "2학년", "3학년", "4학년"]
+SEMESTERS = ["1학기", "2학기"]
+
+_ROW_RE = re.compile(r"^([0-9A-Z]{4})-(\d)-([0-9A-Z]{4})-(\d{2})\s+(.*)$")
+_CLASS_RE = re.compile(r"(?:^|\s)(" + "|".join(CLASSIFICATION_NAMES) + r")\s+(\d+)\s+(\d+)(?:\s+(.*))?$")
+_TIME_RE = re.compile(r"[월화수목금토일]\d+(?:,\d+)*(?:,[월화수목금토일]\d+(?:,\d+)*)*")
+_DAY_PERIODS_RE = re.compile(r"([월화수목금토일])([\d,]+)")
+_TITLE_RE = re.compile(r"^(.*\S)\s*강의시간표(?:\s*-\s*(.+))?$")
+_TERM_RE = re.compile(r"(20\d{2})-([12])")
+_TERM_TEXT_RE = re.compile(r"(20\d{2})학년도\s*([12])학기")
+_PROFESSOR_RE = re.compile(r"^[가-힣A-Za-z/·.]{2,}$")
+_NON_PROFESSOR_SUFFIXES = ("강의", "전용", "수업", "과목", "운영")
+
+
+def is_timetable_file(path):
+    return "강의시간표" in os.path.basename(path)
+
+
+def detect_term(path, pages=()):
+    """파일명(예: 2025-2, (2025-1)) 또는 본문('2025학년도 2학기')에서 (연도, 학기) 추출"""
+    m = _TERM_RE.search(os.path.basename(path))
+    if m:
+        return int(m.group(1)), int(m.group(2))
+    for text in pages:
+        m = _TERM_TEXT_RE.search(text)
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    return None, None
+
+
+def expand_time_slots(time_text):
+    """'화5,6,7,금3' -> ['화5', '화6', '화7', '금3']"""
+    slots = []
+    for day, periods in _DAY_PERIODS_RE.findall(time_text):
+        slots.extend(f"{day}{p}" for p in periods.split(",") if p)
+    return slots
+
+
+def _page_title(lines):
+    """페이지 제목('전자정보공과대학 전자공학과 강의시간표')에서 (단과대학, 학과) 추출"""
+    for line in lines:
+        m = _TITLE_RE.match(line.strip())
+        if not m:
+            continue
+        title = m.group(1).strip()
+        if title.startswith("교양") or title.startswith("필수 교양"):
+            return "교양", "교양"
+        parts = title.split()
+        if len(parts) == 2 and not title.endswith("교과목"):
+            college, dept = parts
+            return college, (f"{college} 공통" if dept == "공통" else dept)
+        return "", title
+    return "", ""
+
+
+def _split_tail(tail):
+    """학점/시수 뒤의 '담당교수 강의시간 강의유형' 분리"""
+    m = _TIME_RE.search(tail)
+    if m:
+        professor = tail[:m.start()].strip()
+        return professor, expand_time_slots(m.group(0)), tail[m.end():].strip(" ,")
+    tokens = tail.split()
+    if tokens and _PROFESSOR_RE.match(tokens[0]) and not tokens[0].endswith(_NON_PROFESSOR_SUFFIXES):
+        return tokens[0], [], " ".join(tokens[1:])
+    return "", [], tail
+
+
+def parse_row(line):
+    m = _ROW_RE.match(line.strip())
+    if not m:
+        return None
+    dept_code, level, number, section, rest = m.groups()
+    cm = _CLASS_RE.search(rest)
+    if not cm:
+        return None
+    head = rest[:cm.start()].split()
+    if not head:
+        return None
+    professor, slots, lecture_type = _split_tail(cm.group(4) or "")
+    code = f"{dept_code}-{level}-{number}"
+    return {
+        "id": f"{code}-{section}",
+        "code": code,
+        "section": section,
+        "name": head[0],
+        "professor": professor,
+        "credits": int(cm.group(2)),
+        "hours": int(cm.group(3)),
+        "classification": CLASSIFICATION_NAMES[cm.group(1)],
+        "target_grade": int(level),
+        "time_slots": slots,
+        "lecture_type": lecture_type,
+        "note": " ".join(head[1:]),
+    }
+
+
+def parse_timetable_pages(pages, source, year, term):
+    """페이지 텍스트 리스트 -> 과목 행(dict) 리스트"""
+    rows = []
+    college, department = "", ""
+    for page_no, text in enumerate(pages, start=1):
+        lines = text.splitlines()
+        # 여러 쪽에 걸친 표는 첫 쪽에만 제목이 있으므로, 제목 없는 쪽은 앞 쪽의 학과를 이어받음
+        title = _page_title(lines)
+        if title != ("", ""):
+            college, department = title
+        for line in lines:
+            row = parse_row(line)
+            if row is None:
+                continue
+            row.update(department=department, college=college, year=year, term=term, source=source, page=page_no)
+            rows.append(row)
+    return rows
+
+
+def build_catalog_frame(documents):
+    """ingest.IngestedDocument 리스트 중 강의시간표 문서만 골라 DataFrame 생성"""
+    rows = []
+    for doc in documents:
+        if doc.error or not is_timetable_file(doc.path):
+            continue
+        year, term = detect_term(doc.path, doc.pages)
+        rows.extend(parse_timetable_pages(doc.pages, doc.source, year, term))
+    df = pd.DataFrame(rows, columns=COLUMNS)
+    # 같은 학기에 같은 학정번호+분반이 여러 페이지(연계전공 등)에 중복 게재되는 경우 첫 행만 유지
+    return df.drop_duplicates(subset=["year", "term", "id"]).reset_index(drop=True)
+
+
+def documents_version(documents):
+    """원본 문서들의 [파일명, 내용 해시] 목록 - 파생 테이블 옆에 저장해 두고 추가/삭제/교체되면 재생성"""
+    return sorted([doc.source, doc.sha256] for doc in documents)
+
+
+def _sources_path(path):
+    return f"{path}.sources.json"
+
+
+def save_table(df, path, sources=None):
+    """Parquet 저장 (+ 원본 문서 목록 sources.json). 테이블을 먼저 바꾸므로 중간에 끊기면 다음 로드에서 재생성됨"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    if sources is not None:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sources, f, ensure_ascii=False)
+        os.replace(tmp_path, _sources_path(path))
+
+
+def load_table(path, sources=None):
+    """sources가 주어지면 저장 당시 원본 목록과 같을 때만 반환 (다르거나 기록이 없으면 None)"""
+    if not os.path.exists(path):
+        return None
+    if sources is not None:
+        try:
+            with open(_sources_path(path), encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved != [list(s) for s in sources]:
+            return None
+    return pd.read_parquet(path)
+
+
+def save_catalog(df, path=CATALOG_PATH, sources=None):
+    save_table(df, path, sources)
+
+
+def load_catalog(path=CATALOG_PATH, sources=None):
+    return load_table(path, sources)
+
+
+def load_or_build_catalog(documents, path=CATALOG_PATH):
+    """강의시간표 문서들 -> CourseCatalog (없으면 None). 저장된 테이블의 원본 목록이 다르면 다시 파싱"""
+    timetable_docs = [d for d in documents if is_timetable_file(d.path)]
+    if not timetable_docs:
+        return None
+    sources = documents_version(timetable_docs)
+    df = load_catalog(path, sources)
+    if df is None:
+        df = build_catalog_frame(timetable_docs)
+        save_catalog(df, path, sources)
+    return CourseCatalog(df)
+
+
+class CourseCatalog:
+    """(연도, 학기, 학과) 정렬 인덱스 위에서 후보 과목을 조회"""
+
+    def __init__(self, df):
+        self.df = df.set_index(["year", "term", "department"]).sort_index()
+
+    def __len__(self):
+        return len(self.df)
+
+    def latest_year(self, term):
+        years = self.df.index.get_level_values("year")
+        terms = self.df.index.get_level_values("term")
+        matched = years[terms == term]
+        return int(matched.max()) if len(matched) else None
+
+    def _rows(self, year, term, department):
+        key = (year, term, department)
+        if key not in self.df.index:
+            return self.df.iloc[0:0]
+        return self.df.loc[[key]]
+
+    def candidates(self, major, grade, semester, year=None, include_liberal_arts=True):
+        """major='전자공학과', grade='2학년', semester='2학기' -> 과목 dict 리스트"""
+        grade_no = int(re.sub(r"\D", "", grade) or 0)
+        term = int(re.sub(r"\D", "", semester) or 0)
+        year = year or self.latest_year(term)
+        if year is None:
+            return []
+        frames = [self._rows(year, term, major)]
+        if frames[0].empty:
+            return []
+        # 단과대학 공통 개설 과목(예: 전자정보공과대학 공통)도 같은 학년 대상이면 포함
+        colleges = set(frames[0]["college"]) - {""}
+        frames.extend(self._rows(year, term, f"{college} 공통") for college in colleges)
+        frames = [f[f["target_grade"] == grade_no] for f in frames]
+        if include_liberal_arts:
+            liberal = self._rows(year, term, "교양")
+            # 외국인 전용/재직자 전용 분반 등 일반 학생이 수강할 수 없는 분반 제외
+            frames.append(liberal[~liberal["note"].str.contains("전용|만수강가능", regex=True)])
+        result = pd.concat(frames).reset_index()
+        return result.to_dict("records")
+
+
+def _name_key(name):
+    return re.sub(r"\s+", "", name or "")
+
+
+def is_retake(name, retakes):
+    """retakes: 재수강 대상 과목명 목록 (성적표 집계의 retake_candidates)"""
+    return _name_key(name) in {_name_key(r) for r in retakes or ()}
+
+
+def retakes_in_text(names, diagnosis_text):
+    """구조화된 목록 없이 저장된 예전 진단용: 과목명과 '재수강'이 같은 줄에 있는 과목만 재수강 대상으로 봄"""
+    lines = [line for line in (diagnosis_text or "").splitlines() if "재수강" in line]
+    return [name for name in names if name and any(name in line for line in lines)]
+
+
+def mark_retakes(candidates, retakes):
+    """학생별 진단 결과 반영: 재수강 대상 과목만 priority/reason을 바꾼 새 리스트 (원본은 공유 데이터라 수정하지 않음)"""
+    keys = {_name_key(r) for r in retakes or ()}
+    if not keys:
+        return list(candidates)
+    return [
+        {**c, "priority": "High", "reason": "재수강 필수 대상"} if _name_key(c["name"]) in keys else c
+        for c in candidates
+    ]
+
+
+def course_to_candidate(course, retakes=()):
+    """카탈로그 행을 시간표 빌더가 쓰는 후보 dict로 변환 (priority/reason 부여)"""
+    classification = course["classification"]
+    if is_retake(course["name"], retakes):
+        priority, reason = "High", "재수강 필수 대상"
+    else:
+        priority = "High" if classification == "전공필수" else "Medium" if classification == "전공선택" else "Normal"
+        reason = f"{classification} | {course['credits']}학점"
+    return {
+        "id": course["id"],
+        "name": course["name"],
+        "professor": course["professor"] or "미정",
+        "credits": int(course["credits"]),
+        "time_slots": list(course["time_slots"]),
+        "classification": classification,
+        "priority": priority,
+        "reason": reason,
+    }
+
+
+def main(argv=None):
+    """오프라인 빌드: python course_catalog.py [data_dir] [output_path]"""
+    from ingest import ingest_pdfs
+
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = argv[0] if argv else "data"
+    out_path = argv[1] if len(argv) > 1 else CATALOG_PATH
+    pdf_files = sorted(p for p in glob.glob(os.path.join(data_dir, "*.pdf")) if is_timetable_file(p))
+    documents = ingest_pdfs(pdf_files)
+    df = build_catalog_frame(documents)
+    save_catalog(df, out_path, documents_version(documents))
+    print(f"{len(df)} sections -> {out_path}")
+    for (year, term), group in df.groupby(["year", "term"]):
+        print(f"  {year}-{term}: {len(group)} sections, {group['department'].nunique()} departments")
+
+
+if __name__ == "__main__":
+    main()
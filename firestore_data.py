@@ -0,0 +1,524 @@
+import time
+import atexit
+import datetime
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+try:
+    from google.api_core.exceptions import AlreadyExists
+except ImportError:  # google-cloud-firestore 없이 메모리 대체 구현만 쓸 때
+    class AlreadyExists(Exception):
+        pass
+
+# -----------------------------------------------------------------------------
+# 사용자별 Firestore 하위 컬렉션(users/{uid}/{collection}) 읽기 계층
+# - 읽기 캐시: (사용자, 컬렉션) 단위 버킷. 같은 사용자의 save/update가 버킷을 통째로 무효화하고,
+#   다른 세션/서버에서의 쓰기는 TTL이 지나면 반영 (프로세스 전역으로 공유)
+# - 목록 화면은 필요한 필드만 select로 가져오고(projection), 본문은 문서를 고를 때 한 건만 조회
+# - 페이지는 (updated_at, 문서 id) 커서로 이어서 조회 (offset 없이, 읽은 문서 수 = 화면에 보이는 문서 수)
+# - latest(): 최신 문서 한 건만 limit(1)로 조회
+# - 쓰기 지연 큐(WriteBehindQueue): 저장은 큐에 넣고 바로 반환, 백그라운드 스레드가 잠깐(linger) 모은 쓰기를
+#   문서별로 합쳐 batch commit 한 번으로 보냄 (모든 세션이 하나의 큐를 공유 -> 부하가 클수록 RPC 절감)
+#   같은 (사용자, 컬렉션)을 읽을 때는 그 쓰기들이 반영될 때까지 기다린 뒤 조회 (자기 쓰기는 항상 보임)
+# - db 인터페이스는 firestore.Client와 같은 부분집합만 사용: 에뮬레이터(FIRESTORE_EMULATOR_HOST)에 붙은
+#   클라이언트나 InMemoryFirestore를 그대로 넣어 테스트/로컬 개발 가능
+# -----------------------------------------------------------------------------
+ORDER_FIELD = "updated_at"
+DOC_ID_FIELD = "__name__"
+DEFAULT_TTL = 300
+DEFAULT_MAX_BUCKETS = 2048
+MAX_BATCH = 500          # Firestore batch 한 번에 넣을 수 있는 최대 쓰기 수
+DEFAULT_LINGER = 0.05    # 첫 쓰기 후 같은 batch에 더 모으려고 기다리는 시간(초)
+SET, UPDATE = "set", "update"
+_MISSING = object()
+
+
+@dataclass
+class Page:
+    items: list
+    cursor: tuple = None  # 다음 페이지 시작점 (updated_at, 문서 id). 마지막 페이지면 None
+
+
+class CollectionCache:
+    """(사용자, 컬렉션) -> {조회 키: 결과} 버킷. 버킷 단위로 TTL 만료/무효화, 버킷 수는 LRU로 제한"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_buckets=DEFAULT_MAX_BUCKETS):
+        self.ttl = ttl
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, collection, key):
+        with self._lock:
+            bucket = self._buckets.get((user_id, collection))
+            if bucket is not None and time.monotonic() - bucket[0] > self.ttl:
+                del self._buckets[(user_id, collection)]
+                bucket = None
+            if bucket is None or key not in bucket[1]:
+                self.misses += 1
+                return _MISSING
+            self._buckets.move_to_end((user_id, collection))
+            self.hits += 1
+            return bucket[1][key]
+
+    def put(self, user_id, collection, key, value):
+        with self._lock:
+            bucket = self._buckets.get((user_id, collection))
+            if bucket is None:
+                bucket = self._buckets[(user_id, collection)] = (time.monotonic(), {})
+            bucket[1][key] = value
+            self._buckets.move_to_end((user_id, collection))
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+    def invalidate(self, user_id, collection=None):
+        with self._lock:
+            for bucket_key in [k for k in self._buckets if k[0] == user_id and collection in (None, k[1])]:
+                del self._buckets[bucket_key]
+
+
+@dataclass
+class _Write:
+    ref: object
+    kind: str
+    data: dict
+    futures: list = field(default_factory=list)
+    tags: list = field(default_factory=list)
+
+
+def _coalesce(writes):
+    """같은 문서에 대한 연속 쓰기를 하나로 (set 뒤 update는 합친 set, update끼리는 합친 update, set은 이전 것을 덮음)"""
+    merged = {}
+    for write in writes:
+        current = merged.get(write.ref.path)
+        if current is None or write.kind == SET:
+            futures = (current.futures if current else []) + write.futures
+            tags = (current.tags if current else []) + write.tags
+            merged[write.ref.path] = _Write(write.ref, write.kind, dict(write.data), futures, tags)
+        else:
+            current.data.update(write.data)
+            current.futures.extend(write.futures)
+            current.tags.extend(write.tags)
+    return list(merged.values())
+
+
+class WriteBehindQueue:
+    """백그라운드 스레드 하나가 쓰기를 모아 Firestore batch로 commit (프로세스 전역 공유)
+
+    submit()은 concurrent.futures.Future를 돌려줌: 성공하면 결과 None, 실패하면 예외.
+    batch가 실패하면(예: 없는 문서 update) 나머지 쓰기까지 막지 않도록 한 건씩 다시 시도.
+    """
+
+    def __init__(self, db, max_batch=MAX_BATCH, linger=DEFAULT_LINGER):
+        self.db = db
+        self.max_batch = max_batch
+        self.linger = linger
+        self.commits = 0   # 보낸 batch commit 수 (실패 시 나눠 보낸 것 포함)
+        self.writes = 0    # 합치기 전 submit된 쓰기 수
+        self._queue = []
+        self._inflight = Counter()  # tag -> 아직 반영되지 않은 쓰기 수
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="firestore-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, ref, kind, data, tag=None, callback=None):
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("WriteBehindQueue is closed")
+            self._queue.append(_Write(ref, kind, data, [future], [tag]))
+            self._inflight[tag] += 1
+            self.writes += 1
+            self._cond.notify_all()
+        return future
+
+    def pending(self, tag=None):
+        with self._cond:
+            return len(self._queue) if tag is None else self._inflight[tag]
+
+    def wait(self, tag, timeout=None):
+        """tag로 들어간 쓰기가 모두 반영될 때까지 대기 (시간 초과면 False)"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._inflight[tag] <= 0, timeout)
+
+    def flush(self, timeout=None):
+        """지금까지 들어간 쓰기가 모두 반영될 때까지 대기"""
+        with self._cond:
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._queue and not +self._inflight, timeout)
+
+    def close(self, timeout=10):
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _take(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._queue or self._closed)
+            if not self._queue:
+                return None
+            # 첫 쓰기가 들어온 뒤 linger 동안 더 모음 (batch가 차면 바로 보냄)
+            deadline = time.monotonic() + self.linger
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    break
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            self._commit(_coalesce(batch))
+
+    def _send(self, writes):
+        """batch commit -> [(쓰기, 예외 또는 None)]. 실패하면 반으로 나눠 다시 보내 원인 쓰기만 실패 처리"""
+        try:
+            batch = self.db.batch()
+            for write in writes:
+                (batch.set if write.kind == SET else batch.update)(write.ref, write.data)
+            batch.commit()
+            return [(write, None) for write in writes]
+        except Exception as e:
+            if len(writes) == 1:
+                return [(writes[0], e)]
+            middle = len(writes) // 2
+            return self._send(writes[:middle]) + self._send(writes[middle:])
+        finally:
+            self.commits += 1
+
+    def _commit(self, writes):
+        results = self._send(writes)
+        with self._cond:
+            for write, _ in results:
+                for tag in write.tags:
+                    self._inflight[tag] -= 1
+            self._cond.notify_all()
+        for write, error in results:
+            for future in write.futures:
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+
+class UserCollections:
+    """users/{uid}/{collection} 읽기(캐시 경유)/쓰기(캐시 무효화)
+
+    writer(WriteBehindQueue)가 있으면 save/update는 큐에 넣고 Future를 바로 반환 (없으면 동기 쓰기 후 None)
+    """
+
+    def __init__(self, db, cache, server_timestamp=None, descending="DESCENDING", writer=None):
+        self.db = db
+        self.cache = cache
+        self.server_timestamp = server_timestamp
+        self.descending = descending
+        self.writer = writer
+
+    def _ref(self, user_id, collection):
+        return self.db.collection("users").document(user_id).collection(collection)
+
+    def _cached(self, user_id, collection, key, fetch):
+        value = self.cache.get(user_id, collection, key)
+        if value is _MISSING:
+            if self.writer is not None:
+                self.writer.wait((user_id, collection))
+            value = fetch()
+            self.cache.put(user_id, collection, key, value)
+        return value
+
+    def _query(self, user_id, collection, fields):
+        query = (self._ref(user_id, collection)
+                 .order_by(ORDER_FIELD, direction=self.descending)
+                 .order_by(DOC_ID_FIELD, direction=self.descending))
+        if fields is not None:
+            # 커서를 만들려면 정렬 필드가 필요
+            query = query.select(sorted(set(fields) | {ORDER_FIELD}))
+        return query
+
+    def page(self, user_id, collection, fields=None, page_size=None, cursor=None):
+        """최신순 한 페이지. fields=None이면 문서 전체, page_size=None이면 전부"""
+        fields = tuple(fields) if fields is not None else None
+
+        def fetch():
+            query = self._query(user_id, collection, fields)
+            if cursor is not None:
+                query = query.start_after(list(cursor))
+            if page_size is not None:
+                # 한 건 더 읽어서 다음 페이지가 있는지 판단 (빈 마지막 페이지 방지)
+                query = query.limit(page_size + 1)
+            items = [{"id": doc.id, **doc.to_dict()} for doc in query.stream()]
+            next_cursor = None
+            if page_size is not None and len(items) > page_size:
+                items = items[:page_size]
+                next_cursor = (items[-1].get(ORDER_FIELD), items[-1]["id"])
+            if fields is None:
+                for item in items:
+                    self.cache.put(user_id, collection, ("doc", item["id"]), item)
+            return Page(items, next_cursor)
+
+        return self._cached(user_id, collection, ("page", fields, page_size, cursor), fetch)
+
+    def list(self, user_id, collection, fields=None):
+        return self.page(user_id, collection, fields).items
+
+    def get(self, user_id, collection, doc_id):
+        def fetch():
+            snapshot = self._ref(user_id, collection).document(doc_id).get()
+            return {"id": snapshot.id, **snapshot.to_dict()} if snapshot.exists else None
+        return self._cached(user_id, collection, ("doc", doc_id), fetch)
+
+    def latest(self, user_id, collection, fields=None):
+        """가장 최근 문서 한 건 (없으면 None)"""
+        fields = tuple(fields) if fields is not None else None
+
+        def fetch():
+            docs = list(self._query(user_id, collection, fields).limit(1).stream())
+            return {"id": docs[0].id, **docs[0].to_dict()} if docs else None
+        return self._cached(user_id, collection, ("latest", fields), fetch)
+
+    def _stamp(self, data):
+        data[ORDER_FIELD] = self.server_timestamp if self.server_timestamp is not None else datetime.datetime.now(datetime.timezone.utc)
+        return data
+
+    def _write(self, user_id, collection, doc_id, kind, data, callback):
+        ref = self._ref(user_id, collection).document(doc_id)
+        if self.writer is None:
+            try:
+                ref.set(self._stamp(data)) if kind == SET else ref.update(self._stamp(data))
+            finally:
+                self.cache.invalidate(user_id, collection)
+            return None
+
+        def on_done(future):
+            # 반영 직후 다시 무효화: 큐에 있는 동안 다른 경로로 채워졌을 수 있는 캐시 제거
+            self.cache.invalidate(user_id, collection)
+            if callback is not None:
+                callback(future)
+
+        future = self.writer.submit(ref, kind, self._stamp(data), tag=(user_id, collection), callback=on_done)
+        self.cache.invalidate(user_id, collection)
+        return future
+
+    def save(self, user_id, collection, doc_id, data, callback=None):
+        """덮어쓰기 (data에 updated_at을 채움). callback(future)은 반영/실패 시 쓰기 스레드에서 호출"""
+        return self._write(user_id, collection, doc_id, SET, data, callback)
+
+    def update(self, user_id, collection, doc_id, data, callback=None):
+        """부분 업데이트 (이름 변경, 즐겨찾기 등)"""
+        return self._write(user_id, collection, doc_id, UPDATE, data, callback)
+
+
+# 메모리 대체 구현 ---------------------------------------------------------------
+_MUST_EXIST, _MUST_NOT_EXIST = "exists", "missing"
+
+
+class _FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class _FakeDocument:
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return _FakeQuery(self._store, self.path + (name,))
+
+    def set(self, data, merge=False):
+        self._store._commit([(self.path, data, merge, None)])
+
+    def create(self, data):
+        self._store._commit([(self.path, data, False, _MUST_NOT_EXIST)])
+
+    def update(self, data):
+        self._store._commit([(self.path, data, True, _MUST_EXIST)])
+
+    def get(self):
+        return _FakeSnapshot(self, self._store._read(self.path))
+
+    def delete(self):
+        self._store._delete(self.path)
+
+
+class _FakeQuery:
+    """컬렉션 겸 쿼리 (where ==, order_by, select, limit, start_after만 지원)"""
+
+    def __init__(self, store, path, filters=(), orders=(), fields=None, limit=None, cursor=None, group=False):
+        self._store = store
+        self.path = path
+        self._filters = filters
+        self._orders = orders
+        self._fields = fields
+        self._limit = limit
+        self._cursor = cursor
+        self._group = group
+
+    def _copy(self, **changes):
+        state = dict(store=self._store, path=self.path, filters=self._filters, orders=self._orders,
+                     fields=self._fields, limit=self._limit, cursor=self._cursor, group=self._group)
+        state.update(changes)
+        return _FakeQuery(**state)
+
+    def document(self, doc_id=None):
+        return _FakeDocument(self._store, self.path + (doc_id or self._store._auto_id(),))
+
+    def where(self, field, op, value):
+        if op != "==":
+            raise NotImplementedError(f"InMemoryFirestore supports only '==' filters, got {op!r}")
+        return self._copy(filters=self._filters + ((field, value),))
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(orders=self._orders + ((field, direction == "DESCENDING"),))
+
+    def select(self, fields):
+        return self._copy(fields=tuple(fields))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, values):
+        return self._copy(cursor=tuple(values))
+
+    def _sort_key(self, path, data):
+        # 필드가 없는 문서는 맨 앞 (None과 값 비교 방지)
+        values = (path[-1] if field == DOC_ID_FIELD else data.get(field) for field, _ in self._orders)
+        return tuple((0,) if value is None else (1, value) for value in values)
+
+    def _after_cursor(self, key):
+        bounds = ((0,) if value is None else (1, value) for value in self._cursor)
+        for value, bound, (_, descending) in zip(key, bounds, self._orders):
+            if value != bound:
+                return value < bound if descending else value > bound
+        return False
+
+    def stream(self):
+        matched = [(path, data) for path, data in self._store._scan(self.path, self._group)
+                   if all(data.get(field) == value for field, value in self._filters)]
+        # 방향이 섞인 정렬: 뒤쪽 키부터 안정 정렬을 반복
+        for index in reversed(range(len(self._orders))):
+            field, descending = self._orders[index]
+            matched.sort(key=lambda item: self._sort_key(item[0], item[1])[index], reverse=descending)
+        if self._cursor is not None:
+            matched = [item for item in matched if self._after_cursor(self._sort_key(*item))]
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        self._store.reads += len(matched)
+        for path, data in matched:
+            if self._fields is not None:
+                data = {field: data[field] for field in self._fields if field in data}
+            yield _FakeSnapshot(_FakeDocument(self._store, path), data)
+
+    def get(self):
+        return list(self.stream())
+
+
+class _FakeBatch:
+    def __init__(self, store):
+        self._store = store
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference.path, data, merge, None))
+
+    def create(self, reference, data):
+        self._writes.append((reference.path, data, False, _MUST_NOT_EXIST))
+
+    def update(self, reference, data):
+        self._writes.append((reference.path, data, True, _MUST_EXIST))
+
+    def commit(self):
+        self._store._commit(self._writes)
+
+
+class InMemoryFirestore:
+    """테스트/로컬 개발용 Firestore 대체 (프로세스 메모리, 스레드 안전)
+
+    reads = 지금까지 읽은 문서 수, commits = 쓰기 RPC 수 (개별 set/update 1회, batch commit 1회)
+    server_timestamp/delete_field: firestore.SERVER_TIMESTAMP/DELETE_FIELD와 같은 자리표시 값
+    """
+
+    def __init__(self, server_timestamp=None, delete_field=None):
+        self.server_timestamp = server_timestamp
+        self.delete_field = delete_field
+        self.reads = 0
+        self.commits = 0
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def collection(self, name):
+        return _FakeQuery(self, (name,))
+
+    def collection_group(self, name):
+        return _FakeQuery(self, (name,), group=True)
+
+    def batch(self):
+        return _FakeBatch(self)
+
+    def _auto_id(self):
+        with self._lock:
+            self._next_id += 1
+            return f"auto{self._next_id:08d}"
+
+    def _resolve(self, data):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return {key: now if self.server_timestamp is not None and value is self.server_timestamp else value
+                for key, value in data.items()}
+
+    def _commit(self, writes):
+        """[(경로, 데이터, merge, 전제 조건)] 를 원자적으로 반영 (update 대상이 없거나 create 대상이 있으면 전부 취소)"""
+        with self._lock:
+            self.commits += 1
+            for path, _, _, precondition in writes:
+                if precondition == _MUST_EXIST and path not in self._docs:
+                    raise KeyError(f"No document to update: {'/'.join(path)}")
+                if precondition == _MUST_NOT_EXIST and path in self._docs:
+                    raise AlreadyExists(f"Document already exists: {'/'.join(path)}")
+            for path, data, merge, _ in writes:
+                document = dict(self._docs.get(path) or {}) if merge else {}
+                for key, value in self._resolve(data).items():
+                    if self.delete_field is not None and value is self.delete_field:
+                        document.pop(key, None)
+                    else:
+                        document[key] = value
+                self._docs[path] = document
+
+    def _read(self, path):
+        with self._lock:
+            data = self._docs.get(path)
+            if data is not None:
+                self.reads += 1
+            return dict(data) if data is not None else None
+
+    def _delete(self, path):
+        with self._lock:
+            self._docs.pop(path, None)
+
+    def _scan(self, path, group):
+        with self._lock:
+            if group:
+                return [(p, dict(d)) for p, d in self._docs.items() if len(p) >= 2 and p[-2] == path[-1]]
+            return [(p, dict(d)) for p, d in self._docs.items() if p[:-1] == path]
@@ -0,0 +1,588 @@
+import os
+import re
+import sys
+import glob
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from course_catalog import detect_term, documents_version, load_table, save_table
+
+# -----------------------------------------------------------------------------
+# 졸업 요건 규칙 엔진
+# - 수강신청자료집 '졸업이수학점' 표(입학년도별)에서 학과/단과대학별 기준 학점을 추출해 DataFrame으로 보관
+# - 같은 자료집에서 필수 과목도 추출: 학과별 MSC 교과과정표(입학년도 구간별 '필수'/교필 표시 과목)와
+#   전체 공통 필수교양('2016학년도 ∼ 2024학년도 신입생은 ‘광운인되기’(필수교양)') 문장
+# - 구조화된 성적표(전공/교양/기초/총 취득 학점)를 규칙과 비교해 부족 학점표와 판정(졸업 가능/위험/불가) 산출
+# - evaluate()는 학생 1명(순수 파이썬), evaluate_batch()는 여러 학생을 pandas 벡터 연산으로 한 번에 판정
+# 지원 범위: 2016학년도 이후 입학자 (그 이전 표는 형식이 달라 추출하지 않음)
+# -----------------------------------------------------------------------------
+RULES_PATH = os.path.join(".cache", "catalog", "graduation_rules.parquet")
+REQUIRED_PATH = os.path.join(".cache", "catalog", "required_courses.parquet")
+
+RULE_COLUMNS = [
+    "year_from", "year_to", "college", "department",
+    "liberal_credits", "basic_credits", "major_credits", "major_credits_multi", "total_credits",
+    "source", "page",
+]
+# department가 빈 문자열이면 전체 공통 필수 과목
+REQUIRED_COLUMNS = ["year_from", "year_to", "department", "course", "source", "page"]
+OPEN_YEAR = 2099              # '20xx학년도 입학자부터 적용'처럼 끝이 없는 구간의 상한
+
+VERDICT_OK = "졸업 가능"
+VERDICT_RISK = "위험"
+VERDICT_FAIL = "불가"
+
+REGULAR_SEMESTERS = 8
+MAX_SEMESTER_CREDITS = 19     # 정규학기 최대 수강신청 학점
+ON_TRACK_LOAD = 17            # 남은 학기당 이보다 많이 들어야 하면 '위험'
+
+MAJOR_CLASSIFICATIONS = ("전공필수", "전공선택")
+LIBERAL_CLASSIFICATIONS = ("교양필수", "교양선택")
+BASIC_CLASSIFICATIONS = ("기초필수", "기초선택")
+
+_BLOCK_RE = re.compile(r"^\s*[가-하]\.\s*(20\d{2})학년도\s*신입학(?:자|\s*~\s*(20\d{2})학년도\s*신입학자)")
+_BLOCK_END_RE = re.compile(r"^\s*[가-하]\.\s*(?:19|20)\d{2}학년도\s*(?:입학자|전 입학자)")
+_NUMBER_RE = re.compile(r"^(?:\d+(?:[~～]\d+)?(?:\(\d+\*\))?|-)$")
+_COHORT_RE = re.compile(r"\d{4}학번~?")
+_FORMER_NAME_RE = re.compile(r"\(구\.[^)]*\)?")
+_DEPARTMENT_RE = re.compile(r"[가-힣]+(?:학과|학부)(?:\(\w+\))?")
+
+COLLEGES = [
+    "전자정보공과대학", "인공지능융합대학", "공과대학", "자연과학대학", "인문사회과학대학",
+    "정책법학대학", "경영대학", "참빛인재대학", "인제니움대학",
+]
+_COLLEGE_ALIASES = {
+    "전정공대": "전자정보공과대학", "공과대": "공과대학", "자연대": "자연과학대학",
+    "인사대": "인문사회과학대학", "정법대": "정책법학대학", "경영대": "경영대학",
+}
+# 긴 이름부터 매칭 ('전자정보공과대학' 안의 '공과대학'을 따로 잡지 않도록), 약칭은 뒤에 '학'이 오지 않을 때만
+_COLLEGE_NAME_RE = re.compile("|".join(
+    sorted(COLLEGES, key=len, reverse=True) + [f"{alias}(?!학)" for alias in _COLLEGE_ALIASES]
+))
+_DEPARTMENT_ALIASES = {
+    "건축공": "건축공학과", "화공": "화학공학과", "환경": "환경공학과",
+    "생활체육학과": "스포츠융합과학과", "영어영문학과": "영어산업학과", "미디어영상학부": "미디어커뮤니케이션학부",
+}
+
+# 필수 과목 표
+_MSC_SECTION_RE = re.compile(r"학과별.*MSC.*교과과정표")
+_SECTION_END_RE = re.compile(r"^\(\d+\)")
+_APPLIES_FROM_RE = re.compile(r"(20\d{2})학년도\s*입학자부터\s*적용")
+_APPLIES_UNTIL_RE = re.compile(r"(20\d{2})학년도\s*이전\s*입학자\s*적용")
+_REQUIRED_CLASSIFICATIONS = ("기초교양필수", "교양필수", "교필", "기필", "전필")
+_CLASSIFICATION_TOKENS = r"(기초교양필수|기초교양선택|교양필수|교양선택|교필|교선|기필|기선|전필|전선)"
+# 이수구분 뒤에는 학점/공학인증 '필수'/대체인정·재수강 안내가 옴 ('교양필수(정보영역) C프로그래밍' 같은 영역 이름은 제외)
+_COURSE_ROW_RE = re.compile(r"([^\s*]+?)(\*?)\s+" + _CLASSIFICATION_TOKENS + r"(?=\s*(?:\d|필수|공학|재수강|$))(\s+필수)?")
+_ROW_STARTS_WITH_CLASSIFICATION_RE = re.compile(r"^" + _CLASSIFICATION_TOKENS + r"\b")
+_PARENTHESES_RE = re.compile(r"\([^)]*\)")
+_COMMON_REQUIRED_RE = re.compile(r"(20\d{2})학년도\s*[∼~～-]\s*(20\d{2})학년도\s*신입생은\s*[‘'\"](.+?)[’'\"]\s*\(필수교양\)")
+_COURSE_SERIES_RE = re.compile(r"^(.*?\D)(\d+(?:,\d+)+)$")
+
+
+def _credit_value(token):
+    """'19~22' -> 22 (범위는 보수적으로 상한), '45(39*)' -> 45, '-' -> 0"""
+    if token == "-":
+        return 0
+    token = re.sub(r"\(.*\)", "", token)
+    return int(re.split(r"[~～]", token)[-1])
+
+
+def _is_total(token):
+    return token.isdigit() and 120 <= int(token) <= 175
+
+
+def _split_names(text):
+    """이름 문자열 -> [("college"|"department", 이름), ...] (본문 순서 유지)"""
+    text = _COHORT_RE.sub("", _FORMER_NAME_RE.sub("", text)).replace(" ", "")
+    text = _COLLEGE_NAME_RE.sub(lambda m: f",@{_COLLEGE_ALIASES.get(m.group(0), m.group(0))},", text)
+    items = []
+    for part in re.split(r"[,，]", text):
+        part = part.strip()
+        if part.startswith("@"):
+            items.append(("college", part[1:]))
+        elif part in _DEPARTMENT_ALIASES:
+            items.append(("department", _DEPARTMENT_ALIASES[part]))
+        else:
+            for dept in _DEPARTMENT_RE.findall(part):
+                dept = re.sub(r"\(.*\)", "", dept)
+                items.append(("department", _DEPARTMENT_ALIASES.get(dept, dept)))
+    return items
+
+
+def _layout(header):
+    if "심화전공" in header and "미이수" in header:
+        return "2025"
+    if "단일전공시" in header:
+        return "split_liberal" if "필수+" in header else "combined_liberal"
+    return "2016"
+
+
+def _parse_numbers(layout, numbers):
+    """레이아웃별로 숫자 열을 (앞쪽 교양/기초 열, 주요 값 dict)로 분해"""
+    values = [_credit_value(n) for n in numbers]
+    if layout == "2025":
+        lead = 2 if len(values) > 6 else len(values) - 5
+        deep, major, double, minor = values[lead:lead + 4]
+        main = {"major_credits": deep or major, "major_credits_multi": major, "total_credits": values[-1]}
+        return values[:lead], main
+    if layout == "2016":
+        main = {"major_credits": values[-2], "major_credits_multi": values[-2], "total_credits": values[-1]}
+        return values[:-2], main
+    single, multi = values[-6], values[-5]
+    main = {"major_credits": single, "major_credits_multi": multi or single, "total_credits": values[-1]}
+    return values[:-6], main
+
+
+def _liberal(layout, lead, previous):
+    """앞쪽 열 -> (교양, 기초). 병합 셀이라 값이 없으면 같은 표의 직전 값 유지"""
+    if not lead:
+        return previous
+    if layout in ("combined_liberal", "2025"):
+        return sum(lead), 0   # 필수 + 균형
+    if len(lead) == 1:
+        return previous[0], lead[0]   # 교양 열이 병합된 행은 기초 열만 남음
+    return lead[0], lead[1]
+
+
+def parse_requirement_pages(pages, source=""):
+    """수강신청자료집 페이지 텍스트 -> 규칙 행(dict) 리스트"""
+    rows = []
+    block = None
+    for page_no, text in enumerate(pages, start=1):
+        for line in text.splitlines():
+            stripped = line.strip()
+            m = _BLOCK_RE.match(stripped)
+            if m:
+                year_from = int(m.group(1))
+                block = {"years": (year_from, int(m.group(2) or year_from)), "state": "seek", "header": "",
+                         "segments": [], "liberal": (0, 0), "college": "", "last": None}
+                continue
+            if block is None:
+                continue
+            if _BLOCK_END_RE.match(stripped):
+                block = None
+                continue
+            if block["state"] == "seek":
+                # 표 머리글은 '단과대(학)'로 시작
+                if stripped.replace(" ", "").startswith("단과대"):
+                    block["state"], block["header"] = "header", stripped
+                continue
+            has_number = any(_NUMBER_RE.match(t) and t != "-" for t in stripped.split())
+            if block["state"] == "header":
+                if not has_number and not _split_names(stripped):
+                    block["header"] += stripped
+                    continue
+                block["state"], block["layout"] = "table", _layout(block["header"].replace(" ", ""))
+            if stripped.startswith(("*", "※", "가)", "2)", "- ")):
+                block["state"], block["segments"] = "seek", []
+                continue
+            _consume_line(block, stripped, rows, source, page_no)
+    return rows
+
+
+def _consume_line(block, line, rows, source, page_no):
+    tokens = line.split()
+    names = " ".join(t for t in tokens if not _NUMBER_RE.match(t))
+    numbers = [t for t in tokens if _NUMBER_RE.match(t)]
+    segments = block["segments"]
+    # 여러 줄에 걸친 이름은 숫자가 나오기 전까지 한 조각으로 합침
+    if not segments or (names and segments[-1]["numbers"]):
+        segments.append({"names": names, "numbers": []})
+    elif names:
+        segments[-1]["names"] += " " + names
+    segments[-1]["numbers"].extend(numbers)
+    if not (numbers and _is_total(numbers[-1])):
+        return
+    # 행 완료: 마지막 조각이 본 행, 그 앞 조각들은 직전 행과 병합된 셀(전공/졸업학점)을 공유하는 학과
+    *shared, current = segments
+    block["segments"] = []
+    layout = block["layout"]
+    for seg in shared:
+        departments = _apply_colleges(block, _split_names(seg["names"]))
+        if not departments and _COHORT_RE.search(seg["names"]) and block["last"]:
+            departments = block["last"]["departments"]
+        if block["last"] and departments:
+            lead = [_credit_value(n) for n in seg["numbers"]]
+            liberal = _liberal(layout, lead, block["last"]["liberal"])
+            _emit(rows, block, departments, liberal, block["last"]["main"], source, page_no)
+    lead, main = _parse_numbers(layout, current["numbers"])
+    liberal = _liberal(layout, lead, block["liberal"])
+    block["liberal"] = liberal
+    items = _split_names(current["names"])
+    # 단과대학 이름 앞에 나온 학과는 직전 행의 병합 셀에 속함
+    last_college = max((i for i, (kind, _) in enumerate(items) if kind == "college"), default=-1)
+    leading = [name for kind, name in items[:last_college] if kind == "department"]
+    if leading and block["last"]:
+        _emit(rows, block, leading, block["last"]["liberal"], block["last"]["main"], source, page_no)
+    colleges = [name for kind, name in items if kind == "college"]
+    departments = _apply_colleges(block, items[max(last_college, 0):])
+    if not departments and _COHORT_RE.search(current["names"]) and block["last"]:
+        # '2021학번~'처럼 학번만 있는 행은 바로 위 학과의 최근 학번 기준
+        departments = block["last"]["departments"]
+    if departments:
+        _emit(rows, block, departments, liberal, main, source, page_no)
+    else:
+        # 단과대학 단위 행 (별칭 여러 개면 모두에 적용)
+        for college in colleges or [block["college"]]:
+            block["college"] = college
+            _emit(rows, block, [""], liberal, main, source, page_no)
+    block["last"] = {"liberal": liberal, "main": main, "departments": departments or [""]}
+
+
+def _apply_colleges(block, items):
+    """이름 목록의 단과대학은 현재 단과대학으로 반영하고 학과 이름만 반환"""
+    departments = []
+    for kind, name in items:
+        if kind == "college":
+            block["college"] = name
+        else:
+            departments.append(name)
+    return departments
+
+
+def _emit(rows, block, departments, liberal, main, source, page_no):
+    for department in departments:
+        key = (block["years"], block["college"], department)
+        # 같은 표 안에서 다시 나오면(학번별 행) 나중 행이 최신 기준
+        rows[:] = [r for r in rows if ((r["year_from"], r["year_to"]), r["college"], r["department"]) != key]
+        rows.append({
+            "year_from": block["years"][0], "year_to": block["years"][1],
+            "college": block["college"], "department": department,
+            "liberal_credits": liberal[0], "basic_credits": liberal[1],
+            **main, "source": source, "page": page_no,
+        })
+
+
+def _expand_course(name):
+    """'공학수학1,2' -> ['공학수학1', '공학수학2']"""
+    m = _COURSE_SERIES_RE.match(name)
+    if not m:
+        return [name]
+    return [f"{m.group(1)}{n}" for n in m.group(2).split(",")]
+
+
+def _course_key(name):
+    return re.sub(r"\s+", "", str(name))
+
+
+def parse_required_course_pages(pages, source=""):
+    """수강신청자료집 페이지 텍스트 -> 필수 과목 행(dict) 리스트
+
+    - 공통: '2016학년도 ∼ 2024학년도 신입생은 ‘광운인되기’(필수교양)' 문장 (department '')
+    - 학과별: MSC 교과과정표의 '20xx학년도 입학자부터 적용' 구간마다 공학인증 '필수'/'*' 표시 또는
+      필수 이수구분(교필/기초교양필수 등) 과목. 구간의 끝은 같은 학과의 바로 다음(더 최근) 구간 시작 전 해
+    """
+    rows = []
+    for page_no, text in enumerate(pages, start=1):
+        for m in _COMMON_REQUIRED_RE.finditer(re.sub(r"\s+", " ", text)):
+            rows.append({"year_from": int(m.group(1)), "year_to": int(m.group(2)), "department": "",
+                         "course": m.group(3).strip(), "source": source, "page": page_no})
+
+    in_section = False
+    department, blocks, pending_name = "", [], ""
+    for page_no, text in enumerate(pages, start=1):
+        for line in text.splitlines():
+            stripped = line.strip()
+            if _MSC_SECTION_RE.search(stripped):
+                in_section = True
+                continue
+            if not in_section:
+                continue
+            if _SECTION_END_RE.match(stripped):
+                rows.extend(_close_required_blocks(department, blocks, source))
+                in_section, department, blocks = False, "", []
+                continue
+            if _DEPARTMENT_RE.fullmatch(stripped):
+                rows.extend(_close_required_blocks(department, blocks, source))
+                department, blocks = _DEPARTMENT_ALIASES.get(stripped, stripped), []
+                continue
+            m = _APPLIES_FROM_RE.search(stripped)
+            until = _APPLIES_UNTIL_RE.search(stripped)
+            if m or until:
+                blocks.append({"year": int((m or until).group(1)), "until": m is None, "page": page_no,
+                               "courses": [], "notes": False})
+                continue
+            if not blocks or blocks[-1]["notes"]:
+                continue
+            if stripped.startswith(("*", "※")):
+                # 표 아래 안내문 -> 다음 구간 머리글까지 과목 행 없음
+                blocks[-1]["notes"] = True
+                continue
+            # '(구, 옛 이름)'/'(단과대학 공통)' 같은 괄호는 지우고, 괄호만 다음 줄로 넘어간 행은 앞줄의 과목명을 붙임
+            row = _PARENTHESES_RE.sub(" ", stripped).strip()
+            if _ROW_STARTS_WITH_CLASSIFICATION_RE.match(row) and pending_name:
+                row = f"{pending_name} {row}"
+            pending_name = row if row and " " not in row else ""
+            for name, star, classification, required in _COURSE_ROW_RE.findall(row):
+                if star or required or classification in _REQUIRED_CLASSIFICATIONS:
+                    blocks[-1]["courses"].extend(_expand_course(name.lstrip("0123456789")))
+    rows.extend(_close_required_blocks(department, blocks, source))
+    return rows
+
+
+def _close_required_blocks(department, blocks, source):
+    """학과 하나의 구간들 -> 행 ('부터 적용' 구간은 다음 구간 시작 전 해까지, '이전 적용' 구간은 그 해까지)"""
+    if not department:
+        return []
+    rows = []
+    starts = sorted({b["year"] for b in blocks if not b["until"]})
+    for block in blocks:
+        if block["until"]:
+            year_from = year_to = block["year"]
+        else:
+            later = [y for y in starts if y > block["year"]]
+            year_from, year_to = block["year"], (later[0] - 1 if later else OPEN_YEAR)
+        for course in dict.fromkeys(block["courses"]):
+            rows.append({"year_from": year_from, "year_to": year_to, "department": department,
+                         "course": course, "source": source, "page": block["page"]})
+    return rows
+
+
+def is_handbook_file(path):
+    return "자료집" in os.path.basename(path)
+
+
+def build_rules_frame(documents):
+    """ingest.IngestedDocument 리스트 중 수강신청자료집만 골라 규칙 DataFrame 생성 (최신 자료집 우선)"""
+    rows = []
+    handbooks = [d for d in documents if not d.error and is_handbook_file(d.path)]
+    handbooks.sort(key=lambda d: detect_term(d.path, d.pages), reverse=True)
+    for doc in handbooks:
+        rows.extend(parse_requirement_pages(doc.pages, doc.source))
+    df = pd.DataFrame(rows, columns=RULE_COLUMNS)
+    # 같은 표가 여러 자료집에 실리면 최신 자료집 값 유지
+    df = df.drop_duplicates(subset=["year_from", "year_to", "college", "department"], keep="first")
+    return df.reset_index(drop=True)
+
+
+def build_required_frame(documents):
+    """수강신청자료집들에서 필수 과목 DataFrame 생성. 같은 (학과, 입학년도 구간)이 여러 자료집에 있으면 최신 자료집 것만"""
+    handbooks = [d for d in documents if not d.error and is_handbook_file(d.path)]
+    handbooks.sort(key=lambda d: detect_term(d.path, d.pages), reverse=True)
+    rows, seen = [], set()
+    for doc in handbooks:
+        parsed = parse_required_course_pages(doc.pages, doc.source)
+        blocks = {(r["department"], r["year_from"], r["year_to"]) for r in parsed}
+        rows.extend(r for r in parsed if (r["department"], r["year_from"], r["year_to"]) not in seen)
+        seen |= blocks
+    df = pd.DataFrame(rows, columns=REQUIRED_COLUMNS)
+    return df.drop_duplicates(subset=["year_from", "year_to", "department", "course"]).reset_index(drop=True)
+
+
+def save_rules(df, path=RULES_PATH, sources=None):
+    save_table(df, path, sources)
+
+
+def load_rules(path=RULES_PATH, sources=None):
+    return load_table(path, sources)
+
+
+def load_or_build_rules(documents, rules_path=RULES_PATH, required_path=REQUIRED_PATH):
+    """수강신청자료집 문서들 -> (학점 규칙, 필수 과목) DataFrame. 저장된 테이블의 원본 목록이 다르면 다시 추출"""
+    handbooks = [d for d in documents if is_handbook_file(d.path)]
+    if not handbooks:
+        return None, None
+    sources = documents_version(handbooks)
+    df = load_rules(rules_path, sources)
+    if df is None:
+        df = build_rules_frame(handbooks)
+        save_rules(df, rules_path, sources)
+    required = load_rules(required_path, sources)
+    if required is None:
+        required = build_required_frame(handbooks)
+        save_rules(required, required_path, sources)
+    return df, required
+
+
+# -----------------------------------------------------------------------------
+# 판정
+# -----------------------------------------------------------------------------
+@dataclass
+class GraduationVerdict:
+    verdict: str
+    shortfalls: list          # [(구분, 기준, 취득, 부족), ...]
+    needed_credits: int       # 앞으로 더 들어야 하는 최소 학점
+    remaining_semesters: int
+    missing_required: list
+    rule: dict
+
+
+def student_record(summary, department, admission_year):
+    """transcript_pipeline.TranscriptSummary -> 판정 입력 dict"""
+    by_class = summary.credits_by_classification
+    terms = {r["term"] for r in summary.rows if re.fullmatch(r"20\d{2}-[12]", r["term"])}
+    return {
+        "department": department,
+        "admission_year": int(admission_year),
+        "earned_total": summary.earned_credits,
+        "earned_major": sum(by_class.get(c, 0) for c in MAJOR_CLASSIFICATIONS),
+        "earned_liberal": sum(by_class.get(c, 0) for c in LIBERAL_CLASSIFICATIONS),
+        "earned_basic": sum(by_class.get(c, 0) for c in BASIC_CLASSIFICATIONS),
+        "completed_semesters": len(terms),
+        "taken": {r["name"] for r in summary.rows},
+    }
+
+
+def _regular_semesters(total_credits):
+    return REGULAR_SEMESTERS + 2 if total_credits >= 160 else REGULAR_SEMESTERS  # 5년제(건축학과)
+
+
+def _decide(needed, remaining, missing):
+    if needed == 0 and not missing:
+        return VERDICT_OK
+    if needed > remaining * MAX_SEMESTER_CREDITS or (missing and remaining == 0):
+        return VERDICT_FAIL
+    if needed > remaining * ON_TRACK_LOAD or (missing and remaining <= 1):
+        return VERDICT_RISK
+    return VERDICT_OK
+
+
+class GraduationRules:
+    """(입학년도, 학과) -> 규칙. 학과 행이 없으면 소속 단과대학 행을 사용"""
+
+    REQUIREMENTS = [
+        ("총 졸업학점", "total_credits", "earned_total"),
+        ("전공", "major_credits", "earned_major"),
+        ("교양", "liberal_credits", "earned_liberal"),
+        ("기초", "basic_credits", "earned_basic"),
+    ]
+
+    def __init__(self, df, department_colleges=None, required=None):
+        self.df = df
+        # 학과 -> 단과대학: 규칙표의 학과 행(최신 연도 우선)에 시간표 기준 소속을 덮어씀
+        self.department_colleges = {
+            rule["department"]: rule["college"]
+            for rule in df.sort_values("year_from").to_dict("records")
+            if rule["department"] and rule["college"]
+        }
+        self.department_colleges.update(department_colleges or {})
+        self._by_key = {}
+        for rule in df.to_dict("records"):
+            key = rule["department"] or f"@{rule['college']}"
+            for year in range(int(rule["year_from"]), int(rule["year_to"]) + 1):
+                self._by_key.setdefault((year, key), rule)
+        # (입학년도, 학과) -> 필수 과목 (학과 ''는 전체 공통)
+        self._required = {}
+        if required is not None:
+            for row in required.to_dict("records"):
+                for year in range(int(row["year_from"]), min(int(row["year_to"]), OPEN_YEAR) + 1):
+                    self._required.setdefault((year, row["department"]), []).append(row["course"])
+        # 배치 판정용: 연도별로 펼친 규칙표
+        expanded = [dict(rule, admission_year=year, rule_key=key) for (year, key), rule in self._by_key.items()]
+        self.by_year = pd.DataFrame(expanded)
+
+    def __len__(self):
+        return len(self.df)
+
+    def lookup(self, department, admission_year):
+        rule = self._by_key.get((admission_year, department))
+        if rule is None:
+            rule = self._by_key.get((admission_year, f"@{self.department_colleges.get(department, '')}"))
+        return rule
+
+    def required_for(self, department, admission_year):
+        """공통 필수 + 학과 필수 과목 (자료집 순서, 중복 제거)"""
+        names = self._required.get((admission_year, ""), []) + self._required.get((admission_year, department), [])
+        return list(dict.fromkeys(names))
+
+    def evaluate(self, record):
+        """학생 1명 판정 (규칙이 없으면 None)"""
+        rule = self.lookup(record["department"], record["admission_year"])
+        if rule is None:
+            return None
+        shortfalls = []
+        for label, req_col, earned_col in self.REQUIREMENTS:
+            required = int(rule[req_col])
+            if required:
+                earned = int(record[earned_col])
+                shortfalls.append((label, required, earned, max(0, required - earned)))
+        total_short = shortfalls[0][3]
+        needed = max(total_short, sum(short for _, _, _, short in shortfalls[1:]))
+        remaining = max(0, _regular_semesters(int(rule["total_credits"])) - int(record["completed_semesters"]))
+        taken = {_course_key(name) for name in record.get("taken", set())}
+        missing = [name for name in self.required_for(record["department"], record["admission_year"])
+                   if _course_key(name) not in taken]
+        return GraduationVerdict(_decide(needed, remaining, missing), shortfalls, needed, remaining, missing, rule)
+
+    def evaluate_batch(self, students):
+        """students: department, admission_year, earned_* , completed_semesters[, missing_required] 열을 가진 DataFrame
+        -> 학생별 부족 학점/판정 열을 붙인 DataFrame (규칙이 없는 학생은 verdict가 None)"""
+        students = students.reset_index(drop=True)
+        keys = students["department"]
+        college_keys = "@" + keys.map(self.department_colleges).fillna("")
+        rule_cols = ["admission_year", "rule_key"] + [req for _, req, _ in self.REQUIREMENTS]
+        rules = self.by_year[rule_cols]
+        by_dept = students.assign(rule_key=keys).merge(rules, on=["admission_year", "rule_key"], how="left")
+        by_college = students.assign(rule_key=college_keys).merge(rules, on=["admission_year", "rule_key"], how="left")
+        out = students.copy()
+        for _, req, earned in self.REQUIREMENTS:
+            required = by_dept[req].fillna(by_college[req])
+            out[req] = required
+            out[f"short_{req}"] = np.maximum(0, required - students[earned])
+        found = out["total_credits"].notna().to_numpy()
+        total_short = out["short_total_credits"].to_numpy()
+        category_short = out[[f"short_{req}" for _, req, _ in self.REQUIREMENTS[1:]]].sum(axis=1).to_numpy()
+        needed = np.maximum(total_short, category_short)
+        semesters = np.where(out["total_credits"].to_numpy() >= 160, REGULAR_SEMESTERS + 2, REGULAR_SEMESTERS)
+        remaining = np.maximum(0, semesters - students["completed_semesters"].to_numpy())
+        missing = students["missing_required"].to_numpy() if "missing_required" in students else np.zeros(len(students))
+        verdict = np.select(
+            [
+                (needed == 0) & (missing == 0),
+                (needed > remaining * MAX_SEMESTER_CREDITS) | ((missing > 0) & (remaining == 0)),
+                (needed > remaining * ON_TRACK_LOAD) | ((missing > 0) & (remaining <= 1)),
+            ],
+            [VERDICT_OK, VERDICT_FAIL, VERDICT_RISK],
+            default=VERDICT_OK,
+        )
+        out["needed_credits"] = np.where(found, needed, np.nan)
+        out["remaining_semesters"] = remaining
+        out["verdict"] = np.where(found, verdict, None)
+        return out
+
+
+def format_verdict(result):
+    """GraduationVerdict -> 진단 화면/프롬프트용 마크다운"""
+    lines = [
+        f"**종합 판정: {result.verdict}** (남은 정규학기 {result.remaining_semesters}학기, 추가 필요 최소 {result.needed_credits}학점)",
+        "",
+        "| 구분 | 기준 | 취득 | 부족 |",
+        "|---|---|---|---|",
+    ]
+    lines.extend(f"| {label} | {required} | {earned} | {short} |" for label, required, earned, short in result.shortfalls)
+    if result.missing_required:
+        lines.append("")
+        lines.append("미이수 필수 과목: " + ", ".join(result.missing_required))
+    rule = result.rule
+    lines.append("")
+    lines.append(f"<sub>기준: {rule['source']} p.{rule['page']} · {rule['year_from']}~{rule['year_to']}학년도 입학자 · "
+                 f"{rule['department'] or rule['college']}</sub>")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    """오프라인 빌드: python graduation_rules.py [data_dir] [output_path]"""
+    from ingest import ingest_pdfs
+
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = argv[0] if argv else "data"
+    out_path = argv[1] if len(argv) > 1 else RULES_PATH
+    pdf_files = sorted(p for p in glob.glob(os.path.join(data_dir, "*.pdf")) if is_handbook_file(p))
+    documents = ingest_pdfs(pdf_files)
+    sources = documents_version(documents)
+    df = build_rules_frame(documents)
+    save_rules(df, out_path, sources)
+    print(f"{len(df)} rules -> {out_path}")
+    required = build_required_frame(documents)
+    required_path = os.path.join(os.path.dirname(out_path), os.path.basename(REQUIRED_PATH))
+    save_rules(required, required_path, sources)
+    print(f"{len(required)} required courses -> {required_path}")
+    for (year_from, year_to), group in df.groupby(["year_from", "year_to"]):
+        print(f"  {year_from}~{year_to}: {len(group)} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import io
+import base64
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageChops, ImageOps, UnidentifiedImageError
+
+# -----------------------------------------------------------------------------
+# 성적표 캡처 이미지 전처리 (업로드 전)
+# - 실제 포맷 판별 (확장자/업로더 라벨과 무관하게 파일 내용 기준)
+# - 가장자리 여백 자르기 -> 긴 변 MAX_LONG_EDGE 이하로 축소 (확대는 하지 않음)
+# - PNG/JPEG 중 더 작은 쪽으로 재인코딩 (원본이 더 작으면 원본 유지)
+# - 같은 캡처를 여러 번 올린 경우 지각 해시(dHash)로 중복 제거
+# -----------------------------------------------------------------------------
+MAX_LONG_EDGE = 1600          # 성적표 글자가 읽히는 최소 해상도 기준
+WHITESPACE_THRESHOLD = 12     # 배경색과의 밝기 차이가 이 값 이하면 여백으로 간주
+CROP_MARGIN = 16
+JPEG_QUALITY = 85
+HASH_SIZE = 16                # 16x16 = 256비트 dHash
+DUPLICATE_DISTANCE = 6        # 해밍 거리 이하면 같은 캡처로 간주 (재압축/축소본 ~3비트, 다른 화면 20비트 이상)
+
+_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "GIF": "image/gif"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    original_bytes: int
+    phash: int = None         # 열 수 없는 파일은 None (바이트가 같을 때만 중복 처리)
+    kept_original: bool = False   # 재인코딩이 더 크지 않아 업로드 원본을 그대로 보낸 경우
+
+    @property
+    def data_url(self):
+        return f"data:{self.mime};base64,{base64.b64encode(self.data).decode('utf-8')}"
+
+
+@dataclass
+class PrepReport:
+    images: list = field(default_factory=list)       # PreparedImage (중복 제외)
+    duplicates: int = 0
+    original_bytes: int = 0
+
+    @property
+    def final_bytes(self):
+        return sum(len(img.data) for img in self.images)
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - self.final_bytes
+
+    def summary(self):
+        ratio = self.bytes_saved / self.original_bytes * 100 if self.original_bytes else 0.0
+        text = (f"이미지 {len(self.images)}장 · {self.original_bytes / 1024:.0f}KB → "
+                f"{self.final_bytes / 1024:.0f}KB ({ratio:.0f}% 절감)")
+        if self.duplicates:
+            text += f" · 중복 {self.duplicates}장 제외"
+        kept = sum(img.kept_original for img in self.images)
+        if kept:
+            text += f" · 원본 유지 {kept}장"
+        return text
+
+
+def sniff_mime(data):
+    """Pillow가 열지 못하는 경우를 위한 매직 바이트 판별"""
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def dhash(image, size=HASH_SIZE):
+    gray = image.convert("L").resize((size + 1, size), Image.LANCZOS)
+    px = gray.tobytes()
+    value = 0
+    for y in range(size):
+        row = y * (size + 1)
+        for x in range(size):
+            value = (value << 1) | (px[row + x] > px[row + x + 1])
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def crop_whitespace(image, margin=CROP_MARGIN):
+    """왼쪽 위 픽셀 색을 배경으로 보고, 배경과 다른 영역만 남김"""
+    gray = image.convert("L")
+    background = Image.new("L", gray.size, gray.getpixel((0, 0)))
+    diff = ImageChops.difference(gray, background).point(lambda v: 255 if v > WHITESPACE_THRESHOLD else 0)
+    bbox = diff.getbbox()
+    if not bbox:
+        return image
+    left, top, right, bottom = bbox
+    bbox = (max(0, left - margin), max(0, top - margin),
+            min(image.width, right + margin), min(image.height, bottom + margin))
+    return image.crop(bbox) if bbox != (0, 0, image.width, image.height) else image
+
+
+def _encode(image):
+    """PNG(무손실)와 JPEG 중 더 작은 인코딩 선택"""
+    png = io.BytesIO()
+    image.save(png, format="PNG", optimize=True)
+    jpeg = io.BytesIO()
+    image.convert("RGB").save(jpeg, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    if len(png.getvalue()) <= len(jpeg.getvalue()):
+        return png.getvalue(), "image/png"
+    return jpeg.getvalue(), "image/jpeg"
+
+
+def prepare_image(data, max_long_edge=MAX_LONG_EDGE):
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (UnidentifiedImageError, OSError):
+        # 열 수 없는 파일은 그대로 전달 (모델 쪽에서 판단)
+        return PreparedImage(data, sniff_mime(data), 0, 0, len(data))
+    source_mime = _MIME_TYPES.get(image.format, sniff_mime(data))
+    original = image
+    image = ImageOps.exif_transpose(image)
+    # 원본을 그대로 보낼 때의 메타데이터는 업로드되는 바이트 기준 (방향만 EXIF대로 맞춰 다른 캡처와 비교)
+    upright = image
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    image = crop_whitespace(image)
+    if max(image.size) > max_long_edge:
+        scale = max_long_edge / max(image.size)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+    encoded, mime = _encode(image)
+    # 여백을 잘랐거나 축소했더라도 결과가 원본보다 크면 원본 그대로 전달 (업로드 바이트가 늘지 않도록)
+    if len(encoded) >= len(data) and source_mime in ("image/png", "image/jpeg"):
+        return PreparedImage(data, source_mime, original.width, original.height, len(data),
+                             dhash(upright), kept_original=True)
+    return PreparedImage(encoded, mime, image.width, image.height, len(data), dhash(image))
+
+
+def _is_duplicate(a, b, distance):
+    if a.phash is None or b.phash is None:
+        return a.data == b.data
+    return hamming(a.phash, b.phash) <= distance
+
+
+def prepare_images(blobs, max_long_edge=MAX_LONG_EDGE, duplicate_distance=DUPLICATE_DISTANCE):
+    """이미지 바이트 리스트 -> PrepReport (업로드 순서 유지, 중복은 먼저 올린 것만 남김)"""
+    report = PrepReport()
+    for data in blobs:
+        report.original_bytes += len(data)
+        prepared = prepare_image(data, max_long_edge)
+        if any(_is_duplicate(prepared, kept, duplicate_distance) for kept in report.images):
+            report.duplicates += 1
+            continue
+        report.images.append(prepared)
+    return report
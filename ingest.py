@@ -0,0 +1,143 @@
+import os
+import time
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from pypdf import PdfReader
+
+from pdf_cache import ParsedPdfCache
+
+# -----------------------------------------------------------------------------
+# PDF 병렬 수집(Ingestion) 파이프라인
+# - 캐시에 없는 파일만 (파일, 페이지 구간) 단위 작업으로 쪼개 프로세스 풀에서 추출
+# - 결과는 페이지 순서대로 재조립하고, 본문은 한 번의 join으로 합침
+# -----------------------------------------------------------------------------
+PARSER_TAG = "pypdf-pages"
+PAGES_PER_TASK = 16
+
+
+@dataclass
+class IngestedDocument:
+    path: str
+    pages: list = field(default_factory=list)
+    seconds: float = 0.0       # 파일별 추출 소요 시간 (워커 시간 합계)
+    cached: bool = False
+    error: str = ""
+    sha256: str = ""
+
+    @property
+    def source(self):
+        return os.path.basename(self.path)
+
+
+def count_pages(path):
+    return len(PdfReader(path).pages)
+
+
+def extract_page_range(path, start, end):
+    """[start, end) 구간의 페이지 텍스트 추출 (프로세스 풀 워커)"""
+    began = time.perf_counter()
+    reader = PdfReader(path)
+    texts = [reader.pages[i].extract_text() or "" for i in range(start, end)]
+    return path, start, texts, time.perf_counter() - began
+
+
+def parse_pdf_pages(path):
+    """단일 프로세스 전체 파싱 (캐시 로더 등에서 사용)"""
+    return extract_page_range(path, 0, count_pages(path))[2]
+
+
+def _page_ranges(page_count, pages_per_task):
+    return [(s, min(s + pages_per_task, page_count)) for s in range(0, page_count, pages_per_task)]
+
+
+def ingest_pdfs(pdf_files, cache=None, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """PDF 목록을 읽어 IngestedDocument 리스트 반환 (입력 순서 유지)"""
+    if cache is None:
+        cache = ParsedPdfCache(parser_tag=PARSER_TAG)
+    documents = [IngestedDocument(path=p) for p in pdf_files]
+
+    # 1. 캐시 적중 파일은 바로 채우고, 미스 파일만 작업으로 분할
+    tasks = []
+    for doc in documents:
+        began = time.perf_counter()
+        try:
+            doc.sha256 = cache.fingerprint(doc.path)["sha256"]
+            pages = cache.get(doc.path)
+            if pages is not None:
+                doc.pages, doc.cached = pages, True
+                doc.seconds = time.perf_counter() - began
+                continue
+            page_count = count_pages(doc.path)
+            doc.pages = [""] * page_count
+            tasks.extend((doc, s, e) for s, e in _page_ranges(page_count, pages_per_task))
+        except Exception as e:
+            doc.error = str(e)
+
+    # 2. 페이지 구간 단위 병렬 추출 (작업이 하나뿐이면 풀 생성 생략)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(tasks)))
+    by_path = {doc.path: doc for doc in documents}
+
+    def _collect(result):
+        path, start, texts, seconds = result
+        doc = by_path[path]
+        doc.pages[start:start + len(texts)] = texts
+        doc.seconds += seconds
+
+    if max_workers == 1:
+        for doc, s, e in tasks:
+            try:
+                _collect(extract_page_range(doc.path, s, e))
+            except Exception as ex:
+                doc.error = str(ex)
+    elif tasks:
+        # Streamlit 스크립트 스레드 안에서 fork는 위험하므로 spawn 사용
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+            futures = {pool.submit(extract_page_range, doc.path, s, e): doc for doc, s, e in tasks}
+            for future in as_completed(futures):
+                try:
+                    _collect(future.result())
+                except Exception as ex:
+                    futures[future].error = str(ex)
+
+    # 3. 새로 파싱한 파일은 캐시에 저장
+    for doc in documents:
+        if not doc.cached and not doc.error and doc.pages:
+            cache.put(doc.path, doc.pages)
+    return documents
+
+
+def build_corpus_text(documents):
+    """문서 헤더 + 페이지 본문을 한 번의 join으로 합친 전체 텍스트"""
+    parts = []
+    for doc in documents:
+        if doc.error:
+            continue
+        parts.append(f"\n\n--- [문서: {doc.source}] ---\n")
+        parts.extend(doc.pages)
+    return "".join(parts)
+
+
+def corpus_version(documents):
+    """문서 구성(파일명 + 내용 해시)이 같으면 같은 값 -> 응답 캐시 등의 무효화 기준"""
+    digest = hashlib.sha256()
+    for doc in sorted(documents, key=lambda d: d.source):
+        if not doc.error:
+            digest.update(f"{doc.source}:{doc.sha256}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def format_timing_report(documents):
+    lines = []
+    for doc in documents:
+        if doc.error:
+            status = f"실패 ({doc.error})"
+        else:
+            status = "캐시" if doc.cached else f"{len(doc.pages)}쪽 파싱"
+        lines.append(f"{doc.source}: {doc.seconds:.2f}s ({status})")
+    return lines
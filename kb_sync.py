@@ -0,0 +1,327 @@
+import os
+import re
+import sys
+import glob
+import time
+import threading
+from dataclasses import dataclass, field, replace
+
+from ingest import ingest_pdfs, build_corpus_text, corpus_version, format_timing_report
+from retrieval import BM25Index, tokenize_document
+from course_catalog import detect_term, is_timetable_file
+
+# -----------------------------------------------------------------------------
+# 지식베이스 증분 동기화
+# - data/ 폴더의 manifest(파일명 -> 크기, 수정시각, 내용 해시)를 현재 스냅샷과 비교해 추가/변경/삭제 문서만 골라냄
+# - 바뀐 문서만 다시 파싱(ParsedPdfCache 경유)하고 청크/단어 빈도를 다시 계산,
+#   나머지 문서는 이전 스냅샷의 결과를 그대로 재사용해 새 인덱스를 조립
+# - 문서마다 버전 번호를 두고, 내용 해시가 바뀔 때만 올림
+# - 새 스냅샷은 완성된 뒤 참조 한 번으로 교체: 진행 중인 요청은 이전 스냅샷으로 끝까지 처리됨
+# - 문서는 (연도-학기)별 파티션으로 나눠 색인: 질문/선택한 학기의 파티션만 검색해 다른 학기 내용이 섞이지 않음
+#   (학기를 알 수 없는 문서는 모든 파티션에 공통으로 포함)
+# -----------------------------------------------------------------------------
+DATA_DIR = "data"
+
+DOC_TIMETABLE = "timetable"
+DOC_HANDBOOK = "handbook"
+DOC_OTHER = "other"
+
+_TERM_KEY_RE = re.compile(r"(20\d{2})\s*-\s*([12])")
+_TERM_TEXT_RE = re.compile(r"(20\d{2})\s*학년도\s*([12])\s*학기")
+_SEMESTER_RE = re.compile(r"([12])\s*학기")
+
+
+def document_type(path):
+    if is_timetable_file(path):
+        return DOC_TIMETABLE
+    if "자료집" in os.path.basename(path):
+        return DOC_HANDBOOK
+    return DOC_OTHER
+
+
+def term_key(year, term):
+    return f"{year}-{term}" if year and term else ""
+
+
+def mentioned_term(text):
+    """'2025-1', '2025학년도 1학기' -> '2025-1' / '1학기' -> '1' (연도 없음) / 없으면 ''"""
+    m = _TERM_KEY_RE.search(text or "") or _TERM_TEXT_RE.search(text or "")
+    if m:
+        return term_key(m.group(1), m.group(2))
+    m = _SEMESTER_RE.search(text or "")
+    return m.group(1) if m else ""
+
+
+@dataclass
+class DocumentVersion:
+    document: object          # ingest.IngestedDocument
+    chunks: list              # retrieval.tokenize_document 결과
+    version: int
+    size: int
+    mtime_ns: int
+    term: str = ""            # '2025-2' (파일명 또는 본문에서 추출, 모르면 '')
+    doc_type: str = DOC_OTHER
+
+    @property
+    def source(self):
+        return self.document.source
+
+    @property
+    def sha256(self):
+        return self.document.sha256
+
+
+@dataclass
+class Partition:
+    term: str
+    sources: list             # 파티션에 포함된 문서명 (학기 공통 문서 포함)
+    index: BM25Index
+    version: str
+    _documents: list = field(default_factory=list, repr=False)
+
+    @property
+    def corpus_text(self):
+        """캐시 모드에서만 필요하므로 요청 시 생성"""
+        return build_corpus_text(self._documents)
+
+
+@dataclass
+class KnowledgeBase:
+    """한 시점의 지식베이스 (생성 후 변경하지 않음)"""
+    documents: dict = field(default_factory=dict)   # 파일명 -> DocumentVersion
+    partitions: dict = field(default_factory=dict)  # '2025-2' -> Partition
+    version: str = ""
+    report: list = field(default_factory=list)
+    generation: int = 0
+
+    def ingested(self, predicate=None):
+        """IngestedDocument 리스트 (파일명 순). predicate(path)로 거를 수 있음"""
+        return [v.document for _, v in sorted(self.documents.items()) if predicate is None or predicate(v.document.path)]
+
+    def versions(self):
+        return {source: v.version for source, v in self.documents.items()}
+
+    def terms(self):
+        return sorted(self.partitions)
+
+    def resolve_term(self, text="", semester=""):
+        """질문에 적힌 학기 -> 선택한 학기(semester='1학기') -> 최신 학기 순으로 파티션 결정"""
+        if not self.partitions:
+            return ""
+        wanted = mentioned_term(text) or mentioned_term(semester)
+        if wanted in self.partitions:
+            return wanted
+        if wanted and "-" not in wanted:
+            same_semester = [t for t in self.terms() if t.endswith(f"-{wanted}")]
+            if same_semester:
+                return same_semester[-1]
+        return self.terms()[-1]
+
+    def partition(self, term=""):
+        return self.partitions.get(term) or self.partitions.get(self.resolve_term(term))
+
+    def search(self, query, k=8, term="", doc_types=None):
+        """한 학기 파티션만 검색. doc_types가 있으면 해당 종류 문서의 문단만"""
+        part = self.partition(term)
+        if part is None:
+            return []
+        sources = None
+        if doc_types:
+            sources = {s for s in part.sources if self.documents[s].doc_type in doc_types}
+        return part.index.search(query, k=k, sources=sources)
+
+
+@dataclass
+class SyncResult:
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)     # 파일명 -> 오류 (이전 버전 유지)
+    seconds: float = 0.0
+    version: str = ""
+
+    @property
+    def has_changes(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self):
+        text = (f"추가 {len(self.added)} · 변경 {len(self.changed)} · 삭제 {len(self.removed)} · "
+                f"유지 {len(self.unchanged)} ({self.seconds:.2f}s)")
+        if self.failed:
+            text += f" · 실패 {len(self.failed)} (이전 버전 유지)"
+        return text
+
+
+def scan_manifest(data_dir=DATA_DIR):
+    """파일명 -> (경로, 크기, 수정시각 ns)"""
+    manifest = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.pdf"))):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue  # 스캔 도중 삭제된 파일
+        manifest[os.path.basename(path)] = (path, stat.st_size, stat.st_mtime_ns)
+    return manifest
+
+
+def _build_partition(term, entries):
+    index = BM25Index()
+    for entry in entries:
+        index.add_chunks(entry.source, entry.chunks)
+    ingested = [entry.document for entry in entries]
+    return Partition(term, [e.source for e in entries], index, corpus_version(ingested), ingested)
+
+
+def assemble(documents, generation=0, previous=None):
+    """DocumentVersion dict -> KnowledgeBase (청크/단어 빈도는 재계산하지 않음).
+    구성 문서가 그대로인 파티션은 previous 스냅샷의 인덱스를 재사용"""
+    ordered = [documents[source] for source in sorted(documents)]
+    shared = [e for e in ordered if not e.term]
+    terms = sorted({e.term for e in ordered if e.term}) or [""]
+    partitions = {}
+    for term in terms:
+        entries = [e for e in ordered if e.term == term] + shared
+        version = corpus_version([e.document for e in entries])
+        old = previous.partitions.get(term) if previous is not None else None
+        partitions[term] = old if old is not None and old.version == version else _build_partition(term, entries)
+    ingested = [entry.document for entry in ordered]
+    return KnowledgeBase(
+        documents=dict(documents),
+        partitions=partitions,
+        version=corpus_version(ingested),
+        report=format_timing_report(ingested),
+        generation=generation,
+    )
+
+
+class KnowledgeBaseSync:
+    def __init__(self, data_dir=DATA_DIR, ingest=ingest_pdfs):
+        self.data_dir = data_dir
+        self._ingest = ingest
+        self._current = KnowledgeBase()
+        self._refresh_lock = threading.Lock()   # 동기화는 한 번에 하나만
+        self._watcher = None
+        self._stop = threading.Event()
+        self.last_result = None
+        self.listeners = []                     # 버전이 바뀌면 listener(old_kb, new_kb) 호출
+
+    def current(self):
+        """지금 시점의 스냅샷. 요청 하나는 처음 받은 스냅샷만 사용하면 됨"""
+        return self._current
+
+    def diff(self, manifest=None):
+        """manifest와 현재 스냅샷 비교 -> (추가, 변경 후보, 삭제, 유지). 크기/수정시각만 보므로 해싱 없음"""
+        manifest = scan_manifest(self.data_dir) if manifest is None else manifest
+        known = self._current.documents
+        added = [s for s in manifest if s not in known]
+        removed = [s for s in known if s not in manifest]
+        touched, unchanged = [], []
+        for source, (_, size, mtime_ns) in manifest.items():
+            entry = known.get(source)
+            if entry is None:
+                continue
+            if (entry.size, entry.mtime_ns) == (size, mtime_ns):
+                unchanged.append(source)
+            else:
+                touched.append(source)
+        return added, touched, removed, unchanged
+
+    def refresh(self):
+        """바뀐 문서만 다시 읽어 새 스냅샷을 만들고 교체"""
+        with self._refresh_lock:
+            began = time.perf_counter()
+            manifest = scan_manifest(self.data_dir)
+            added, touched, removed, unchanged = self.diff(manifest)
+            old = self._current
+            # 새 파일은 파싱에 성공했을 때만 '추가' (실패하면 failed에만 남고 다음 동기화 때 다시 시도)
+            result = SyncResult(removed=removed, unchanged=list(unchanged))
+            documents = {s: old.documents[s] for s in unchanged}
+
+            fresh = self._ingest([manifest[s][0] for s in added + touched]) if added or touched else []
+            for doc in fresh:
+                source = doc.source
+                _, size, mtime_ns = manifest[source]
+                previous = old.documents.get(source)
+                if doc.error:
+                    result.failed[source] = doc.error
+                    if previous is not None:
+                        documents[source] = previous
+                    continue
+                if previous is not None and previous.sha256 == doc.sha256:
+                    # 수정시각만 바뀜 (내용 동일): 청크 재사용, 버전 유지
+                    documents[source] = replace(previous, size=size, mtime_ns=mtime_ns)
+                    result.unchanged.append(source)
+                    continue
+                (result.changed if previous is not None else result.added).append(source)
+                version = previous.version + 1 if previous is not None else 1
+                documents[source] = DocumentVersion(doc, tokenize_document(doc.pages), version, size, mtime_ns,
+                                                    term_key(*detect_term(doc.path, doc.pages[:3])), document_type(doc.path))
+
+            if result.has_changes or old.generation == 0:
+                new = assemble(documents, old.generation + 1, previous=old)
+                self._current = new   # 참조 교체 한 번: 진행 중인 요청은 old를 계속 사용
+                for listener in self.listeners:
+                    try:
+                        listener(old, new)
+                    except Exception as e:
+                        print(f"[kb_sync] listener error: {e}")
+            elif touched:
+                # 수정시각만 바뀐 파일: 인덱스는 그대로, manifest 정보만 갱신
+                self._current = replace(old, documents=documents)
+            result.version = self._current.version
+            result.seconds = time.perf_counter() - began
+            self.last_result = result
+            return result
+
+    def refresh_if_changed(self):
+        """크기/수정시각이 바뀐 파일이 있을 때만 refresh (없으면 None)"""
+        added, touched, removed, _ = self.diff()
+        if added or touched or removed:
+            return self.refresh()
+        return None
+
+    # --- 폴더 감시 (폴링) --------------------------------------------------
+    def watch(self, interval):
+        """interval초마다 data 폴더를 확인하는 데몬 스레드 시작 (이미 실행 중이면 무시)"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+
+        def _loop():
+            while not self._stop.wait(interval):
+                try:
+                    result = self.refresh_if_changed()
+                    if result is not None:
+                        print(f"[kb_sync] {result.summary()} -> {result.version}")
+                except Exception as e:
+                    print(f"[kb_sync] watch error: {e}")
+
+        self._watcher = threading.Thread(target=_loop, name="kb-sync-watch", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    """폴더 감시 테스트: python kb_sync.py [data_dir] [interval]  (PDF를 넣거나 지우면 변경분만 반영)"""
+    argv = sys.argv[1:] if argv is None else argv
+    data_dir = argv[0] if argv else DATA_DIR
+    interval = float(argv[1]) if len(argv) > 1 else 2.0
+    sync = KnowledgeBaseSync(data_dir)
+    result = sync.refresh()
+    kb = sync.current()
+    print(f"{result.summary()} -> {result.version}")
+    for term, part in sorted(kb.partitions.items()):
+        print(f"  [{term or '공통'}] {len(part.index)} passages: {', '.join(part.sources)}")
+    sync.watch(interval)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sync.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+
+from rate_limiter import LocalBusyError
+
+# -----------------------------------------------------------------------------
+# 프로세스 전역 LLM 클라이언트 레지스트리
+# - (모델, 캐시 핸들)마다 ChatGoogleGenerativeAI 인스턴스를 한 번만 만들어 재사용
+#   핸들은 scope(학기 파티션)별로 동시에 살아 있으므로, 같은 scope의 핸들이 바뀔 때만 이전 인스턴스를 폐기
+#   -> 내부 httpx 클라이언트의 keep-alive 연결 풀을 모든 세션이 공유
+# - 모델별 설정(temperature, timeout, 재시도 횟수)은 MODEL_CONFIGS에서 관리
+#   (재시도는 공용 스케줄러가 담당하므로 클라이언트 자체 재시도는 끔 -> 재시도가 곱으로 쌓이지 않음)
+# - 동시에 처리 중인 요청 수를 세마포어로 제한
+# - callbacks: 모든 인스턴스에 붙일 LangChain 콜백 (계측용 토큰/프롬프트 집계 등)
+# -----------------------------------------------------------------------------
+DEFAULT_MAX_IN_FLIGHT = 8
+POOL_CONNECTIONS = 16        # 모델 인스턴스당 최대 연결 수
+POOL_KEEPALIVE = 8           # 유휴 상태로 유지할 연결 수
+POOL_KEEPALIVE_EXPIRY = 60.0
+SLOT_TIMEOUT = 60.0          # 빈 자리를 기다리는 최대 시간(초)
+
+DEFAULT_MODEL = "gemini-2.5-flash-preview-09-2025"
+DEFAULT_MODEL_CONFIG = {"temperature": 0, "timeout": 120, "max_retries": 0}
+MODEL_CONFIGS = {
+    DEFAULT_MODEL: {"temperature": 0, "timeout": 120, "max_retries": 0},
+}
+
+
+class LLMBusyError(LocalBusyError):
+    """동시 요청 한도가 꽉 찬 상태로 SLOT_TIMEOUT이 지남
+    (스케줄러는 허용량을 줄이지 않고 재시도, 화면의 '사용량 초과' 안내가 나오도록 메시지에 RESOURCE_EXHAUSTED 포함)"""
+
+    def __init__(self, max_in_flight):
+        super().__init__(f"RESOURCE_EXHAUSTED: 동시 요청 한도({max_in_flight}) 초과")
+
+
+def _gemini_factory(api_key):
+    def _create(model, cached_content, config):
+        import httpx
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        limits = httpx.Limits(
+            max_connections=POOL_CONNECTIONS,
+            max_keepalive_connections=POOL_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        )
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            cached_content=cached_content,
+            client_args={"limits": limits},
+            **config,
+        )
+    return _create
+
+
+class LLMClientRegistry:
+    def __init__(self, api_key="", configs=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT, factory=None, callbacks=None):
+        self.configs = dict(MODEL_CONFIGS if configs is None else configs)
+        self.callbacks = list(callbacks or [])
+        self.max_in_flight = max_in_flight
+        self._factory = factory or _gemini_factory(api_key)
+        self._clients = {}  # (model, cached_content) -> chat model
+        self._scope_handles = {}  # (model, scope) -> 현재 cached_content
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.created = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def config_for(self, model):
+        config = {**DEFAULT_MODEL_CONFIG, **self.configs.get(model, {})}
+        if self.callbacks:
+            config["callbacks"] = self.callbacks
+        return config
+
+    def get(self, model, cached_content=None, scope=""):
+        """scope: 캐시 핸들의 구분 (ContextCacheManager.get_handle의 scope와 같은 값)"""
+        key = (model, cached_content)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                return client
+            # 같은 scope의 핸들이 바뀌면(그 학기 문서 버전 변경) 이전 핸들용 인스턴스만 폐기 (다른 학기 핸들은 유지)
+            if cached_content:
+                retired = self._scope_handles.get((model, scope))
+                self._scope_handles[(model, scope)] = cached_content
+                if retired and retired != cached_content:
+                    self._clients.pop((model, retired), None)
+            client = self._factory(model, cached_content, self.config_for(model))
+            self._clients[key] = client
+            self.created += 1
+            return client
+
+    @contextmanager
+    def slot(self, timeout=SLOT_TIMEOUT):
+        """LLM 호출 1건 동안 동시 요청 자리 하나를 점유"""
+        if not self._slots.acquire(timeout=timeout):
+            raise LLMBusyError(self.max_in_flight)
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
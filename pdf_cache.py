@@ -0,0 +1,100 @@
+import os
+import json
+import gzip
+import hashlib
+
+# -----------------------------------------------------------------------------
+# PDF 파싱 결과 디스크 캐시
+# - 원본 파일의 SHA-256 해시로 엔트리를 식별 (내용 기반 주소)
+# - manifest에 (크기, 수정시각, 해시)를 기록해 두어, 크기/수정시각이 같으면 재해싱 생략
+# - 페이지 텍스트는 gzip 압축 JSON으로 저장
+# -----------------------------------------------------------------------------
+CACHE_DIR = os.path.join(".cache", "pdf")
+CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """파일 내용의 SHA-256 해시 (큰 파일도 청크 단위로 읽음)"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ParsedPdfCache:
+    def __init__(self, cache_dir=CACHE_DIR, parser_tag="default"):
+        self.cache_dir = cache_dir
+        # 파서가 바뀌면 기존 캐시를 재사용하지 않도록 태그를 엔트리 이름에 포함
+        self.parser_tag = parser_tag
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        os.makedirs(cache_dir, exist_ok=True)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == CACHE_FORMAT_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": CACHE_FORMAT_VERSION, "files": {}}
+
+    def _write_manifest(self):
+        self._atomic_write(self.manifest_path, json.dumps(self.manifest, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _atomic_write(path, payload):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def fingerprint(self, path):
+        """(sha256, size, mtime) 지문 반환. 크기/수정시각이 manifest와 같으면 해시 재계산 생략"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        known = self.manifest["files"].get(key)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known
+        fp = {"sha256": file_sha256(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.manifest["files"][key] = fp
+        self._write_manifest()
+        return fp
+
+    def _entry_path(self, fp):
+        return os.path.join(self.cache_dir, f"{fp['sha256']}.{self.parser_tag}.json.gz")
+
+    def get(self, path):
+        """캐시된 페이지 텍스트 리스트 반환 (없거나 손상되면 None)"""
+        fp = self.fingerprint(path)
+        try:
+            with gzip.open(self._entry_path(fp), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("sha256") == fp["sha256"] and entry.get("size") == fp["size"]:
+                return entry["pages"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def put(self, path, pages):
+        fp = self.fingerprint(path)
+        entry = {
+            "source": os.path.basename(path),
+            "sha256": fp["sha256"],
+            "size": fp["size"],
+            "mtime_ns": fp["mtime_ns"],
+            "pages": list(pages),
+        }
+        payload = gzip.compress(json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._atomic_write(self._entry_path(fp), payload)
+
+    def load(self, path, parse_fn):
+        """캐시 적중 시 즉시 반환, 미스일 때만 parse_fn(path)로 파싱 후 저장"""
+        pages = self.get(path)
+        if pages is None:
+            pages = parse_fn(path)
+            self.put(path, pages)
+        return pages
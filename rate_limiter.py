@@ -0,0 +1,232 @@
+import re
+import time
+import heapq
+import random
+import itertools
+import threading
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# 세션 공용 LLM 요청 스케줄러 (토큰 버킷 + 우선순위 대기열 + 적응형 백오프)
+# - 모든 세션의 요청이 하나의 토큰 버킷을 공유: 초당 허용량을 넘는 요청은 대기열에서 기다림
+# - 대기열은 우선순위 순(대화형 채팅 > AI Scan/진단 같은 대량 작업), 같은 우선순위는 도착 순
+# - 429/503을 받으면 Retry-After(없으면 지터 섞인 지수 백오프)만큼 전체 발송을 멈추고
+#   허용량을 절반으로 줄였다가, 성공이 이어지면 조금씩 회복 (AIMD)
+# - LocalBusyError(이 프로세스의 동시 요청 자리 부족)는 API가 제한한 것이 아니므로 허용량을 줄이지 않고 다시 시도
+# - 대기열 길이와 대기 시간 분포를 stats()로 노출
+# -----------------------------------------------------------------------------
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+DEFAULT_RATE = 2.0        # 초당 발송 허용량 (Gemini 분당 요청 한도 기준)
+DEFAULT_BURST = 4
+MIN_RATE = 0.1
+RECOVERY_STEP = 0.1       # 성공 1회당 회복량 (초당 요청 수)
+MAX_ATTEMPTS = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+MAX_QUEUE_WAIT = 90.0     # 이보다 오래 기다리면 포기
+WAIT_SAMPLES = 1000
+
+_TRANSIENT_MARKERS = ("429", "RESOURCE_EXHAUSTED", "503", "UNAVAILABLE")
+_RETRY_AFTER_PATTERNS = [
+    re.compile(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", re.IGNORECASE),
+    re.compile(r"retry[- ]after['\"]?\s*[:=]?\s*['\"]?(\d+(?:\.\d+)?)", re.IGNORECASE),
+    re.compile(r"retry in (\d+(?:\.\d+)?)\s*s", re.IGNORECASE),
+]
+
+
+class QueueTimeoutError(RuntimeError):
+    def __init__(self, waited):
+        super().__init__(f"RESOURCE_EXHAUSTED: 요청 대기열에서 {waited:.0f}초 대기 후 포기")
+
+
+class LocalBusyError(RuntimeError):
+    """로컬 자원 부족 (API 응답이 아님): 백오프/허용량 감소 없이 재시도"""
+
+
+def is_transient(exc):
+    message = str(exc)
+    return any(marker in message for marker in _TRANSIENT_MARKERS)
+
+
+def _exception_chain(exc):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def retry_after_seconds(exc):
+    """예외(및 원인 예외)의 retry_after 속성, HTTP Retry-After 헤더, 메시지 속 retryDelay 순으로 조회"""
+    for err in _exception_chain(exc):
+        value = getattr(err, "retry_after", None)
+        if value is not None:
+            return float(value)
+        headers = getattr(getattr(err, "response", None), "headers", None)
+        if headers is not None:
+            header = headers.get("retry-after") or headers.get("Retry-After")
+            if header:
+                try:
+                    return float(header)
+                except ValueError:
+                    pass
+        for pattern in _RETRY_AFTER_PATTERNS:
+            m = pattern.search(str(err))
+            if m:
+                return float(m.group(1))
+    return None
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now=None):
+        """토큰 1개 소비. 성공이면 0, 아니면 다음 토큰까지 남은 시간(초)"""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RequestScheduler:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, max_attempts=MAX_ATTEMPTS,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, max_queue_wait=MAX_QUEUE_WAIT,
+                 clock=time.monotonic, rng=None):
+        self.max_rate = rate
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_wait = max_queue_wait
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._cond = threading.Condition()
+        self._queue = []  # (priority, seq) 최소 힙
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._waits = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITY_NAMES}
+        self.counters = {"completed": 0, "throttled": 0, "retries": 0, "busy": 0, "failed": 0, "queue_timeouts": 0}
+
+    # --- 대기열 ---------------------------------------------------------------
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """대기열 맨 앞 차례가 되고 토큰을 얻을 때까지 대기. 대기 시간(초) 반환"""
+        ticket = (priority, next(self._seq))
+        start = self.clock()
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    if now - start > self.max_queue_wait:
+                        self.counters["queue_timeouts"] += 1
+                        raise QueueTimeoutError(now - start)
+                    if self._queue[0] == ticket:
+                        delay = self._paused_until - now
+                        if delay <= 0:
+                            delay = self.bucket.try_take(now)
+                            if delay == 0:
+                                heapq.heappop(self._queue)
+                                self._cond.notify_all()
+                                break
+                        self._cond.wait(timeout=delay)
+                    else:
+                        self._cond.wait(timeout=1.0)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+            waited = self.clock() - start
+            self._waits[priority].append(waited)
+            return waited
+
+    # --- 피드백 ---------------------------------------------------------------
+    def backoff_delay(self, attempt, retry_after=None):
+        """Retry-After가 있으면 그 값, 없으면 full jitter 지수 백오프"""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def on_throttled(self, delay):
+        """할당량 초과: 모든 세션의 발송을 delay만큼 멈추고 허용량을 절반으로"""
+        with self._cond:
+            self.counters["throttled"] += 1
+            self._paused_until = max(self._paused_until, self.clock() + delay)
+            self.bucket.rate = max(MIN_RATE, self.bucket.rate / 2)
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self.counters["completed"] += 1
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + RECOVERY_STEP)
+
+    # --- 실행 -----------------------------------------------------------------
+    def run(self, func, priority=PRIORITY_INTERACTIVE):
+        for attempt in range(self.max_attempts):
+            self.acquire(priority)
+            try:
+                result = func()
+            except LocalBusyError:
+                if attempt == self.max_attempts - 1:
+                    with self._cond:
+                        self.counters["failed"] += 1
+                    raise
+                with self._cond:
+                    self.counters["busy"] += 1
+                continue
+            except Exception as e:
+                if not is_transient(e) or attempt == self.max_attempts - 1:
+                    with self._cond:
+                        self.counters["failed"] += 1
+                    raise
+                delay = self.backoff_delay(attempt, retry_after_seconds(e))
+                self.on_throttled(delay)
+                with self._cond:
+                    self.counters["retries"] += 1
+                continue
+            self.on_success()
+            return result
+
+    def stats(self):
+        with self._cond:
+            depth = {name: 0 for name in PRIORITY_NAMES.values()}
+            for priority, _ in self._queue:
+                depth[PRIORITY_NAMES.get(priority, str(priority))] += 1
+            waits = {}
+            for priority, samples in self._waits.items():
+                values = sorted(samples)
+                waits[PRIORITY_NAMES[priority]] = {
+                    "count": len(values),
+                    "p50": _percentile(values, 0.5),
+                    "p95": _percentile(values, 0.95),
+                    "max": values[-1] if values else 0.0,
+                }
+            return {
+                "queue_depth": depth,
+                "wait_seconds": waits,
+                "rate": round(self.bucket.rate, 3),
+                "paused_for": max(0.0, self._paused_until - self.clock()),
+                **self.counters,
+            }
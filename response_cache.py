@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------------
+# LLM 응답 캐시 (1차: 프로세스 내 LRU / 2차: SQLite 영구 저장소)
+# - 키 = 정규화된 질문 + 체인 종류 + 모델명 + 문서(지식베이스) 버전 + 부가 컨텍스트
+# - 문서가 동기화되어 버전이 바뀌면 이전 답변은 자연스럽게 조회되지 않음
+# - TTL 만료 및 최대 행 수 초과분은 주기적으로 정리
+# -----------------------------------------------------------------------------
+CACHE_PATH = os.path.join(".cache", "responses.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600
+PRUNE_EVERY = 50  # 쓰기 N회마다 만료/초과분 정리
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_RE = re.compile(r"[\s?!.~…]+$")
+
+
+def normalize_question(text):
+    """전각/반각, 대소문자, 공백, 끝 문장부호 차이를 무시"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = _SPACE_RE.sub(" ", text).strip()
+    return _TRAILING_RE.sub("", text)
+
+
+def make_key(chain, question, model, kb_version, extra=""):
+    payload = json.dumps(
+        [chain, normalize_question(question), model, kb_version, extra],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, memory_items=256, max_rows=5000, ttl=DEFAULT_TTL):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._memory = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, chain TEXT, value TEXT,"
+            " created_at REAL, expires_at REAL, accessed_at REAL)"
+        )
+        self._conn.commit()
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits["memory"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._remember(key, row[0], row[1])
+            self.hits["disk"] += 1
+            return row[0]
+
+    def set(self, key, value, chain=""):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chain, value, created_at, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, chain, value, now, expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now):
+        self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"memory_items": len(self._memory), "disk_rows": rows, "hits": dict(self.hits), "misses": self.misses}
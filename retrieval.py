@@ -0,0 +1,142 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+
+# -----------------------------------------------------------------------------
+# 로컬 검색 인덱스 (BM25 + 한글 문자 bigram)
+# - 페이지 단위 텍스트를 줄 기준 청크로 나누고 (문서명, 페이지) 메타데이터를 보존
+# - 한글은 형태소 분석 없이 어절 + 2글자 n-gram으로 색인 (조사/띄어쓰기 차이에 강함)
+# -----------------------------------------------------------------------------
+CHUNK_SIZE = 700
+CHUNK_OVERLAP = 120
+
+# 프롬프트에 넣을 검색 상위 k개 문단 수 (앱과 후보군 일괄 생성이 같은 값을 씀)
+RETRIEVAL_TOP_K = 8
+RETRIEVAL_TOP_K_SCAN = 20  # 과목 전수 조사/졸업 진단처럼 넓은 근거가 필요한 경우
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[A-Za-z]+|\d+")
+
+
+def tokenize(text):
+    tokens = []
+    for word in _TOKEN_RE.findall(text):
+        if "가" <= word[0] <= "힣":
+            tokens.append(word)
+            if len(word) > 2:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def split_page(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """줄 단위로 chunk_size 근처까지 모으고, 마지막 overlap 글자 분량의 줄은 다음 청크에 이어붙임"""
+    chunks, current, length = [], [], 0
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if current and length + len(line) > chunk_size:
+            chunks.append("\n".join(current))
+            carry, carried = [], 0
+            for prev in reversed(current):
+                if carried + len(prev) > overlap:
+                    break
+                carry.insert(0, prev)
+                carried += len(prev)
+            current, length = carry, carried
+        current.append(line)
+        length += len(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def tokenize_document(pages):
+    """문서 하나 -> [(청크 본문, 페이지, 단어 빈도), ...]. 증분 동기화 때 바뀌지 않은 문서는 이 결과를 재사용"""
+    return [
+        (chunk, page_no, Counter(tokenize(chunk)))
+        for page_no, page_text in enumerate(pages, start=1)
+        for chunk in split_page(page_text)
+    ]
+
+
+class Passage:
+    __slots__ = ("text", "source", "page", "score")
+
+    def __init__(self, text, source, page, score=0.0):
+        self.text = text
+        self.source = source
+        self.page = page
+        self.score = score
+
+
+class BM25Index:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages = []
+        self.doc_lens = []
+        self.postings = defaultdict(list)  # term -> [(passage_idx, tf), ...]
+        self.total_len = 0
+
+    def __len__(self):
+        return len(self.passages)
+
+    def add(self, text, source, page, terms=None):
+        idx = len(self.passages)
+        if terms is None:
+            terms = Counter(tokenize(text))
+        self.passages.append(Passage(text, source, page))
+        length = sum(terms.values())
+        self.doc_lens.append(length)
+        self.total_len += length
+        for term, tf in terms.items():
+            self.postings[term].append((idx, tf))
+
+    def add_document(self, source, pages):
+        self.add_chunks(source, tokenize_document(pages))
+
+    def add_chunks(self, source, chunks):
+        for text, page_no, terms in chunks:
+            self.add(text, source, page_no, terms)
+
+    def search(self, query, k=8, sources=None):
+        """sources(문서명 집합)가 주어지면 해당 문서의 문단만 점수 계산"""
+        if not self.passages:
+            return []
+        n = len(self.passages)
+        avgdl = self.total_len / n or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for idx, tf in postings:
+                if sources is not None and self.passages[idx].source not in sources:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[idx] / avgdl)
+                scores[idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        hits = []
+        for idx, score in top:
+            p = self.passages[idx]
+            hits.append(Passage(p.text, p.source, p.page, score))
+        return hits
+
+
+def build_index(documents):
+    """ingest.IngestedDocument 리스트로 인덱스 생성"""
+    index = BM25Index()
+    for doc in documents:
+        if not doc.error:
+            index.add_document(doc.source, doc.pages)
+    return index
+
+
+def format_passages(passages):
+    """프롬프트용 컨텍스트: 각 문단 앞에 [출처: 문서명 p.N] 표기"""
+    return "\n\n".join(f"[출처: {p.source} p.{p.page}]\n{p.text}" for p in passages)
@@ -0,0 +1,255 @@
+import os
+import re
+import json
+import math
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # langchain 없이 계측만 쓸 때
+    BaseCallbackHandler = object
+
+# -----------------------------------------------------------------------------
+# 경량 계측 (프로세스 전역)
+# - span: with span("llm.call"): ... / @traced("firestore.load_page") -> 구간별 소요 시간(ms)을 최근 N개 표본으로 보관,
+#   p50/p95/p99는 조회할 때 정렬해서 계산 (기록 경로는 deque append 한 번)
+# - count: 누적 카운터 (프롬프트 글자 수/토큰, 캐시 적중, 재시도 등)
+# - gauge: 조회 시점에 값을 읽어 오는 콜백 (다른 모듈이 이미 세고 있는 캐시 적중 수 등)
+# - 내보내기: JSON + Prometheus 텍스트 형식 파일 (네트워크 없이 로컬 파일로, 주기적으로 또는 요청 시)
+# - TelemetryCallbackHandler: LLM 클라이언트에 붙여 모든 호출의 프롬프트 글자 수와 토큰 사용량을 집계
+# -----------------------------------------------------------------------------
+DEFAULT_SAMPLES = 2048   # 구간별로 보관하는 최근 표본 수
+RECENT_SPANS = 200       # 대시보드용 최근 span 기록 수
+QUANTILES = (0.5, 0.95, 0.99)
+EXPORT_DIR = os.path.join(".cache", "telemetry")
+METRIC_PREFIX = "kw"
+
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+
+
+def _percentile(sorted_values, q):
+    """nearest-rank 백분위수"""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", f"{METRIC_PREFIX}_{name}")
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class Histogram:
+    """누적 count/sum/max + 최근 표본 (백분위수는 최근 표본 기준)"""
+
+    def __init__(self, samples=DEFAULT_SAMPLES):
+        self.samples = deque(maxlen=samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+
+    def observe(self, value, error=False):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.errors += bool(error)
+
+    def summary(self):
+        values = sorted(self.samples)
+        result = {"count": self.count, "errors": self.errors, "sum_ms": round(self.total, 3),
+                  "mean_ms": round(self.total / self.count, 3) if self.count else 0.0, "max_ms": round(self.max, 3)}
+        for q in QUANTILES:
+            result[f"p{int(q * 100)}_ms"] = round(_percentile(values, q), 3)
+        return result
+
+
+class Telemetry:
+    def __init__(self, samples=DEFAULT_SAMPLES, recent=RECENT_SPANS):
+        self.samples = samples
+        self.started = time.time()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._exporter = None
+
+    # --- 기록 ------------------------------------------------------------------
+    def observe(self, name, ms, error=False):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.samples)
+            histogram.observe(ms, error)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name, read):
+        """조회 시점에 read()로 값을 읽는 지표 (같은 이름이면 교체)"""
+        with self._lock:
+            self._gauges[name] = read
+
+    def watch(self, prefix, obj, *attrs):
+        """obj의 숫자 속성들을 '{prefix}.{속성}' 게이지로 등록하고 obj를 그대로 반환"""
+        for attr in attrs:
+            self.gauge(f"{prefix}.{attr}", lambda attr=attr: getattr(obj, attr))
+        return obj
+
+    @contextmanager
+    def span(self, name):
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            # st.rerun/st.stop 같은 제어 흐름 예외(BaseException)는 오류로 세지 않음
+            error = True
+            raise
+        finally:
+            ms = (time.perf_counter() - started) * 1000
+            _current_span.reset(token)
+            self.observe(name, ms, error)
+            with self._lock:
+                self._recent.append({"at": time.time(), "span": name, "parent": parent, "ms": round(ms, 3), "error": error})
+
+    def traced(self, name=None):
+        """함수 전체를 span으로 감싸는 데코레이터 (이름 생략 시 함수 이름)"""
+        def decorate(fn):
+            span_name = name or fn.__qualname__
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._recent.clear()
+            self.started = time.time()
+
+    # --- 조회/내보내기 ------------------------------------------------------------
+    def snapshot(self):
+        with self._lock:
+            spans = {name: h.summary() for name, h in sorted(self._histograms.items())}
+            counters = dict(sorted(self._counters.items()))
+            gauges = dict(sorted(self._gauges.items()))
+            recent = list(self._recent)
+        gauge_values = {}
+        for name, read in gauges.items():
+            try:
+                gauge_values[name] = read()
+            except Exception:
+                continue
+        return {"generated_at": time.time(), "uptime_s": round(time.time() - self.started, 1),
+                "spans": spans, "counters": counters, "gauges": gauge_values, "recent": recent}
+
+    def to_json(self, snapshot=None):
+        return json.dumps(snapshot or self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self, snapshot=None):
+        snapshot = snapshot or self.snapshot()
+        duration = _metric_name("span_duration_seconds")
+        lines = [f"# HELP {duration} Span durations (quantiles over the most recent samples).",
+                 f"# TYPE {duration} summary"]
+        for name, summary in snapshot["spans"].items():
+            label = f'span="{_label(name)}"'
+            for q in QUANTILES:
+                lines.append(f'{duration}{{{label},quantile="{q}"}} {summary[f"p{int(q * 100)}_ms"] / 1000:.6f}')
+            lines.append(f"{duration}_sum{{{label}}} {summary['sum_ms'] / 1000:.6f}")
+            lines.append(f"{duration}_count{{{label}}} {summary['count']}")
+        errors = _metric_name("span_errors_total")
+        lines += [f"# TYPE {errors} counter"]
+        lines += [f'{errors}{{span="{_label(name)}"}} {summary["errors"]}' for name, summary in snapshot["spans"].items()]
+        for name, value in snapshot["counters"].items():
+            metric = _metric_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in snapshot["gauges"].items():
+            if isinstance(value, (int, float)):
+                metric = _metric_name(name)
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory=EXPORT_DIR):
+        """telemetry.json / telemetry.prom 을 원자적으로 교체 저장하고 경로 반환"""
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.snapshot()
+        paths = []
+        for filename, text in (("telemetry.json", self.to_json(snapshot)), ("telemetry.prom", self.to_prometheus(snapshot))):
+            path = os.path.join(directory, filename)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            paths.append(path)
+        return paths
+
+    def start_exporter(self, directory=EXPORT_DIR, interval=30.0):
+        """interval초마다 export하는 백그라운드 스레드 (프로세스당 하나)"""
+        with self._lock:
+            if self._exporter is not None or interval <= 0:
+                return
+            stop = threading.Event()
+
+            def _loop():
+                while not stop.wait(interval):
+                    try:
+                        self.export(directory)
+                    except OSError as e:
+                        print(f"[telemetry] export failed: {e}")
+            self._exporter = threading.Thread(target=_loop, name="telemetry-exporter", daemon=True)
+            self._exporter.start()
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """LLM 호출마다 프롬프트 글자 수, 입력/출력 토큰(usage_metadata가 있을 때)을 카운터에 누적"""
+
+    def __init__(self, telemetry):
+        super().__init__()
+        self.telemetry = telemetry
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        chars = 0
+        for batch in messages:
+            for message in batch:
+                content = message.content
+                if isinstance(content, str):
+                    chars += len(content)
+                else:
+                    chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+        self.telemetry.count("llm.requests")
+        self.telemetry.count("prompt.chars", chars)
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.telemetry.count("llm.tokens.input", usage.get("input_tokens", 0))
+                self.telemetry.count("llm.tokens.output", usage.get("output_tokens", 0))
+
+    def on_llm_error(self, error, **kwargs):
+        self.telemetry.count("llm.errors")
+
+
+TELEMETRY = Telemetry()
+span = TELEMETRY.span
+traced = TELEMETRY.traced
+count = TELEMETRY.count
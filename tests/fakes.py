@@ -0,0 +1,34 @@
+import threading
+from collections import deque
+
+# -----------------------------------------------------------------------------
+# 테스트용 가짜 객체
+# - ScriptedFakeLLM: 스크립트대로 429를 던지고, 그 외에는 응답을 돌려주는 가짜 LLM
+# -----------------------------------------------------------------------------
+
+
+class ScriptedRateLimitError(Exception):
+    def __init__(self, retry_after=None):
+        self.retry_after = retry_after
+        super().__init__("429 RESOURCE_EXHAUSTED (scripted)")
+
+
+class ScriptedFakeLLM:
+    """script 예: ["429", "429:3", "ok"] -> 429, 429(Retry-After 3초), 정상 응답
+    스크립트가 끝나면 계속 정상 응답
+    """
+
+    def __init__(self, script=(), reply="ok"):
+        self.script = deque(script)
+        self.reply = reply
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt=""):
+        with self._lock:
+            self.calls += 1
+            step = self.script.popleft() if self.script else "ok"
+        if step.startswith("429"):
+            _, _, retry_after = step.partition(":")
+            raise ScriptedRateLimitError(float(retry_after) if retry_after else None)
+        return self.reply
@@ -0,0 +1,33 @@
+from candidate_table import (CATEGORY_MAJOR, CATEGORY_MUST, CATEGORY_OTHER, FRAME_COLUMNS, build_candidate_frame,
+                             category_counts, filter_candidates)
+
+
+def _candidate(name, priority="Normal", classification="교양", slots=("월1",), reason=""):
+    return {"id": name, "name": name, "professor": "홍길동", "credits": 3, "classification": classification,
+            "priority": priority, "reason": reason, "time_slots": list(slots)}
+
+
+def test_empty_and_filled_frames_share_columns():
+    empty = build_candidate_frame([])
+    filled = build_candidate_frame([_candidate("회로이론1")])
+    assert list(empty.columns) == list(filled.columns) == FRAME_COLUMNS
+    assert "reason" in empty.columns
+
+
+def test_empty_frame_supports_filters_and_counts():
+    empty = build_candidate_frame([])
+    rows = filter_candidates(empty, category=CATEGORY_MUST, exclude_names=["회로이론1"], professors=["홍길동"],
+                             exclude_days=["월"], credits=[3], text="재수강")
+    assert rows.empty
+    assert category_counts(empty) == {CATEGORY_MUST: 0, CATEGORY_MAJOR: 0, CATEGORY_OTHER: 0}
+
+
+def test_categories_and_reason_search():
+    df = build_candidate_frame([
+        _candidate("회로이론1", priority="High", reason="재수강 필수 대상"),
+        _candidate("전자기학1", classification="전공선택"),
+        _candidate("글쓰기", slots=("화2",)),
+    ])
+    assert list(df["category"]) == [CATEGORY_MUST, CATEGORY_MAJOR, CATEGORY_OTHER]
+    assert list(filter_candidates(df, text="재수강")["name"]) == ["회로이론1"]
+    assert list(filter_candidates(df, exclude_days=["월"])["name"]) == ["글쓰기"]
@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from context_cache import (CORPUS_SYSTEM_INSTRUCTION, ContextCacheManager, LocalContextCacheBackend,
+                           LocalStandInChatModel, estimate_tokens)
+
+MODEL = "gemini-test"
+CORPUS = "수강신청자료집 본문 " * 200
+
+
+@pytest.fixture
+def backend():
+    return LocalContextCacheBackend()
+
+
+@pytest.fixture
+def manager(backend, tmp_path):
+    return ContextCacheManager(backend, registry_path=str(tmp_path / "context_cache.json"))
+
+
+def _creates(backend):
+    return [entry for entry in backend.ledger if entry["kind"] == "cache_create"]
+
+
+def test_same_version_and_scope_is_a_hit(manager, backend):
+    first = manager.get_handle(MODEL, "v1", CORPUS, scope="2025-1")
+    second = manager.get_handle(MODEL, "v1", CORPUS, scope="2025-1")
+    assert first == second
+    assert manager.stats() == {"hits": 1, "misses": 1, "handles": 1}
+    assert len(_creates(backend)) == 1
+    assert _creates(backend)[0]["billed_tokens"] == estimate_tokens(CORPUS_SYSTEM_INSTRUCTION) + estimate_tokens(CORPUS)
+
+
+def test_version_change_creates_new_cache_and_retires_old(manager, backend):
+    old = manager.get_handle(MODEL, "v1", CORPUS, scope="2025-1")
+    new = manager.get_handle(MODEL, "v2", CORPUS + "추가", scope="2025-1")
+    assert new != old
+    assert manager.stats() == {"hits": 0, "misses": 2, "handles": 1}
+    assert not backend.exists(old) and backend.exists(new)
+    assert len(_creates(backend)) == 2
+
+
+def test_other_scopes_stay_alive(manager, backend):
+    first_term = manager.get_handle(MODEL, "v1", CORPUS, scope="2025-1")
+    second_term = manager.get_handle(MODEL, "v1", CORPUS, scope="2025-2")
+    assert backend.exists(first_term) and backend.exists(second_term)
+    assert manager.get_handle(MODEL, "v1", CORPUS, scope="2025-1") == first_term
+    assert manager.stats()["handles"] == 2
+
+
+def test_registry_is_shared_across_managers(manager, backend):
+    handle = manager.get_handle(MODEL, "v1", CORPUS)
+    other = ContextCacheManager(backend, registry_path=manager.registry_path)
+    assert other.get_handle(MODEL, "v1", CORPUS) == handle
+    assert other.hits == 1 and len(_creates(backend)) == 1
+
+
+def test_missing_remote_cache_is_recreated(manager, backend):
+    handle = manager.get_handle(MODEL, "v1", CORPUS)
+    backend.delete(handle)
+    other = ContextCacheManager(backend, registry_path=manager.registry_path)
+    assert other.get_handle(MODEL, "v1", CORPUS) != handle
+    assert other.misses == 1
+
+
+def test_invalidate_deletes_every_handle(manager, backend):
+    handles = [manager.get_handle(MODEL, "v1", CORPUS, scope=s) for s in ("2025-1", "2025-2")]
+    manager.invalidate()
+    assert not any(backend.exists(h) for h in handles)
+    assert manager.stats()["handles"] == 0
+
+
+def test_stand_in_model_bills_cached_tokens_at_discount(manager, backend):
+    handle = manager.get_handle(MODEL, "v1", CORPUS)
+    cached_tokens = backend.caches[handle]["tokens"]
+    message = LocalStandInChatModel(backend=backend, cached_content=handle).invoke("재수강 규정")
+    entry = backend.ledger[-1]
+    assert entry["kind"] == "cache_hit" and entry["cached_tokens"] == cached_tokens
+    assert entry["billed_tokens"] == estimate_tokens("재수강 규정") + math.ceil(cached_tokens * backend.CACHED_TOKEN_RATE)
+    assert message.usage_metadata["input_tokens"] == entry["billed_tokens"]
+
+
+def test_stand_in_model_records_misses_and_uncached_calls(manager, backend):
+    old = manager.get_handle(MODEL, "v1", CORPUS)
+    manager.get_handle(MODEL, "v2", CORPUS)
+    LocalStandInChatModel(backend=backend, cached_content=old).invoke("질문")
+    assert backend.ledger[-1]["kind"] == "cache_miss" and backend.ledger[-1]["cached_tokens"] == 0
+    LocalStandInChatModel(backend=backend).invoke("질문")
+    assert backend.ledger[-1]["kind"] == "uncached"
+    assert backend.billed_tokens() == sum(entry["billed_tokens"] for entry in backend.ledger)
@@ -0,0 +1,52 @@
+from course_catalog import course_to_candidate, is_retake, mark_retakes, retakes_in_text
+
+
+def _candidate(name, priority="Medium"):
+    return {"id": name, "name": name, "priority": priority, "reason": "전공선택 | 3학점"}
+
+
+def _course(name, classification="전공선택"):
+    return {"id": "0000-1-0000-01", "name": name, "professor": "", "credits": 3, "time_slots": ["월1"],
+            "classification": classification}
+
+
+def test_mark_retakes_marks_only_listed_courses():
+    candidates = [_candidate("회로이론1"), _candidate("전자기학1"), _candidate("신호및시스템")]
+    marked = mark_retakes(candidates, ["회로이론1"])
+    assert [c["priority"] for c in marked] == ["High", "Medium", "Medium"]
+    assert marked[0]["reason"] == "재수강 필수 대상"
+    # 공유 리스트는 그대로
+    assert candidates[0]["priority"] == "Medium"
+
+
+def test_mark_retakes_ignores_whitespace_in_names():
+    assert mark_retakes([_candidate("회로 이론1")], ["회로이론1"])[0]["priority"] == "High"
+
+
+def test_mark_retakes_without_retakes_returns_copy():
+    candidates = [_candidate("회로이론1")]
+    marked = mark_retakes(candidates, None)
+    assert marked == candidates and marked is not candidates
+
+
+def test_retakes_in_text_requires_same_line():
+    diagnosis = "\n".join([
+        "전자기학1(A+)과 신호및시스템(A0)은 매우 우수합니다.",
+        "회로이론1은 C0이므로 재수강을 권고합니다.",
+        "재수강 제도는 최대 2회까지 허용됩니다.",
+    ])
+    names = ["회로이론1", "전자기학1", "신호및시스템", "디지털논리회로"]
+    assert retakes_in_text(names, diagnosis) == ["회로이론1"]
+
+
+def test_retakes_in_text_without_retake_word():
+    assert retakes_in_text(["회로이론1"], "회로이론1 성적이 좋습니다.") == []
+    assert retakes_in_text(["회로이론1"], "") == []
+
+
+def test_course_to_candidate_priority():
+    assert is_retake("회로이론1", ["회로이론1"]) and not is_retake("전자기학1", ["회로이론1"])
+    assert course_to_candidate(_course("회로이론1"), ["회로이론1"])["reason"] == "재수강 필수 대상"
+    plain = course_to_candidate(_course("전자기학1"), ["회로이론1"])
+    assert (plain["priority"], plain["reason"]) == ("Medium", "전공선택 | 3학점")
+    assert course_to_candidate(_course("전자기학1", "전공필수"))["priority"] == "High"
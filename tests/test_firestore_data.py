@@ -0,0 +1,177 @@
+import ast
+import datetime
+import glob
+import os
+
+import pytest
+
+from firestore_data import (SET, UPDATE, CollectionCache, InMemoryFirestore, UserCollections, WriteBehindQueue,
+                            _coalesce, _Write)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _seed(db, count, user_id="u1", collection="timetables", same_time=()):
+    for i in range(count):
+        minute = 0 if i in same_time else i
+        db._docs[("users", user_id, collection, f"doc{i}")] = {
+            "name": f"tt{i}", "courses": [i], "updated_at": BASE + datetime.timedelta(minutes=minute)}
+
+
+@pytest.fixture
+def db():
+    return InMemoryFirestore()
+
+
+@pytest.fixture
+def queue(db):
+    writer = WriteBehindQueue(db, linger=0.01)
+    yield writer
+    writer.close()
+
+
+# --- 읽기 캐시 -------------------------------------------------------------------
+def test_reads_are_cached_until_save(db):
+    _seed(db, 2)
+    data = UserCollections(db, CollectionCache())
+    assert [d["id"] for d in data.list("u1", "timetables")] == ["doc1", "doc0"]
+    reads = db.reads
+    data.list("u1", "timetables")
+    assert db.reads == reads
+
+    data.save("u1", "timetables", "doc9", {"name": "new"})
+    assert [d["id"] for d in data.list("u1", "timetables")][0] == "doc9"
+    assert db.reads > reads
+
+
+def test_save_invalidates_only_that_collection(db):
+    _seed(db, 1)
+    _seed(db, 1, collection="graduation_diagnosis")
+    data = UserCollections(db, CollectionCache())
+    data.list("u1", "timetables")
+    data.list("u1", "graduation_diagnosis")
+    reads = db.reads
+    data.save("u1", "timetables", "doc5", {"name": "new"})
+    data.list("u1", "graduation_diagnosis")
+    assert db.reads == reads
+
+
+def test_queued_save_is_visible_to_the_next_read(db, queue):
+    data = UserCollections(db, CollectionCache(), writer=queue)
+    data.list("u1", "timetables")
+    future = data.save("u1", "timetables", "doc1", {"name": "queued"})
+    assert [d["name"] for d in data.list("u1", "timetables")] == ["queued"]
+    assert future.result(timeout=5) is None
+
+
+# --- projection / 페이지 -------------------------------------------------------
+def test_select_returns_only_requested_fields(db):
+    _seed(db, 2)
+    data = UserCollections(db, CollectionCache())
+    items = data.list("u1", "timetables", fields=("name",))
+    # 커서용 updated_at은 항상 포함
+    assert all(set(item) == {"id", "name", "updated_at"} for item in items)
+    latest = data.latest("u1", "timetables", fields=("name",))
+    assert latest["id"] == "doc1" and "courses" not in latest
+
+
+def test_cursor_pagination_reads_one_extra_document(db):
+    _seed(db, 5, same_time=(0, 1, 2))   # updated_at이 같은 문서는 문서 id로 순서 결정
+    data = UserCollections(db, CollectionCache())
+    seen, cursor, pages = [], None, 0
+    while True:
+        reads = db.reads
+        page = data.page("u1", "timetables", fields=("name",), page_size=2, cursor=cursor)
+        assert db.reads - reads == min(3, 5 - len(seen))
+        seen.extend(item["id"] for item in page.items)
+        pages += 1
+        if page.cursor is None:
+            break
+        assert page.cursor == (page.items[-1]["updated_at"], page.items[-1]["id"])
+        cursor = page.cursor
+    assert seen == ["doc4", "doc3", "doc2", "doc1", "doc0"]
+    assert pages == 3
+
+
+def test_exact_page_size_has_no_next_page(db):
+    _seed(db, 2)
+    page = UserCollections(db, CollectionCache()).page("u1", "timetables", page_size=2)
+    assert len(page.items) == 2 and page.cursor is None
+
+
+# --- 쓰기 지연 큐 ---------------------------------------------------------------
+class _Ref:
+    def __init__(self, path):
+        self.path = path
+
+
+def test_coalesce_merges_writes_per_document():
+    a, b = _Ref(("c", "a")), _Ref(("c", "b"))
+    merged = _coalesce([
+        _Write(a, SET, {"x": 1}, ["f1"], ["t"]),
+        _Write(a, UPDATE, {"y": 2}, ["f2"], ["t"]),
+        _Write(b, UPDATE, {"z": 1}, ["f3"], ["t"]),
+        _Write(b, UPDATE, {"z": 2}, ["f4"], ["t"]),
+    ])
+    by_path = {write.ref.path: write for write in merged}
+    assert (by_path[a.path].kind, by_path[a.path].data, by_path[a.path].futures) == (SET, {"x": 1, "y": 2}, ["f1", "f2"])
+    assert (by_path[b.path].kind, by_path[b.path].data) == (UPDATE, {"z": 2})
+
+
+def test_set_replaces_earlier_writes():
+    a = _Ref(("c", "a"))
+    merged = _coalesce([_Write(a, UPDATE, {"x": 1}), _Write(a, SET, {"y": 2})])
+    assert len(merged) == 1 and (merged[0].kind, merged[0].data) == (SET, {"y": 2})
+
+
+def test_queue_sends_coalesced_writes_in_one_batch(db):
+    writer = WriteBehindQueue(db, linger=0.5)
+    try:
+        ref = db.collection("c").document("a")
+        futures = [writer.submit(ref, SET, {"x": 1}), writer.submit(ref, UPDATE, {"y": 2}),
+                   writer.submit(db.collection("c").document("b"), SET, {"z": 3})]
+        assert writer.flush(timeout=5)
+        assert all(f.result(timeout=5) is None for f in futures)
+    finally:
+        writer.close()
+    assert (writer.writes, writer.commits, db.commits) == (3, 1, 1)
+    assert db._docs[("c", "a")] == {"x": 1, "y": 2}
+
+
+def test_failed_batch_is_split_so_only_the_bad_write_fails(db):
+    db._docs[("c", "a")] = {"x": 0}
+    writer = WriteBehindQueue(db, linger=0.5)
+    try:
+        good = writer.submit(db.collection("c").document("a"), UPDATE, {"x": 1})
+        bad = writer.submit(db.collection("c").document("missing"), UPDATE, {"x": 1})
+        other = writer.submit(db.collection("c").document("b"), SET, {"x": 2})
+        assert writer.flush(timeout=5)
+    finally:
+        writer.close()
+    assert good.result(timeout=5) is None and other.result(timeout=5) is None
+    with pytest.raises(KeyError):
+        bad.result(timeout=5)
+    assert db._docs[("c", "a")] == {"x": 1} and db._docs[("c", "b")] == {"x": 2}
+    assert ("c", "missing") not in db._docs
+    assert writer.commits > 1
+
+
+# --- 메모리 대체 구현의 지원 범위 ------------------------------------------------
+def test_fake_supports_only_equality_filters(db):
+    with pytest.raises(NotImplementedError):
+        db.collection("users").where("age", ">", 1)
+
+
+def test_production_code_uses_only_equality_filters():
+    """InMemoryFirestore는 where '=='만 지원: 앱 코드가 다른 연산자를 쓰기 시작하면 여기서 걸림"""
+    for path in glob.glob(os.path.join(ROOT, "*.py")):
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "where"):
+                continue
+            if isinstance(node.func.value, ast.Name) and node.func.value.id == "np":
+                continue
+            op = node.args[1] if len(node.args) > 1 else None
+            assert isinstance(op, ast.Constant) and op.value == "==", f"{os.path.basename(path)}:{node.lineno}"
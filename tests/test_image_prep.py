@@ -0,0 +1,60 @@
+import io
+import random
+
+from PIL import Image, ImageDraw
+
+from image_prep import DUPLICATE_DISTANCE, dhash, hamming, prepare_image, prepare_images
+
+
+def _capture(quality=5, seed=1):
+    """흰 여백이 있는 화면 캡처 흉내. 낮은 품질 JPEG라 다시 인코딩하면 원본보다 커짐"""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(40, 340), rng.randrange(40, 240)
+        draw.rectangle((x, y, x + 20, y + 20), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _large_png():
+    image = Image.new("RGB", (3200, 1600), "white")
+    ImageDraw.Draw(image).rectangle((200, 200, 3000, 1400), fill=(0, 0, 0))
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_kept_original_reports_metadata_of_uploaded_bytes():
+    data = _capture()
+    prepared = prepare_image(data)
+    assert prepared.kept_original
+    assert prepared.data == data and prepared.mime == "image/jpeg"
+    uploaded = Image.open(io.BytesIO(data))
+    # 여백을 자른 이미지가 아니라 실제로 보내는 원본의 크기/해시
+    assert (prepared.width, prepared.height) == uploaded.size
+    assert prepared.phash == dhash(uploaded)
+
+
+def test_reencoded_image_is_not_marked_as_original():
+    prepared = prepare_image(_large_png())
+    assert not prepared.kept_original
+    assert max(prepared.width, prepared.height) <= 1600
+    # 재인코딩한 경우 해시는 보내는 이미지와 (압축 손실 범위 안에서) 일치
+    assert hamming(prepared.phash, dhash(Image.open(io.BytesIO(prepared.data)))) <= DUPLICATE_DISTANCE
+
+
+def test_unreadable_bytes_pass_through():
+    prepared = prepare_image(b"not an image")
+    assert prepared.data == b"not an image"
+    assert prepared.phash is None and not prepared.kept_original
+
+
+def test_duplicate_of_kept_original_is_dropped_and_summarised():
+    data = _capture()
+    report = prepare_images([data, data, _capture(seed=2)])
+    assert report.duplicates == 1
+    assert [img.kept_original for img in report.images] == [True, True]
+    assert "원본 유지 2장" in report.summary()
@@ -0,0 +1,115 @@
+import hashlib
+import os
+
+import pytest
+
+from ingest import IngestedDocument
+from kb_sync import KnowledgeBaseSync
+
+
+class FakeIngest:
+    """PDF 대신 파일 내용을 한 페이지 텍스트로 읽음. broken에 든 파일명은 파싱 실패로 돌려줌"""
+
+    def __init__(self):
+        self.broken = set()
+        self.calls = []
+
+    def __call__(self, paths):
+        self.calls.append([os.path.basename(p) for p in paths])
+        documents = []
+        for path in paths:
+            with open(path, "rb") as f:
+                raw = f.read()
+            if os.path.basename(path) in self.broken:
+                documents.append(IngestedDocument(path=path, error="PdfReadError: EOF marker not found"))
+            else:
+                documents.append(IngestedDocument(path=path, pages=[raw.decode("utf-8")],
+                                                  sha256=hashlib.sha256(raw).hexdigest()))
+        return documents
+
+
+@pytest.fixture
+def ingest():
+    return FakeIngest()
+
+
+@pytest.fixture
+def sync(tmp_path, ingest):
+    return KnowledgeBaseSync(str(tmp_path), ingest=ingest)
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_added_documents_are_indexed(tmp_path, sync):
+    _write(tmp_path, "a.pdf", "재수강 규정 안내")
+    result = sync.refresh()
+    assert result.added == ["a.pdf"] and not result.failed
+    assert sync.current().search("재수강")
+
+
+def test_failed_new_document_is_not_counted_as_added(tmp_path, sync, ingest):
+    _write(tmp_path, "a.pdf", "재수강 규정 안내")
+    sync.refresh()
+    before = sync.current()
+
+    _write(tmp_path, "broken.pdf", "깨진 파일")
+    ingest.broken.add("broken.pdf")
+    result = sync.refresh()
+    assert result.added == [] and list(result.failed) == ["broken.pdf"]
+    assert not result.has_changes
+    assert "추가 0" in result.summary() and "실패 1" in result.summary()
+    # 바뀐 것이 없으므로 스냅샷 교체/버전 변경 없음
+    assert sync.current() is before
+    assert result.version == before.version
+
+
+def test_failed_document_is_retried_and_added_once_fixed(tmp_path, sync, ingest):
+    _write(tmp_path, "broken.pdf", "깨진 파일")
+    ingest.broken.add("broken.pdf")
+    first = sync.refresh()
+    assert first.added == [] and "broken.pdf" in first.failed
+
+    ingest.broken.clear()
+    second = sync.refresh()
+    assert second.added == ["broken.pdf"] and not second.failed
+    assert second.version != first.version
+
+
+def test_listeners_only_fire_on_real_changes(tmp_path, sync, ingest):
+    _write(tmp_path, "a.pdf", "재수강 규정 안내")
+    sync.refresh()
+    events = []
+    sync.listeners.append(lambda old, new: events.append(new.version))
+    _write(tmp_path, "broken.pdf", "깨진 파일")
+    ingest.broken.add("broken.pdf")
+    sync.refresh()
+    assert events == []
+    _write(tmp_path, "b.pdf", "졸업 요건")
+    sync.refresh()
+    assert len(events) == 1
+
+
+def test_changed_document_that_fails_keeps_previous_version(tmp_path, sync, ingest):
+    path = _write(tmp_path, "a.pdf", "재수강 규정 안내")
+    sync.refresh()
+    before = sync.current()
+    path.write_text("내용이 바뀐 파일 (길이도 다름)", encoding="utf-8")
+    ingest.broken.add("a.pdf")
+    result = sync.refresh()
+    assert result.changed == [] and "a.pdf" in result.failed
+    assert sync.current().version == before.version
+    assert sync.current().documents["a.pdf"].version == 1
+
+
+def test_removed_document(tmp_path, sync):
+    path = _write(tmp_path, "a.pdf", "재수강 규정 안내")
+    _write(tmp_path, "b.pdf", "졸업 요건")
+    sync.refresh()
+    os.remove(path)
+    result = sync.refresh()
+    assert result.removed == ["a.pdf"]
+    assert list(sync.current().documents) == ["b.pdf"]
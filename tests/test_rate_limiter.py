@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+
+import pytest
+
+from fakes import ScriptedFakeLLM, ScriptedRateLimitError
+from rate_limiter import (PRIORITY_BULK, PRIORITY_INTERACTIVE, RECOVERY_STEP, LocalBusyError, RequestScheduler,
+                          is_transient, retry_after_seconds)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("rate", 100.0)
+    kwargs.setdefault("burst", 100)
+    kwargs.setdefault("max_delay", 0.01)
+    return RequestScheduler(rng=random.Random(0), **kwargs)
+
+
+# --- Retry-After -------------------------------------------------------------
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class _HttpError(Exception):
+    def __init__(self, message, headers):
+        super().__init__(message)
+        self.response = _Response(headers)
+
+
+def test_retry_after_from_attribute():
+    assert retry_after_seconds(ScriptedRateLimitError(retry_after=3)) == 3.0
+
+
+def test_retry_after_from_header():
+    assert retry_after_seconds(_HttpError("429 Too Many Requests", {"Retry-After": "7"})) == 7.0
+
+
+def test_retry_after_from_message():
+    assert retry_after_seconds(Exception("429 RESOURCE_EXHAUSTED {'retryDelay': '12s'}")) == 12.0
+    assert retry_after_seconds(Exception("Please retry in 2.5s")) == 2.5
+
+
+def test_retry_after_from_cause():
+    try:
+        try:
+            raise ScriptedRateLimitError(retry_after=4)
+        except ScriptedRateLimitError as cause:
+            raise RuntimeError("wrapped") from cause
+    except RuntimeError as e:
+        assert retry_after_seconds(e) == 4.0
+
+
+def test_retry_after_missing():
+    assert retry_after_seconds(Exception("429")) is None
+
+
+def test_is_transient():
+    assert is_transient(ScriptedRateLimitError())
+    assert is_transient(Exception("503 UNAVAILABLE"))
+    assert not is_transient(ValueError("bad request"))
+
+
+def test_backoff_delay():
+    scheduler = RequestScheduler(base_delay=1.0, max_delay=30.0, rng=random.Random(0))
+    assert scheduler.backoff_delay(0, retry_after=3) == 3
+    assert scheduler.backoff_delay(0, retry_after=120) == 30.0
+    for attempt in range(8):
+        assert 0 <= scheduler.backoff_delay(attempt) <= min(30.0, 2 ** attempt)
+
+
+# --- AIMD ----------------------------------------------------------------------
+def test_throttle_halves_rate_and_success_recovers():
+    scheduler = _scheduler(rate=2.0)
+    llm = ScriptedFakeLLM(["429:0", "ok"])
+    assert scheduler.run(llm.invoke) == "ok"
+    assert llm.calls == 2
+    assert scheduler.counters["throttled"] == 1 and scheduler.counters["retries"] == 1
+    assert scheduler.bucket.rate == pytest.approx(1.0 + RECOVERY_STEP)
+    for _ in range(20):
+        scheduler.run(llm.invoke)
+    assert scheduler.bucket.rate == pytest.approx(2.0)
+
+
+def test_throttle_pauses_all_requests():
+    clock = FakeClock()
+    scheduler = _scheduler(clock=clock)
+    scheduler.on_throttled(5.0)
+    assert scheduler.stats()["paused_for"] == pytest.approx(5.0)
+    clock.now = 6.0
+    assert scheduler.stats()["paused_for"] == 0.0
+
+
+def test_gives_up_after_max_attempts():
+    scheduler = _scheduler(max_attempts=3)
+    llm = ScriptedFakeLLM(["429:0"] * 5)
+    with pytest.raises(ScriptedRateLimitError):
+        scheduler.run(llm.invoke)
+    assert llm.calls == 3
+    assert scheduler.counters["failed"] == 1
+
+
+def test_non_transient_error_is_not_retried():
+    scheduler = _scheduler()
+    calls = []
+
+    def _fail():
+        calls.append(None)
+        raise ValueError("bad request")
+    with pytest.raises(ValueError):
+        scheduler.run(_fail)
+    assert len(calls) == 1
+    assert scheduler.counters["throttled"] == 0
+
+
+# --- 로컬 자리 부족 -------------------------------------------------------------
+def test_local_busy_retries_without_throttling():
+    scheduler = _scheduler(rate=2.0)
+    outcomes = [LocalBusyError("slots"), LocalBusyError("slots")]
+
+    def _call():
+        if outcomes:
+            raise outcomes.pop(0)
+        return "ok"
+    assert scheduler.run(_call) == "ok"
+    assert scheduler.counters["busy"] == 2
+    assert scheduler.counters["throttled"] == 0
+    assert scheduler.bucket.rate == 2.0
+    assert scheduler.stats()["paused_for"] == 0.0
+
+
+def test_local_busy_reraises_on_last_attempt():
+    scheduler = _scheduler(max_attempts=2)
+
+    def _call():
+        raise LocalBusyError("slots")
+    with pytest.raises(LocalBusyError):
+        scheduler.run(_call)
+    assert scheduler.counters["busy"] == 1 and scheduler.counters["failed"] == 1
+    assert scheduler.bucket.rate == 100.0
+
+
+# --- 우선순위 -------------------------------------------------------------------
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_interactive_requests_go_before_queued_bulk_requests():
+    clock = FakeClock()
+    scheduler = RequestScheduler(rate=1.0, burst=1, clock=clock)
+    scheduler.acquire(PRIORITY_BULK)  # 버킷을 비움
+    order = []
+
+    def _acquire(name, priority):
+        scheduler.acquire(priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=_acquire, args=("bulk", PRIORITY_BULK))]
+    threads[0].start()
+    _wait_for(lambda: len(scheduler._queue) == 1)
+    threads.append(threading.Thread(target=_acquire, args=("interactive", PRIORITY_INTERACTIVE)))
+    threads[1].start()
+    _wait_for(lambda: len(scheduler._queue) == 2)
+    assert scheduler.stats()["queue_depth"] == {"interactive": 1, "bulk": 1}
+
+    for expected in (1, 2):
+        with scheduler._cond:
+            clock.now += 1.0  # 토큰 1개 보충
+            scheduler._cond.notify_all()
+        _wait_for(lambda: len(order) == expected)
+    for thread in threads:
+        thread.join(timeout=5)
+    assert order == ["interactive", "bulk"]
@@ -0,0 +1,161 @@
+import hashlib
+
+import pytest
+
+from firestore_data import InMemoryFirestore
+from user_auth import (AUTH_COLLECTION, SCRYPT_N, USERS_COLLECTION, AuthService, SessionStore, email_key,
+                       hash_password, needs_rehash, verify_password)
+
+SERVER_TIMESTAMP = object()
+DELETE_FIELD = object()
+WRONG = "이메일 또는 비밀번호가 일치하지 않습니다."
+
+
+@pytest.fixture
+def db():
+    return InMemoryFirestore(server_timestamp=SERVER_TIMESTAMP, delete_field=DELETE_FIELD)
+
+
+@pytest.fixture
+def auth(db):
+    return AuthService(db, SERVER_TIMESTAMP, DELETE_FIELD)
+
+
+def _index(db, email):
+    return db._docs.get((AUTH_COLLECTION, email_key(email)))
+
+
+# --- 해시 ----------------------------------------------------------------------
+def test_password_hash_roundtrip():
+    encoded = hash_password("secret1")
+    assert encoded.startswith(f"scrypt${SCRYPT_N}$") and "secret1" not in encoded
+    assert verify_password("secret1", encoded)
+    assert not verify_password("secret2", encoded)
+    assert not verify_password("secret1", "plain:secret1")
+    assert hash_password("secret1") != encoded  # 솔트가 매번 다름
+
+
+def test_needs_rehash_for_weaker_parameters():
+    assert not needs_rehash(hash_password("secret1"))
+    assert needs_rehash(hash_password("secret1", n=2 ** 10))
+    assert needs_rehash("garbage")
+
+
+def test_email_key_is_sha256_of_normalized_email():
+    assert email_key("  New@KW.ac.kr ") == hashlib.sha256(b"new@kw.ac.kr").hexdigest()
+
+
+# --- 가입 ----------------------------------------------------------------------
+def test_signup_creates_index_and_user(db, auth):
+    user, err = auth.signup(" New@KW.ac.kr", "pass1234")
+    assert err is None and user["email"] == "new@kw.ac.kr"
+    record = _index(db, "new@kw.ac.kr")
+    assert record["uid"] == user["localId"] and record["email"] == "new@kw.ac.kr"
+    assert verify_password("pass1234", record["password_hash"])
+    assert "pass1234" not in str(record)
+    assert db._docs[(USERS_COLLECTION, user["localId"])]["email"] == "new@kw.ac.kr"
+
+
+@pytest.mark.parametrize("email, password", [("not-an-email", "pass1234"), ("a@kw.ac.kr", "12345")])
+def test_signup_validation(db, auth, email, password):
+    user, err = auth.signup(email, password)
+    assert user is None and err
+    assert not db._docs
+
+
+def test_signup_rejects_duplicate_email(auth):
+    assert auth.signup("a@kw.ac.kr", "pass1234")[1] is None
+    user, err = auth.signup("A@KW.AC.KR", "other123")
+    assert user is None and err == "이미 가입된 이메일입니다."
+
+
+def test_signup_rejects_legacy_email(db, auth):
+    db._docs[(USERS_COLLECTION, "old1")] = {"email": "old@kw.ac.kr", "password": "plain123"}
+    assert auth.signup("old@kw.ac.kr", "pass1234") == (None, "이미 가입된 이메일입니다.")
+
+
+# --- 로그인 ----------------------------------------------------------------------
+def test_login_reads_only_the_index_document(db, auth):
+    created, _ = auth.signup("a@kw.ac.kr", "pass1234")
+    db.reads = 0
+    user, err = auth.login("A@kw.ac.kr ", "pass1234")
+    assert err is None and user == created
+    assert db.reads == 1
+
+
+def test_login_wrong_password_and_unknown_email_look_the_same(auth):
+    auth.signup("a@kw.ac.kr", "pass1234")
+    assert auth.login("a@kw.ac.kr", "wrong123") == (None, WRONG)
+    assert auth.login("nobody@kw.ac.kr", "pass1234") == (None, WRONG)
+
+
+def test_login_rehashes_weak_hash(db, auth):
+    db._docs[(AUTH_COLLECTION, email_key("a@kw.ac.kr"))] = {
+        "uid": "u1", "email": "a@kw.ac.kr", "password_hash": hash_password("pass1234", n=2 ** 10)}
+    assert auth.login("a@kw.ac.kr", "pass1234")[1] is None
+    stored = _index(db, "a@kw.ac.kr")["password_hash"]
+    assert not needs_rehash(stored) and verify_password("pass1234", stored)
+
+
+# --- 평문 비밀번호 사용자 이전 ------------------------------------------------------
+def test_legacy_plaintext_user_is_migrated_on_first_login(db, auth):
+    db._docs[(USERS_COLLECTION, "old1")] = {"email": "Old@KW.ac.kr", "password": "plain123", "name": "kim"}
+    user, err = auth.login("Old@KW.ac.kr", "plain123")
+    assert err is None and user == {"localId": "old1", "email": "old@kw.ac.kr"}
+
+    record = _index(db, "old@kw.ac.kr")
+    assert record["uid"] == "old1" and verify_password("plain123", record["password_hash"])
+    legacy = db._docs[(USERS_COLLECTION, "old1")]
+    assert "password" not in legacy and legacy == {"email": "old@kw.ac.kr", "name": "kim"}
+
+    db.reads = 0
+    assert auth.login("old@kw.ac.kr", "plain123") == (user, None)
+    assert db.reads == 1
+
+
+def test_legacy_wrong_password_does_not_migrate(db, auth):
+    db._docs[(USERS_COLLECTION, "old1")] = {"email": "old@kw.ac.kr", "password": "plain123"}
+    assert auth.login("old@kw.ac.kr", "wrong123") == (None, WRONG)
+    assert _index(db, "old@kw.ac.kr") is None
+    assert db._docs[(USERS_COLLECTION, "old1")]["password"] == "plain123"
+
+
+# --- 세션 ----------------------------------------------------------------------
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_issue_get_revoke():
+    store = SessionStore(ttl=60, clock=FakeClock())
+    token = store.issue({"localId": "u1", "email": "a@kw.ac.kr"})
+    assert len(token) >= 32
+    user = store.get(token)
+    assert user == {"localId": "u1", "email": "a@kw.ac.kr"}
+    user["email"] = "changed"
+    assert store.get(token)["email"] == "a@kw.ac.kr"
+    store.revoke(token)
+    assert store.get(token) is None
+    assert store.get(None) is None and store.get("unknown") is None
+
+
+def test_session_expires_after_ttl():
+    clock = FakeClock()
+    store = SessionStore(ttl=60, clock=clock)
+    token = store.issue({"localId": "u1", "email": "a@kw.ac.kr"})
+    clock.now = 59
+    assert store.get(token) is not None
+    clock.now = 61
+    assert store.get(token) is None
+
+
+def test_expired_sessions_are_purged_on_issue():
+    clock = FakeClock()
+    store = SessionStore(ttl=60, clock=clock)
+    store.issue({"localId": "u1", "email": "a@kw.ac.kr"})
+    clock.now = 120
+    store.issue({"localId": "u2", "email": "b@kw.ac.kr"})
+    assert len(store._sessions) == 1
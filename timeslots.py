@@ -0,0 +1,99 @@
+# -----------------------------------------------------------------------------
+# 시간 슬롯 비트마스크 인코딩
+# - 기본 그리드(월~금 × 1~9교시)는 하위 45비트: bit = 요일*9 + (교시-1)
+# - 토/일, 0교시, 10교시 이후 같은 확장 슬롯은 45번 비트 이후 영역에 배치
+#   (기본 45비트 배치는 확장과 무관하게 고정이므로 저장된 마스크가 깨지지 않음)
+# -----------------------------------------------------------------------------
+DAYS = ["월", "화", "수", "목", "금"]
+PERIODS = range(1, 10)
+CORE_BITS = len(DAYS) * len(PERIODS)
+
+EXTENDED_DAYS = ["월", "화", "수", "목", "금", "토", "일"]
+EXTENDED_PERIODS = 16  # 0 ~ 15교시
+
+_DAY_INDEX = {d: i for i, d in enumerate(EXTENDED_DAYS)}
+
+
+def slot_bit(day, period):
+    """(요일, 교시) -> 비트 위치 (알 수 없는 요일/교시는 None)"""
+    day_idx = _DAY_INDEX.get(day)
+    if day_idx is None or not 0 <= period < EXTENDED_PERIODS:
+        return None
+    if day_idx < len(DAYS) and 1 <= period <= 9:
+        return day_idx * len(PERIODS) + (period - 1)
+    return CORE_BITS + day_idx * EXTENDED_PERIODS + period
+
+
+def bit_slot(bit):
+    """비트 위치 -> (요일, 교시)"""
+    if bit < CORE_BITS:
+        return DAYS[bit // len(PERIODS)], bit % len(PERIODS) + 1
+    day_idx, period = divmod(bit - CORE_BITS, EXTENDED_PERIODS)
+    return EXTENDED_DAYS[day_idx], period
+
+
+def parse_slot(slot):
+    """'월3' -> ('월', 3), 형식이 다르면 None"""
+    if not isinstance(slot, str) or len(slot) < 2:
+        return None
+    try:
+        return slot[0], int(slot[1:])
+    except ValueError:
+        return None
+
+
+def slots_to_mask(slots):
+    mask = 0
+    if not isinstance(slots, (list, tuple)):
+        return mask
+    for slot in slots:
+        parsed = parse_slot(slot)
+        if parsed is None:
+            continue
+        bit = slot_bit(*parsed)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_slots(mask):
+    """마스크 -> [(요일, 교시), ...] (비트 순서)"""
+    slots = []
+    bit = 0
+    while mask:
+        if mask & 1:
+            slots.append(bit_slot(bit))
+        mask >>= 1
+        bit += 1
+    return slots
+
+
+def course_mask(course):
+    """과목 dict의 slot_mask (없으면 time_slots로 계산해 채워 넣음)"""
+    mask = course.get("slot_mask")
+    if mask is None:
+        mask = slots_to_mask(course.get("time_slots", []))
+        course["slot_mask"] = mask
+    return mask
+
+
+def attach_masks(courses):
+    for course in courses:
+        course["slot_mask"] = slots_to_mask(course.get("time_slots", []))
+    return courses
+
+
+def schedule_mask(schedule):
+    """시간표 전체 점유 마스크"""
+    mask = 0
+    for course in schedule:
+        mask |= course_mask(course)
+    return mask
+
+
+def find_conflict(mask, schedule):
+    """mask와 겹치는 첫 과목 반환 (없으면 None)"""
+    for existing in schedule:
+        if course_mask(existing) & mask:
+            return existing
+    return None
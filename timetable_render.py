@@ -0,0 +1,136 @@
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+from timeslots import DAYS, PERIODS, course_mask, mask_to_slots
+
+# -----------------------------------------------------------------------------
+# 시간표 HTML 렌더러
+# - 같은 시간표(과목 id/이름/교수/슬롯 구성)면 지문(fingerprint)으로 캐시된 HTML을 그대로 반환
+# - 과목 색상은 과목명의 CRC32로 결정: 프로세스/서버가 달라도 같은 과목은 같은 색 (hash()는 실행마다 달라짐)
+# - 같은 과목의 연속 교시는 rowspan 한 칸으로 합치고, 결과는 한 번의 join으로 생성
+# - 출력은 줄바꿈/들여쓰기 없는 압축 형태: Firestore 저장(timetable_result)과 이미지 내보내기용 문서에 그대로 사용
+# -----------------------------------------------------------------------------
+# 핑크, 블루, 그린, 퍼플, 오렌지, 틸, 라벤더, 옐로우
+PALETTE = ["#FFEBEE", "#E3F2FD", "#E8F5E9", "#F3E5F5", "#FFF3E0", "#E0F2F1", "#FCE4EC", "#FFF8E1"]
+HEADER_BG = "#f8f9fa"
+ROW_HEIGHT = 45
+CACHE_SIZE = 256
+
+_TABLE_OPEN = ('<table border="1" width="100%" style="border-collapse:collapse;text-align:center;'
+               'font-size:12px;border-color:#ddd;color:#333">')
+_HEADER_ROW = (f'<tr style="background:{HEADER_BG}"><th width="10%">교시</th>'
+               + "".join(f'<th width="18%">{day}</th>' for day in DAYS) + "</tr>")
+
+
+def color_for(name):
+    """과목명 -> 팔레트 색 (실행 환경과 무관하게 고정)"""
+    return PALETTE[zlib.crc32(str(name).encode("utf-8")) % len(PALETTE)]
+
+
+def schedule_fingerprint(schedule):
+    """렌더링 결과에 영향을 주는 필드만으로 만든 지문 (과목 순서 포함: 겹치는 칸은 뒤 과목이 우선)"""
+    parts = [(str(c.get("id", "")), c.get("name", ""), c.get("professor", ""), course_mask(c)) for c in schedule]
+    payload = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _escape(text):
+    return (str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;"))
+
+
+def _grid(schedule):
+    """(기본 그리드 칸 -> 과목, 온라인/시간미정 과목 리스트)"""
+    cells = {}
+    online = []
+    for course in schedule:
+        mask = course_mask(course)
+        if not mask:
+            online.append(course)
+            continue
+        for day, period in mask_to_slots(mask):
+            if day in DAYS and period in PERIODS:
+                cells[(day, period)] = course
+    return cells, online
+
+
+def _blocks(cells):
+    """요일별로 같은 과목이 이어지는 교시를 묶음 -> {(요일, 시작 교시): (과목, 칸 수)}, 가려지는 칸 집합"""
+    starts, covered = {}, set()
+    for day in DAYS:
+        period = PERIODS.start
+        while period < PERIODS.stop:
+            course = cells.get((day, period))
+            if course is None:
+                period += 1
+                continue
+            span = 1
+            while cells.get((day, period + span)) is course:
+                covered.add((day, period + span))
+                span += 1
+            starts[(day, period)] = (course, span)
+            period += span
+    return starts, covered
+
+
+def build_timetable_html(schedule):
+    """캐시 없이 바로 렌더링"""
+    cells, online = _grid(schedule)
+    starts, covered = _blocks(cells)
+    parts = [_TABLE_OPEN, _HEADER_ROW]
+    for period in PERIODS:
+        parts.append(f'<tr><td style="background:{HEADER_BG};font-weight:bold;color:#555;height:{ROW_HEIGHT}px">{period}</td>')
+        for day in DAYS:
+            if (day, period) in covered:
+                continue
+            block = starts.get((day, period))
+            if block is None:
+                parts.append("<td></td>")
+                continue
+            course, span = block
+            rowspan = f' rowspan="{span}"' if span > 1 else ""
+            parts.append(f'<td{rowspan} style="background:{color_for(course["name"])}">'
+                         f'<b>{_escape(course["name"])}</b><br><small>{_escape(course.get("professor", ""))}</small></td>')
+        parts.append("</tr>")
+    if online:
+        items = "".join(f'<span style="background:{color_for(c["name"])};padding:2px 6px;border-radius:4px;margin-right:4px">'
+                        f'{_escape(c["name"])}</span>' for c in online)
+        parts.append(f'<tr><td style="background:{HEADER_BG}"><b>온라인</b></td>'
+                     f'<td colspan="{len(DAYS)}" style="text-align:left;padding:8px">{items}</td></tr>')
+    parts.append("</table>")
+    return "".join(parts)
+
+
+class TimetableRenderer:
+    """지문 -> HTML LRU 캐시 (프로세스 전역으로 공유해도 안전)"""
+
+    def __init__(self, max_items=CACHE_SIZE):
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, schedule):
+        key = schedule_fingerprint(schedule)
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        html = build_timetable_html(schedule)
+        with self._lock:
+            self._cache[key] = html
+            while len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+        return html
+
+
+def timetable_document(table_html, title="시간표"):
+    """이미지 내보내기(브라우저 캡처/HTML->PNG 변환기)용 독립 HTML 문서"""
+    return (f'<!DOCTYPE html><html lang="ko"><head><meta charset="utf-8"><title>{_escape(title)}</title></head>'
+            f'<body style="margin:16px;font-family:sans-serif;width:800px">{table_html}</body></html>')
@@ -0,0 +1,145 @@
+import time
+import heapq
+from dataclasses import dataclass, field
+
+from timeslots import DAYS, PERIODS, course_mask
+
+# -----------------------------------------------------------------------------
+# 충돌 없는 시간표 자동 생성 (백트래킹 + 가지치기)
+# - 같은 과목명의 분반들은 하나의 그룹: 그룹당 최대 1개 분반 선택
+# - 필수 과목 그룹은 반드시 1개 선택, 나머지 그룹은 선택/미선택 분기
+# - 점유 마스크 AND로 충돌 판정, 학점 상/하한과 점수 상한으로 가지치기
+# - 제한 시간이 지나면 지금까지 찾은 상위 N개를 반환
+# -----------------------------------------------------------------------------
+PRIORITY_WEIGHT = {"High": 3.0, "Medium": 2.0, "Normal": 1.0}
+DAY_PENALTY = 1.5   # 등교 일수 1일당 감점
+GAP_PENALTY = 0.5   # 같은 날 공강 1교시당 감점
+_DAY_MASKS = [sum(1 << (d * len(PERIODS) + p) for p in range(len(PERIODS))) for d in range(len(DAYS))]
+_FIRST_PERIOD_MASK = sum(1 << (d * len(PERIODS)) for d in range(len(DAYS)))
+
+
+@dataclass
+class SolverPreferences:
+    min_credits: int = 0
+    max_credits: int = 21
+    free_days: list = field(default_factory=list)          # 예: ["금"]
+    no_first_period: bool = False
+    avoid_professors: list = field(default_factory=list)
+
+
+@dataclass
+class SolverResult:
+    solutions: list          # [(score, [course, ...]), ...] 점수 내림차순
+    timed_out: bool
+    nodes: int
+    missing_required: list   # 조건을 만족하는 분반이 하나도 없는 필수 과목
+
+
+def _section_allowed(course, prefs, blocked_mask):
+    mask = course_mask(course)
+    if mask & blocked_mask:
+        return False
+    return course.get("professor", "") not in prefs.avoid_professors
+
+
+def _section_gain(course):
+    return course.get("credits", 0) * PRIORITY_WEIGHT.get(course.get("priority", "Normal"), 1.0)
+
+
+def _layout_penalty(mask):
+    """등교 일수와 공강(첫 수업~마지막 수업 사이 빈 교시)에 대한 감점"""
+    penalty = 0.0
+    for day_mask in _DAY_MASKS:
+        day_bits = mask & day_mask
+        if not day_bits:
+            continue
+        penalty += DAY_PENALTY
+        span = day_bits.bit_length() - (day_bits & -day_bits).bit_length() + 1
+        penalty += GAP_PENALTY * (span - bin(day_bits).count("1"))
+    return penalty
+
+
+def solve_timetables(candidates, required_names=(), prefs=None, top_n=5, time_budget=2.0):
+    prefs = prefs or SolverPreferences()
+    blocked = 0
+    for day in prefs.free_days:
+        if day in DAYS:
+            blocked |= _DAY_MASKS[DAYS.index(day)]
+    if prefs.no_first_period:
+        blocked |= _FIRST_PERIOD_MASK
+
+    # 1. 과목명 기준 그룹화 + 선호 조건으로 분반 필터링
+    groups = {}
+    for course in candidates:
+        if _section_allowed(course, prefs, blocked):
+            groups.setdefault(course["name"], []).append(course)
+    required = [name for name in dict.fromkeys(required_names)]
+    missing = [name for name in required if name not in groups]
+    if missing:
+        return SolverResult([], False, 0, missing)
+
+    # 2. 탐색 순서: 필수 과목(분반 적은 순) -> 선택 과목(기대 점수 높은 순)
+    for sections in groups.values():
+        sections.sort(key=_section_gain, reverse=True)
+    required_set = set(required)
+    order = sorted(required, key=lambda n: len(groups[n]))
+    order += sorted((n for n in groups if n not in required_set),
+                    key=lambda n: _section_gain(groups[n][0]), reverse=True)
+    # 남은 그룹들로 더 얻을 수 있는 최대 점수/학점 (가지치기용 접미사 합)
+    suffix_gain = [0.0] * (len(order) + 1)
+    suffix_credits = [0] * (len(order) + 1)
+    for i in range(len(order) - 1, -1, -1):
+        best = groups[order[i]]
+        suffix_gain[i] = suffix_gain[i + 1] + _section_gain(best[0])
+        suffix_credits[i] = suffix_credits[i + 1] + max(c.get("credits", 0) for c in best)
+
+    deadline = time.monotonic() + time_budget
+    heap = []        # (점수, 순번, 분반 리스트) 최소 힙 - 상위 N개 유지
+    seen = set()
+    state = {"nodes": 0, "timed_out": False, "seq": 0}
+    chosen = []
+
+    def _record(mask, gain):
+        key = frozenset(c["id"] for c in chosen)
+        if key in seen:
+            return
+        seen.add(key)
+        score = gain - _layout_penalty(mask)
+        state["seq"] += 1
+        item = (score, state["seq"], list(chosen))
+        if len(heap) < top_n:
+            heapq.heappush(heap, item)
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def _search(idx, mask, credits, gain):
+        state["nodes"] += 1
+        if state["nodes"] % 512 == 0 and time.monotonic() > deadline:
+            state["timed_out"] = True
+        if state["timed_out"]:
+            return
+        if credits + suffix_credits[idx] < prefs.min_credits:
+            return
+        if len(heap) == top_n and gain + suffix_gain[idx] <= heap[0][0]:
+            return
+        if idx == len(order):
+            if chosen and credits >= prefs.min_credits:
+                _record(mask, gain)
+            return
+        name = order[idx]
+        for section in groups[name]:
+            section_mask = course_mask(section)
+            new_credits = credits + section.get("credits", 0)
+            if section_mask & mask or new_credits > prefs.max_credits:
+                continue
+            chosen.append(section)
+            _search(idx + 1, mask | section_mask, new_credits, gain + _section_gain(section))
+            chosen.pop()
+            if state["timed_out"]:
+                return
+        if name not in required_set:
+            _search(idx + 1, mask, credits, gain)
+
+    _search(0, 0, 0, 0.0)
+    solutions = [(score, courses) for score, _, courses in sorted(heap, reverse=True)]
+    return SolverResult(solutions, state["timed_out"], state["nodes"], [])
@@ -0,0 +1,219 @@
+import os
+import glob
+import argparse
+import json
+from html.parser import HTMLParser
+
+from timeslots import DAYS, course_mask, mask_to_slots, slot_bit
+
+# -----------------------------------------------------------------------------
+# Firestore 시간표 문서 스키마
+# - v2: 렌더링된 HTML 대신 과목 id/이름/교수/학점/슬롯 마스크와 메타데이터만 저장
+#   (마스크는 확장 슬롯 때문에 64비트를 넘을 수 있어 16진수 문자열로 저장)
+# - v1(스키마 필드 없음): 'result'에 HTML 표만 있는 기존 문서 -> 표를 해석해 v2로 변환
+#   (과목 id/학점은 resolve 콜백으로 현재 과목 목록에서 이름+교수+시간으로 찾아 채움)
+# - HTML은 저장하지 않고, 불러올 때 캐시된 렌더러로 그림
+# -----------------------------------------------------------------------------
+SCHEMA_VERSION = 2
+COLLECTION = "timetables"
+COURSE_FIELDS = ("id", "name", "professor", "credits", "classification")
+
+
+def schema_version(doc):
+    return int(doc.get("schema_version", 1))
+
+
+def encode_course(course):
+    entry = {field: course.get(field) for field in COURSE_FIELDS if course.get(field) not in (None, "")}
+    entry["id"] = str(course.get("id", ""))
+    entry["slots"] = format(course_mask(course), "x")
+    return entry
+
+
+def encode_timetable(schedule, name, major="", grade="", semester="", is_favorite=False, created_at=None):
+    """시간표(과목 dict 리스트) -> v2 문서"""
+    courses = [encode_course(c) for c in schedule]
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "name": name,
+        "major": major,
+        "grade": grade,
+        "semester": semester,
+        "is_favorite": is_favorite,
+        "created_at": created_at,
+        "total_credits": sum(int(c.get("credits") or 0) for c in schedule),
+        "courses": courses,
+    }
+
+
+def decode_course(entry):
+    mask = int(entry.get("slots") or "0", 16)
+    course = {field: entry[field] for field in COURSE_FIELDS if field in entry}
+    course.setdefault("professor", "미정")
+    course.setdefault("credits", 0)
+    course["slot_mask"] = mask
+    course["time_slots"] = [f"{day}{period}" for day, period in mask_to_slots(mask)]
+    return course
+
+
+def decode_timetable(doc, resolve=None):
+    """문서 -> 빌더에서 바로 쓸 수 있는 과목 dict 리스트 (v1 문서는 HTML을 해석해 변환)"""
+    if schema_version(doc) < SCHEMA_VERSION:
+        doc = migrate_document(doc, resolve)
+    return [decode_course(entry) for entry in doc.get("courses", [])]
+
+
+# v1 HTML 해석 ------------------------------------------------------------------
+class _TableParser(HTMLParser):
+    """<tr>/<td> 단위로 셀(rowspan, <b>, <small>, <span> 텍스트)을 수집"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self._cell = None
+        self._tags = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "tr":
+            self.rows.append([])
+        elif tag in ("td", "th") and self.rows:
+            self._cell = {"tag": tag, "rowspan": int(attrs.get("rowspan") or 1), "text": "", "b": "", "small": "", "spans": []}
+            self.rows[-1].append(self._cell)
+        elif tag == "span" and self._cell is not None:
+            self._cell["spans"].append("")
+        self._tags.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th"):
+            self._cell = None
+        while self._tags and self._tags.pop() != tag:
+            pass
+
+    def handle_data(self, data):
+        if self._cell is None:
+            return
+        self._cell["text"] += data
+        if "span" in self._tags and self._cell["spans"]:
+            self._cell["spans"][-1] += data
+        elif "b" in self._tags:
+            self._cell["b"] += data
+        elif "small" in self._tags:
+            self._cell["small"] += data
+
+
+def parse_legacy_html(html):
+    """v1 HTML 표 -> [{"name", "professor", "slot_mask"}] (표에 나온 순서, 온라인 과목은 마스크 0)"""
+    parser = _TableParser()
+    parser.feed(html or "")
+    courses = {}
+    covered = {}  # 요일 -> rowspan으로 아직 가려지는 행 수
+    for row in parser.rows:
+        if not row or row[0]["tag"] == "th":
+            continue
+        label = row[0]["text"].strip()
+        if label == "온라인":
+            for cell in row[1:]:
+                for name in cell["spans"]:
+                    courses.setdefault((name.strip(), ""), 0)
+            continue
+        if not label.isdigit():
+            continue
+        period = int(label)
+        cells = iter(row[1:])
+        for day in DAYS:
+            if covered.get(day, 0) > 0:
+                covered[day] -= 1
+                continue
+            cell = next(cells, None)
+            if cell is None:
+                break
+            covered[day] = cell["rowspan"] - 1
+            name = cell["b"].strip()
+            if not name:
+                continue
+            key = (name, cell["small"].strip())
+            for offset in range(cell["rowspan"]):
+                bit = slot_bit(day, period + offset)
+                if bit is not None:
+                    courses[key] = courses.get(key, 0) | (1 << bit)
+    return [{"name": name, "professor": professor, "slot_mask": mask} for (name, professor), mask in courses.items()]
+
+
+def migrate_document(doc, resolve=None):
+    """v1 문서 -> v2 문서 (원본은 그대로 두고 새 dict 반환)
+
+    resolve(name, professor, slot_mask): 현재 과목 목록에서 같은 과목 dict를 찾아 반환 (없으면 None)
+    찾지 못한 과목은 이름/교수/시간만으로 보존 (id는 'legacy-순번', 학점 0)
+    """
+    schedule = []
+    for i, parsed in enumerate(parse_legacy_html(doc.get("result", ""))):
+        match = resolve(parsed["name"], parsed["professor"], parsed["slot_mask"]) if resolve else None
+        if match is not None:
+            course = dict(match)
+            course["slot_mask"] = parsed["slot_mask"] or course_mask(course)
+        else:
+            course = {"id": f"legacy-{i}", "name": parsed["name"], "professor": parsed["professor"] or "미정",
+                      "credits": 0, "slot_mask": parsed["slot_mask"]}
+        schedule.append(course)
+    migrated = encode_timetable(schedule, doc.get("name", ""), doc.get("major", ""), doc.get("grade", ""),
+                                doc.get("semester", ""), doc.get("is_favorite", False), doc.get("created_at"))
+    if "updated_at" in doc:
+        migrated["updated_at"] = doc["updated_at"]
+    return migrated
+
+
+def catalog_resolver(candidates):
+    """후보 과목 리스트로 resolve 콜백 생성 (이름+교수+시간 일치 우선, 없으면 이름+교수, 그다음 이름)"""
+    exact, by_professor, by_name = {}, {}, {}
+    for course in candidates:
+        name, professor = course.get("name", ""), course.get("professor", "")
+        exact.setdefault((name, professor, course_mask(course)), course)
+        by_professor.setdefault((name, professor), course)
+        by_name.setdefault(name, course)
+
+    def resolve(name, professor, slot_mask):
+        return (exact.get((name, professor, slot_mask)) or by_professor.get((name, professor))
+                or by_name.get(name))
+    return resolve
+
+
+def main(argv=None):
+    """모든 사용자의 v1 시간표 문서를 v2로 일괄 변환 (과목 id는 과목 테이블에서 보충)"""
+    parser = argparse.ArgumentParser(description="Firestore 시간표 문서를 구조화 스키마(v2)로 변환")
+    parser.add_argument("--credentials", required=True, help="서비스 계정 JSON 경로")
+    parser.add_argument("--catalog", default=None, help="과목 테이블 Parquet 경로 (id/학점 보충용, 기본: 과목 테이블 캐시)")
+    parser.add_argument("--data-dir", default="data", help="과목 테이블이 없을 때 파싱할 PDF 폴더")
+    parser.add_argument("--dry-run", action="store_true", help="변환 결과만 출력하고 쓰지 않음")
+    args = parser.parse_args(argv)
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    from course_catalog import CATALOG_PATH, build_catalog_frame, course_to_candidate, is_timetable_file, load_catalog
+    from ingest import ingest_pdfs
+
+    df = load_catalog(args.catalog or CATALOG_PATH)
+    if df is None:
+        pdf_files = sorted(p for p in glob.glob(os.path.join(args.data_dir, "*.pdf")) if is_timetable_file(p))
+        df = build_catalog_frame(ingest_pdfs(pdf_files))
+    resolve = catalog_resolver([course_to_candidate(row) for row in df.to_dict("records")])
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    db = firestore.client()
+    migrated = 0
+    for snapshot in db.collection_group(COLLECTION).stream():
+        doc = snapshot.to_dict()
+        if schema_version(doc) >= SCHEMA_VERSION:
+            continue
+        new_doc = migrate_document(doc, resolve)
+        migrated += 1
+        if args.dry_run:
+            print(snapshot.reference.path, json.dumps(new_doc["courses"], ensure_ascii=False))
+        else:
+            snapshot.reference.set(new_doc)
+    print(f"{migrated}개 문서 {'변환 예정' if args.dry_run else '변환 완료'}")
+
+
+if __name__ == "__main__":
+    main()
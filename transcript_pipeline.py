@@ -0,0 +1,184 @@
+import re
+import json
+import asyncio
+from dataclasses import dataclass, field
+
+# -----------------------------------------------------------------------------
+# 성적표 진단 파이프라인
+# 1. 이미지별 추출: 성적표 캡처 1장 -> 과목 행 [{term, name, classification, credits, grade}] (이미지 수만큼 동시 요청)
+# 2. 집계: 행 합치기/중복 제거/이수구분별 학점/평점 계산 (LLM 없이 결정적으로)
+# 3. 졸업 판정(선택): verdict_fn이 학칙 표 기준으로 계산한 판정을 섹션 입력과 GRADUATION 본문 앞에 붙임
+# 4. 섹션 작성: GRADUATION / GRADES / CAREER 3개 섹션을 동시에 요청
+# 전체 소요 시간 ≈ 가장 느린 추출 1건 + 가장 느린 섹션 1건
+# -----------------------------------------------------------------------------
+SECTIONS = ["GRADUATION", "GRADES", "CAREER"]
+
+GRADE_POINTS = {
+    "A+": 4.5, "A0": 4.0, "A": 4.0, "B+": 3.5, "B0": 3.0, "B": 3.0,
+    "C+": 2.5, "C0": 2.0, "C": 2.0, "D+": 1.5, "D0": 1.0, "D": 1.0, "F": 0.0,
+}
+FAIL_GRADES = {"F", "NP", "U"}
+RETAKE_THRESHOLD = 2.5  # C+ 이하 전공 과목은 재수강 권고 대상
+MAJOR_CLASSIFICATIONS = ("전공필수", "전공선택")
+
+# 한 학년도 안의 학기 순서: 1학기 -> 여름 계절 -> 2학기 -> 겨울 계절
+_SESSION_ORDER = {"1": 1, "S": 2, "여름": 2, "2": 3, "W": 4, "겨울": 4}
+_TERM_RE = re.compile(r"(\d{4})\D{0,5}?(1|2|S|W|여름|겨울)", re.IGNORECASE)
+
+_CLASSIFICATION_ALIASES = {
+    "전필": "전공필수", "전선": "전공선택", "교필": "교양필수", "교선": "교양선택",
+    "기필": "기초필수", "기선": "기초선택", "일선": "일반선택",
+}
+
+
+@dataclass
+class TranscriptSummary:
+    rows: list                       # 중복 제거된 과목 행
+    earned_credits: int
+    credits_by_classification: dict  # 이수구분 -> 취득 학점
+    gpa: float
+    major_gpa: float
+    retake_candidates: list          # C+ 이하 전공 과목명
+    failed_images: int = 0
+
+
+@dataclass
+class DiagnosisReport:
+    summary: TranscriptSummary
+    sections: dict = field(default_factory=dict)   # 섹션명 -> 본문
+    errors: dict = field(default_factory=dict)     # 섹션명 -> 오류 메시지
+
+    @property
+    def text(self):
+        """기존 화면 파서가 쓰는 [[SECTION:...]] 구분자 형식으로 합침"""
+        return "\n\n".join(f"[[SECTION:{name}]]\n{self.sections.get(name, '')}" for name in SECTIONS)
+
+
+def _extract_json_list(text):
+    cleaned = (text or "").replace("```json", "").replace("```", "").strip()
+    start, end = cleaned.find("["), cleaned.rfind("]")
+    if start == -1 or end == -1:
+        return []
+    try:
+        data = json.loads(cleaned[start:end + 1])
+    except ValueError:
+        return []
+    return data if isinstance(data, list) else []
+
+
+def normalize_grade(grade):
+    grade = re.sub(r"\s+", "", str(grade or "")).upper()
+    return grade.replace("O", "0")
+
+
+def parse_transcript_rows(text):
+    """추출 응답(JSON 리스트) -> 정규화된 행 리스트 (형식이 깨진 행은 버림)"""
+    rows = []
+    for item in _extract_json_list(text):
+        if not isinstance(item, dict) or not item.get("name"):
+            continue
+        try:
+            credits = int(float(item.get("credits", 0)))
+        except (TypeError, ValueError):
+            continue
+        classification = str(item.get("classification", "")).strip()
+        rows.append({
+            "term": str(item.get("term", "")).strip(),
+            "name": str(item["name"]).strip(),
+            "classification": _CLASSIFICATION_ALIASES.get(classification, classification),
+            "credits": credits,
+            "grade": normalize_grade(item.get("grade")),
+        })
+    return rows
+
+
+def term_order(term):
+    """'2024-1'/'2024-S'/'2024-2'/'2024-W' -> (연도, 학기 순서). 해석할 수 없으면 가장 이른 학기로 취급"""
+    m = _TERM_RE.search(str(term or ""))
+    if not m:
+        return (0, 0)
+    return (int(m.group(1)), _SESSION_ORDER[m.group(2).upper()])
+
+
+def _gpa(rows):
+    graded = [(r["credits"], GRADE_POINTS[r["grade"]]) for r in rows if r["grade"] in GRADE_POINTS]
+    total = sum(c for c, _ in graded)
+    return round(sum(c * p for c, p in graded) / total, 2) if total else 0.0
+
+
+def aggregate_transcript(rows_per_image):
+    """이미지별 행 리스트들을 합쳐 집계. 여러 캡처에 같은 행이 겹치면 하나만,
+    같은 과목을 재수강했다면 가장 최근 학기의 성적만 반영"""
+    latest = {}
+    for rows in rows_per_image:
+        for row in rows:
+            key = row["name"]
+            if key not in latest or term_order(row["term"]) >= term_order(latest[key]["term"]):
+                latest[key] = row
+    rows = sorted(latest.values(), key=lambda r: (term_order(r["term"]), r["name"]))
+    earned = [r for r in rows if r["grade"] not in FAIL_GRADES]
+    by_class = {}
+    for r in earned:
+        by_class[r["classification"] or "기타"] = by_class.get(r["classification"] or "기타", 0) + r["credits"]
+    major_rows = [r for r in rows if r["classification"] in MAJOR_CLASSIFICATIONS]
+    retake = [r["name"] for r in major_rows
+              if r["grade"] in GRADE_POINTS and GRADE_POINTS[r["grade"]] <= RETAKE_THRESHOLD]
+    return TranscriptSummary(
+        rows=rows,
+        earned_credits=sum(r["credits"] for r in earned),
+        credits_by_classification=by_class,
+        gpa=_gpa(rows),
+        major_gpa=_gpa(major_rows),
+        retake_candidates=retake,
+    )
+
+
+def format_summary(summary):
+    """섹션 작성 프롬프트에 넣을 집계 결과 (표 형식 텍스트)"""
+    lines = [
+        f"취득 학점: {summary.earned_credits}",
+        "이수구분별 학점: " + ", ".join(f"{k} {v}" for k, v in sorted(summary.credits_by_classification.items())),
+        f"전체 평점: {summary.gpa} / 4.5, 전공 평점: {summary.major_gpa} / 4.5",
+        "재수강 권고(C+ 이하 전공): " + (", ".join(summary.retake_candidates) or "없음"),
+        "",
+        "학기 | 과목명 | 이수구분 | 학점 | 성적",
+    ]
+    lines.extend(f"{r['term']} | {r['name']} | {r['classification']} | {r['credits']} | {r['grade']}" for r in summary.rows)
+    return "\n".join(lines)
+
+
+async def analyze_transcripts(images, extract_fn, section_fn, sections=SECTIONS, verdict_fn=None):
+    """extract_fn(image) -> 응답 텍스트, section_fn(section, summary_text) -> 섹션 본문 (둘 다 블로킹 함수)
+    verdict_fn(summary) -> 졸업 판정 마크다운 (규칙이 없으면 None -> 판정도 LLM이 작성)
+
+    블로킹 호출은 asyncio.to_thread로 감싸 동시에 실행 (공용 스케줄러/동시 요청 제한은 그대로 적용)
+    """
+    extracted = await asyncio.gather(*(asyncio.to_thread(extract_fn, image) for image in images),
+                                     return_exceptions=True)
+    rows_per_image = [parse_transcript_rows(r) for r in extracted if not isinstance(r, BaseException)]
+    failed = len(extracted) - len(rows_per_image)
+    if extracted and not rows_per_image:
+        raise extracted[0]
+    summary = aggregate_transcript(rows_per_image)
+    summary.failed_images = failed
+    summary_text = format_summary(summary)
+    verdict = verdict_fn(summary) if verdict_fn else None
+    if verdict:
+        summary_text += f"\n\n[졸업 요건 판정 결과 (학칙 기준 계산값, 확정)]\n{verdict}"
+
+    written = await asyncio.gather(*(asyncio.to_thread(section_fn, name, summary_text) for name in sections),
+                                   return_exceptions=True)
+    failures = [r for r in written if isinstance(r, BaseException)]
+    if len(failures) == len(written):
+        raise failures[0]
+    report = DiagnosisReport(summary)
+    for name, result in zip(sections, written):
+        if isinstance(result, BaseException):
+            report.errors[name] = str(result)
+            report.sections[name] = f"❌ 이 섹션을 생성하지 못했습니다: {result}"
+        else:
+            report.sections[name] = result
+    # 판정표는 서술 생성 실패와 무관하게 항상 표시
+    if verdict and "GRADUATION" in report.sections:
+        report.sections["GRADUATION"] = f"{verdict}\n\n{report.sections['GRADUATION']}"
+    return report
@@ -0,0 +1,194 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from firestore_data import AlreadyExists
+
+# -----------------------------------------------------------------------------
+# 이메일/비밀번호 인증
+# - auth_emails/{정규화 이메일의 SHA-256}: uid + 비밀번호 해시 -> 로그인은 문서 한 건 조회 (사용자 수와 무관)
+#   사용자 데이터(users/{uid}/...)는 기존 문서 id 그대로 두고, 이 색인 문서만 이메일로 찾음
+# - 비밀번호는 scrypt(메모리 하드) 해시로만 저장. 해시 계산은 작은 전용 스레드 풀에서만 돌려
+#   동시 로그인이 몰려도 CPU/메모리 사용량이 풀 크기로 제한됨
+# - 로그인 성공 시 세션 토큰 발급: 서버는 프로세스 메모리에, 브라우저 쪽은 session_state에만 보관 (주소에는 남기지 않음)
+# - 색인 문서가 없는 기존 사용자(users 문서에 평문 password)는 첫 로그인 때 한 번만 email 단일 조건 쿼리로 찾아
+#   해시로 옮기고 평문을 삭제
+# -----------------------------------------------------------------------------
+AUTH_COLLECTION = "auth_emails"
+USERS_COLLECTION = "users"
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+HASH_WORKERS = 2
+HASH_TIMEOUT = 10
+MIN_PASSWORD_LENGTH = 6
+SESSION_TTL = 12 * 3600
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+def email_key(email):
+    """색인 문서 id (이메일에는 '/' 등 문서 id에 못 쓰는 문자가 올 수 있어 해시 사용)"""
+    return hashlib.sha256(normalize_email(email).encode("utf-8")).hexdigest()
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """'scrypt$n$r$p$salt$hash' 형식 문자열"""
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=HASH_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, encoded):
+    try:
+        scheme, n, r, p, salt, expected = encoded.split("$")
+        if scheme != "scrypt":
+            return False
+        expected = base64.b64decode(expected)
+        digest = hashlib.scrypt(password.encode("utf-8"), salt=base64.b64decode(salt),
+                                n=int(n), r=int(r), p=int(p), dklen=len(expected))
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(encoded):
+    """저장된 해시의 파라미터가 현재 기본값보다 약하면 True (로그인 성공 시 다시 해시해 저장)"""
+    try:
+        _, n, r, p, _, _ = encoded.split("$")
+        return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    except ValueError:
+        return True
+
+
+# 모르는 이메일도 같은 시간이 걸리도록 비교용 해시 (가입 여부 추측 방지)
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+
+class SessionStore:
+    """토큰 -> 사용자 정보 (만료 시각 포함). 프로세스 메모리에만 있어 재시작하면 다시 로그인"""
+
+    def __init__(self, ttl=SESSION_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self.clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def issue(self, user):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._purge()
+            self._sessions[token] = (self.clock() + self.ttl, dict(user))
+        return token
+
+    def get(self, token):
+        with self._lock:
+            entry = self._sessions.get(token or "")
+            if entry is None:
+                return None
+            if entry[0] < self.clock():
+                del self._sessions[token]
+                return None
+            return dict(entry[1])
+
+    def revoke(self, token):
+        with self._lock:
+            self._sessions.pop(token or "", None)
+
+    def _purge(self):
+        now = self.clock()
+        for token in [t for t, (expires, _) in self._sessions.items() if expires < now]:
+            del self._sessions[token]
+
+
+class AuthService:
+    """login/signup -> (user dict 또는 None, 오류 메시지 또는 None). user = {"localId", "email"}"""
+
+    def __init__(self, db, server_timestamp=None, delete_field=None, workers=HASH_WORKERS, timeout=HASH_TIMEOUT):
+        self.db = db
+        self.server_timestamp = server_timestamp
+        self.delete_field = delete_field
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="auth-hash")
+
+    def _in_pool(self, fn, *args):
+        return self._pool.submit(fn, *args).result(self.timeout)
+
+    def _index(self, email):
+        return self.db.collection(AUTH_COLLECTION).document(email_key(email))
+
+    def _legacy_user(self, email):
+        """색인 문서가 없는 기존 사용자 문서 (email 단일 조건, 최대 1건. 예전에는 입력 그대로 저장해 원문/소문자 둘 다 확인)"""
+        for candidate in dict.fromkeys([(email or "").strip(), normalize_email(email)]):
+            docs = list(self.db.collection(USERS_COLLECTION).where("email", "==", candidate).limit(1).stream())
+            if docs:
+                return docs[0]
+        return None
+
+    def _now(self):
+        return self.server_timestamp if self.server_timestamp is not None else time.time()
+
+    def login(self, raw_email, password):
+        email = normalize_email(raw_email)
+        snapshot = self._index(email).get()
+        if snapshot.exists:
+            record = snapshot.to_dict()
+            if not self._in_pool(verify_password, password, record.get("password_hash", "")):
+                return None, "이메일 또는 비밀번호가 일치하지 않습니다."
+            if needs_rehash(record["password_hash"]):
+                self._index(email).update({"password_hash": self._in_pool(hash_password, password)})
+            return {"localId": record["uid"], "email": record["email"]}, None
+
+        legacy = self._legacy_user(raw_email)
+        stored = (legacy.to_dict() or {}).get("password") if legacy is not None else None
+        if stored is None:
+            self._in_pool(verify_password, password, _DUMMY_HASH)
+            return None, "이메일 또는 비밀번호가 일치하지 않습니다."
+        if not hmac.compare_digest(str(stored).encode("utf-8"), password.encode("utf-8")):
+            return None, "이메일 또는 비밀번호가 일치하지 않습니다."
+        self._migrate_legacy(email, legacy.id, password)
+        return {"localId": legacy.id, "email": email}, None
+
+    def _migrate_legacy(self, email, uid, password):
+        """평문 비밀번호 사용자 -> 색인 문서 생성 후 users 문서의 평문 삭제"""
+        record = {"uid": uid, "email": email, "password_hash": self._in_pool(hash_password, password),
+                  "created_at": self._now()}
+        try:
+            self._index(email).create(record)
+        except AlreadyExists:
+            pass
+        if self.delete_field is not None:
+            self.db.collection(USERS_COLLECTION).document(uid).update({"password": self.delete_field, "email": email})
+
+    def signup(self, raw_email, password):
+        email = normalize_email(raw_email)
+        if "@" not in email:
+            return None, "올바른 이메일 형식이 아닙니다."
+        if len(password or "") < MIN_PASSWORD_LENGTH:
+            return None, f"비밀번호는 {MIN_PASSWORD_LENGTH}자 이상이어야 합니다."
+        if self._index(email).get().exists or self._legacy_user(raw_email) is not None:
+            return None, "이미 가입된 이메일입니다."
+        user_ref = self.db.collection(USERS_COLLECTION).document()
+        record = {"uid": user_ref.id, "email": email, "password_hash": self._in_pool(hash_password, password),
+                  "created_at": self._now()}
+        try:
+            # create: 같은 이메일로 동시에 가입해도 한 명만 성공
+            self._index(email).create(record)
+        except AlreadyExists:
+            return None, "이미 가입된 이메일입니다."
+        user_ref.set({"email": email, "created_at": self._now()})
+        return {"localId": user_ref.id, "email": email}, None